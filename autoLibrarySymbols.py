@@ -1,4 +1,53 @@
 # librarySymbols.py
+from kicadSexpr import *  # kicadSexpr.py
+from footprintResolver import *  # footprintResolver.py
+
+
+def compact_symbol(symbol):
+    """
+    Rewrites a pretty printed symbol as a single tab-indented line, dropping all the indentation and
+    newlines KiCad doesn't need. Whitespace inside quoted strings is kept.
+    """
+    compact = ["\t"]
+    previous = "("
+    for token in sexpr_token_pattern.findall(symbol):
+        if previous != "(" and token != ")":
+            compact.append(" ")
+        compact.append(token)
+        previous = token
+    return "".join(compact)
+
+
+# Marks the slots generate_kicad_symbol leaves for a part's values, "\x00<index>\x00"
+symbol_slot_marker = "\x00"
+
+# Compact layout of each symbol skeleton generate_kicad_symbol has rendered, see fill_symbol_slots
+compact_symbol_layouts = {}
+
+
+def get_symbol_slot(values, value):
+    """Adds a value to a symbol's values and returns the slot to put in the symbol's text in place of it."""
+    values.append(f"{value}")
+    return f"{symbol_slot_marker}{len(values) - 1}{symbol_slot_marker}"
+
+
+def fill_symbol_slots(skeleton, values, pretty=True):
+    """
+    Returns a symbol rendered with its part's values left in slots (see get_symbol_slot) with the values filled in,
+    in the pretty layout it was rendered in or compacted to one line (see compact_symbol). Parts of the same kind
+    render the same skeleton, so each skeleton is only compacted once however many parts use it.
+    """
+    if pretty == True:
+        layout = skeleton.split(symbol_slot_marker)
+    else:
+        layout = compact_symbol_layouts.get(skeleton)
+        if layout == None:
+            layout = compact_symbol(skeleton).split(symbol_slot_marker)
+            compact_symbol_layouts[skeleton] = layout
+    pieces = layout[:]
+    for index in range(1, len(layout), 2):
+        pieces[index] = values[int(layout[index])]
+    return "".join(pieces)
 
 
 def generate_header(name, hide_pin_numbers=True):
@@ -63,30 +112,57 @@ def generate_pin_pair(pin_type, name, index, pin_length="1.27", pinA=1, pinB=2):
     return symbol
 
 
-def generate_kicad_symbol(
-    mode,
-    secondary_mode,
-    lcsc,
-    datasheet,
-    description,
-    footprint,
-    value,
-    keywords,
-    price,
-    assembly_process,
-    min_order_qty,
-    attrition_qty,
-    component_class,
-    stock,
-    category,
-    manufacturer,
-    manufacturerPartID,
-    attributes,
-    units,
-    footprints_lookup,
-    names_lookup,
-):
+polarized_footprints = [
+    "C_CASE-A-3216-18(mm)",
+    "C_CASE-B-3528-21(mm)",
+    "C_Plugin,D5xL11mm",
+    "C_Plugin,D6.3xL8mm",
+    "C_Plugin,D6.3xL11.5mm",
+    "C_Plugin,D8xL12mm",
+    "C_Plugin,D8xL16mm",
+    "C_Plugin,D10xL12mm",
+    "C_Plugin,D10xL14mm",
+    "C_Plugin,D10xL16mm",
+    "C_Plugin,D10xL20mm",
+    "C_Plugin,D13xL21mm",
+    "C_Plugin,D18xL20mm",
+    "C_Plugin,D18xL30mm",
+    "C_Plugin,D18xL36mm",
+    "C_SMD,D8xL10.5mm",
+]
+
+
+def is_polarized_footprint(footprint):
+    return any(s in footprint for s in polarized_footprints)
+
+
+def get_unique_name(name, names_lookup):
+    if name in names_lookup:
+        if name + ",(2)" not in names_lookup:
+            name = name + ",(2)"
+        elif name + ",(3)" not in names_lookup:
+            name = name + ",(3)"
+        elif name + ",(4)" not in names_lookup:
+            name = name + ",(4)"
+        elif name + ",(5)" not in names_lookup:
+            name = name + ",(5)"
+        elif name + ",(6)" not in names_lookup:
+            name = name + ",(6)"
+        else:
+            print("more than 5 symbols with the same name...")
 
+    names_lookup.append(name)
+    return name
+
+
+def get_symbol_style(mode, secondary_mode, lcsc, footprint, value, manufacturerPartID):
+    """
+    Works out the reference designator, symbol name, displayed value and the placement of the
+    Reference/Value fields for an auto-generated part.
+
+    :return: A dict with the keys ref_designator, ref_position, value_position, value_autoplace,
+             justify_value_left, name and value.
+    """
     justify_value_left = True
 
     if mode == "Resistors":
@@ -171,67 +247,99 @@ def generate_kicad_symbol(
         value_autoplace = True
         name = f"{footprint},{value}"
         print(f"Error: Unknown autoLibrarySymbol mode for https://jlcpcb.com/partdetail/C{lcsc}  ({mode})")
-    lcsc = f"C{lcsc}"
 
-    if footprint == "SMA(DO-214AC)":
-        footprint = "SMA"
-    if footprint == "SMB(DO-214AA)":
-        footprint = "SMB"
-    if footprint == "SOT-23-3":
-        footprint = "SOT-23"
+    return {
+        "ref_designator": ref_designator,
+        "ref_position": ref_position,
+        "value_position": value_position,
+        "value_autoplace": value_autoplace,
+        "justify_value_left": justify_value_left,
+        "name": name,
+        "value": value,
+    }
 
-    if name in names_lookup:
-        if name + ",(2)" not in names_lookup:
-            name = name + ",(2)"
-        elif name + ",(3)" not in names_lookup:
-            name = name + ",(3)"
-        elif name + ",(4)" not in names_lookup:
-            name = name + ",(4)"
-        elif name + ",(5)" not in names_lookup:
-            name = name + ",(5)"
-        elif name + ",(6)" not in names_lookup:
-            name = name + ",(6)"
-        else:
-            print("more than 5 symbols with the same name...")
 
-    names_lookup.append(name)
+def get_part_footprint_name(part):
+    """Returns the name of the footprint an auto-generated part's symbol links to, e.g. R_0402."""
+    style = get_symbol_style(
+        part.mode, part.secondary_mode, part.lcsc, part.footprint, part.value, part.manufacturerPartID
+    )
+    return get_footprint_name(style["ref_designator"], part.footprint)
+
+
+def generate_kicad_symbol(part, names_lookup, symbol_name=None, pretty=True):
+    """
+    Renders a classified part (see partRecord.py) as a KiCad symbol.
+    The symbol is rendered once with the part's values (name, properties) left in slots, which are filled in
+    for the layout asked for (see fill_symbol_slots), so the compact layout never has to re-tokenize the pretty one.
 
-    footprint = f"JLCPCB-Kicad-Footprints:{ref_designator}_{footprint}"
+    :param part: The Part, with mode (the library), secondary_mode, value and units set.
+    :param names_lookup: Names already used in the library, the symbol gets a ",(2)" style suffix if its name is taken.
+    :param symbol_name: Overrides the name (no de-duplication), used for the generic database library symbols.
+    :param pretty: Indented over many lines, or compacted to a single line (see compact_symbol).
+    :return: The symbol as a string.
+    """
+    mode = part.mode
+    secondary_mode = part.secondary_mode
+    units = part.units
+    style = get_symbol_style(mode, secondary_mode, part.lcsc, part.footprint, part.value, part.manufacturerPartID)
+    ref_designator = style["ref_designator"]
+    ref_position = style["ref_position"]
+    value_position = style["value_position"]
+    value_autoplace = style["value_autoplace"]
+    justify_value_left = style["justify_value_left"]
+    name = style["name"]
+    value = style["value"]
+
+    lcsc = part.lcsc
+    if lcsc != "":
+        lcsc = f"C{lcsc}"
+
+    if symbol_name != None:
+        name = symbol_name  # Generic symbols (e.g. for the database library) are named by the caller
+    else:
+        name = get_unique_name(name, names_lookup)
+    values = []
+    name = get_symbol_slot(values, name)
+
+    footprint = f"JLCPCB-Kicad-Footprints:{get_footprint_name(ref_designator, part.footprint)}"
     if mode == "Transistors":
         symbol = generate_header(name, False)
     else:
         symbol = generate_header(name, True)
 
-    symbol += generate_property("Reference", ref_designator, ref_position, hide=False, justify_left=True)
+    symbol += generate_property(
+        "Reference", get_symbol_slot(values, ref_designator), ref_position, hide=False, justify_left=True
+    )
     symbol += generate_property(
         "Value",
-        value,
+        get_symbol_slot(values, value),
         value_position,
         size=0.8,
         hide=False,
         autoplace=value_autoplace,
         justify_left=justify_value_left,
     )
-    symbol += generate_property("Footprint", footprint, "-1.778 0 90")
-    symbol += generate_property("Datasheet", datasheet, "0 0 0")
-    symbol += generate_property("Description", description, "0 0 0")
-    symbol += generate_property("LCSC", lcsc, "0 0 0")
-    symbol += generate_property("Stock", stock, "0 0 0")
-    symbol += generate_property("Price", price, "0 0 0")
-    symbol += generate_property("Process", assembly_process, "0 0 0")
-    symbol += generate_property("Minimum Qty", min_order_qty, "0 0 0")
-    symbol += generate_property("Attrition Qty", attrition_qty, "0 0 0")
-    symbol += generate_property("Class", component_class, "0 0 0")
-    symbol += generate_property("Category", category, "0 0 0")
-    symbol += generate_property("Manufacturer", manufacturer, "0 0 0")
-    symbol += generate_property("Part", manufacturerPartID, "0 0 0")
+    symbol += generate_property("Footprint", get_symbol_slot(values, footprint), "-1.778 0 90")
+    symbol += generate_property("Datasheet", get_symbol_slot(values, part.datasheet), "0 0 0")
+    symbol += generate_property("Description", get_symbol_slot(values, part.description), "0 0 0")
+    symbol += generate_property("LCSC", get_symbol_slot(values, lcsc), "0 0 0")
+    symbol += generate_property("Stock", get_symbol_slot(values, part.stock), "0 0 0")
+    symbol += generate_property("Price", get_symbol_slot(values, part.price_str), "0 0 0")
+    symbol += generate_property("Process", get_symbol_slot(values, part.assembly_process), "0 0 0")
+    symbol += generate_property("Minimum Qty", get_symbol_slot(values, part.min_order_qty), "0 0 0")
+    symbol += generate_property("Attrition Qty", get_symbol_slot(values, part.attrition_qty), "0 0 0")
+    symbol += generate_property("Class", get_symbol_slot(values, part.component_class), "0 0 0")
+    symbol += generate_property("Category", get_symbol_slot(values, part.category), "0 0 0")
+    symbol += generate_property("Manufacturer", get_symbol_slot(values, part.manufacturer), "0 0 0")
+    symbol += generate_property("Part", get_symbol_slot(values, part.manufacturerPartID), "0 0 0")
 
-    if type(attributes) == dict:
-        for key, value in attributes.items():
+    if type(part.attributes) == dict:
+        for key, value in part.attributes.items():
             if mode == "Capacitors" and (key == "Voltage Rated" or key == "Rated Voltage"):
                 symbol += generate_property(
                     f"{key}",
-                    f"{value}",
+                    get_symbol_slot(values, value),
                     "2.032 -2.0462 0",
                     size=0.8,
                     hide=False,
@@ -240,17 +348,17 @@ def generate_kicad_symbol(
             elif secondary_mode == "Ferrite" and key == "Current Rating":
                 symbol += generate_property(
                     f"{key}",
-                    f"{value}",
+                    get_symbol_slot(values, value),
                     "3.4036 -1.5274 0",
                     size=0.8,
                     hide=False,
                     justify_left=True,
                 )
             else:
-                symbol += generate_property(f"{key}", f"{value}", "0 0 0")
+                symbol += generate_property(f"{key}", get_symbol_slot(values, value), "0 0 0")
 
-    symbol += generate_property("ki_keywords", keywords, at="0 0 0")
-    symbol += generate_property("ki_fp_filters", f"{ref_designator}_*", "0 0 0")
+    symbol += generate_property("ki_keywords", get_symbol_slot(values, part.keywords), at="0 0 0")
+    symbol += generate_property("ki_fp_filters", get_symbol_slot(values, f"{ref_designator}_*"), "0 0 0")
 
     if mode == "Resistors":
         symbol += generate_rectangle("-1.016 2.54", "1.016 -2.54", name=name, index=0)
@@ -260,25 +368,7 @@ def generate_kicad_symbol(
     elif mode == "Capacitors":
         symbol += generate_polyline(["-1.27 0.635", "1.27 0.635"], name=name, index=0)
         symbol += generate_polyline(["-1.27 -0.635", "1.27 -0.635"], name=name, index=0)
-        polarized_footprints = [
-            "C_CASE-A-3216-18(mm)",
-            "C_CASE-B-3528-21(mm)",
-            "C_Plugin,D5xL11mm",
-            "C_Plugin,D6.3xL8mm",
-            "C_Plugin,D6.3xL11.5mm",
-            "C_Plugin,D8xL12mm",
-            "C_Plugin,D8xL16mm",
-            "C_Plugin,D10xL12mm",
-            "C_Plugin,D10xL14mm",
-            "C_Plugin,D10xL16mm",
-            "C_Plugin,D10xL20mm",
-            "C_Plugin,D13xL21mm",
-            "C_Plugin,D18xL20mm",
-            "C_Plugin,D18xL30mm",
-            "C_Plugin,D18xL36mm",
-            "C_SMD,D8xL10.5mm",
-        ]
-        if any(s in footprint for s in polarized_footprints):
+        if is_polarized_footprint(footprint):
             symbol += generate_polyline(
                 ["-1.27 1.27", "-0.635 1.27"],
                 name=name,
@@ -1327,4 +1417,4 @@ def generate_kicad_symbol(
                 symbol += generate_pin_pair("passive line", name, i, "1.27", i, (units * 2) - (i - 1))
 
     symbol += "\n\t)"
-    return symbol
+    return fill_symbol_slots(symbol, values, pretty)
@@ -0,0 +1,225 @@
+# bomCosting.py
+# Costs a KiCad BOM (csv) or netlist (.net) against the JLCPCB parts list for a range of board quantities, e.g.
+#   python bomCosting.py My_KiCad_Project.csv --quantities 5 10 50 100 1000
+import argparse
+import csv
+import json
+import os
+import numpy as np
+from kicadSexpr import *  # kicadSexpr.py
+from partsCsv import *  # partsCsv.py
+from partRecord import *  # partRecord.py
+
+
+def parse_lcsc_id(text):
+    """Converts "C25905" / "c25905" / "25905" to 25905, or None if it isn't an LCSC id."""
+    text = f"{text}".strip().upper().removeprefix("C")
+    if text.isdigit():
+        return int(text)
+    return None
+
+
+def build_price_index(df):
+    """
+    Builds the LCSC keyed price index from the parts list.
+    Every part's price tiers are padded to the same length so a whole BOM can be priced with array operations.
+
+    :param df: The parts list (jlcpcb-components-basic-preferred.csv) as a DataFrame.
+    :return: dict of numpy arrays, all in ascending LCSC order: lcsc, tier_from (parts x tiers, padded with inf),
+             tier_price (parts x tiers), joints, joint_cost, min_order, attrition and stock.
+    """
+    df = df.sort_values("lcsc", kind="stable").drop_duplicates("lcsc")
+
+    tiers = []
+    for price in df["price"]:
+        try:
+            price_json = json.loads(price)
+        except (TypeError, ValueError):
+            price_json = []
+        tiers.append([(float(tier["qFrom"] or 1), float(tier["price"])) for tier in price_json if "price" in tier])
+
+    tier_count = max([len(part_tiers) for part_tiers in tiers] + [1])
+    tier_from = np.full((len(tiers), tier_count), np.inf)
+    tier_price = np.full((len(tiers), tier_count), np.nan)
+    for position, part_tiers in enumerate(tiers):
+        for tier, (quantity_from, price) in enumerate(sorted(part_tiers)):
+            tier_from[position, tier] = quantity_from
+            tier_price[position, tier] = price
+        # Parts are sold from the first tier even when it starts above 1
+        if len(part_tiers) > 0:
+            tier_from[position, 0] = 0
+
+    return {
+        "lcsc": df["lcsc"].to_numpy(dtype=np.int64),
+        "tier_from": tier_from,
+        "tier_price": tier_price,
+        "joints": df["joints"].fillna(0).to_numpy(dtype=np.int64),
+        "joint_cost": np.array([get_joint_cost(process) for process in df["Assembly Process"]]),
+        "min_order": df["Min Order Qty"].fillna(1).to_numpy(dtype=np.int64),
+        "attrition": df["Attrition Qty"].fillna(0).to_numpy(dtype=np.int64),
+        "stock": df["stock"].fillna(0).to_numpy(dtype=np.int64),
+    }
+
+
+def load_price_index(filename=parts_csv_filename):
+    columns = ["lcsc", "joints", "stock", "price", "Assembly Process", "Min Order Qty", "Attrition Qty"]
+    return build_price_index(read_parts_csv(filename, columns)[0])
+
+
+def get_field(row, names):
+    """Returns the first of the named columns a csv row has (matched case-insensitively), or None."""
+    for key, value in row.items():
+        if key != None and key.strip().casefold() in names:
+            return value
+    return None
+
+
+def read_bom_csv(filename):
+    """
+    Reads a BOM exported by KiCad (Tools -> Generate BOM / kicad-cli sch export bom) with an LCSC column.
+    Rows are grouped or one per reference, the quantity comes from the Qty column or is counted from the references.
+
+    :return: A list of (lcsc id, references, quantity per board) tuples.
+    """
+    lines = []
+    with open(filename, "r", newline="", encoding="utf-8-sig") as file:
+        for row in csv.DictReader(file):
+            dnp = get_field(row, ["dnp", "${dnp}", "do not populate"])
+            if dnp != None and dnp.strip() not in ["", "0", "no", "No", "false", "False"]:
+                continue
+            references = get_field(row, ["reference", "references", "refs", "ref", "designator"]) or ""
+            quantity = get_field(row, ["qty", "quantity", "${quantity}"])
+            if quantity == None or quantity.strip() == "":
+                quantity = len([reference for reference in references.replace(",", " ").split() if reference != ""])
+            lcsc = parse_lcsc_id(get_field(row, ["lcsc", "lcsc part", "lcsc part #", "jlcpcb part #"]) or "")
+            lines.append((lcsc, references, int(float(quantity))))
+    return lines
+
+
+def read_kicad_netlist(filename):
+    """
+    Reads the components of a KiCad netlist (.net), one BOM line per LCSC id.
+
+    :return: A list of (lcsc id, references, quantity per board) tuples.
+    """
+    with open(filename, "r", encoding="utf-8") as file:
+        netlist = parse_sexpr(file.read())[0]
+
+    grouped = {}
+    for components in find_sexpr_children(netlist, "components"):
+        for component in find_sexpr_children(components, "comp"):
+            reference = unquote_sexpr_string(find_sexpr_child(component, "ref")[1])
+            fields = {}
+            for field in find_sexpr_children(find_sexpr_child(component, "fields") or [], "field"):
+                name = find_sexpr_child(field, "name")
+                if name != None and len(field) > 2:
+                    fields[unquote_sexpr_string(name[1]).casefold()] = unquote_sexpr_string(field[2])
+            for property in find_sexpr_children(component, "property"):
+                name = find_sexpr_child(property, "name")
+                value = find_sexpr_child(property, "value")
+                if name != None:
+                    fields[unquote_sexpr_string(name[1]).casefold()] = unquote_sexpr_string(value[1]) if value else ""
+
+            if "dnp" in fields or "exclude_from_bom" in fields:
+                continue
+            lcsc = parse_lcsc_id(fields.get("lcsc", ""))
+            grouped.setdefault(lcsc, []).append(reference)
+
+    return [(lcsc, ",".join(references), len(references)) for lcsc, references in grouped.items()]
+
+
+def read_bom(filename):
+    if filename.endswith(".net"):
+        return read_kicad_netlist(filename)
+    return read_bom_csv(filename)
+
+
+def cost_bom(price_index, bom_lcsc, bom_quantity, board_quantities):
+    """
+    Costs every BOM line for every board quantity in one pass.
+    Each line orders quantity per board x boards + the part's attrition, at least the part's minimum order,
+    at the price tier that order falls in, plus the assembly cost of every joint placed.
+
+    :param bom_lcsc: LCSC ids of the BOM lines.
+    :param bom_quantity: Quantity of each BOM line per board.
+    :param board_quantities: The board quantities to cost.
+    :return: dict of numpy arrays: found (lines), order_qty, unit_price, parts_cost, assembly_cost and
+             line_cost (lines x board quantities), total and per_board (board quantities).
+             Lines whose LCSC id isn't in the parts list have NaN costs and are left out of the totals.
+    """
+    bom_lcsc = np.asarray(bom_lcsc, dtype=np.int64)
+    bom_quantity = np.asarray(bom_quantity, dtype=np.int64)
+    board_quantities = np.asarray(board_quantities, dtype=np.int64)
+
+    # Join the BOM on LCSC id with a binary search of the (sorted) index
+    position = np.searchsorted(price_index["lcsc"], bom_lcsc)
+    position = np.minimum(position, len(price_index["lcsc"]) - 1)
+    found = price_index["lcsc"][position] == bom_lcsc
+
+    placed = bom_quantity[:, None] * board_quantities[None, :]
+    order_qty = np.maximum(
+        placed + price_index["attrition"][position][:, None], price_index["min_order"][position][:, None]
+    )
+
+    # The tier is the last one whose start the order reaches
+    tier_from = price_index["tier_from"][position]
+    tier = (order_qty[:, :, None] >= tier_from[:, None, :]).sum(axis=2) - 1
+    tier = np.maximum(tier, 0)
+    unit_price = np.take_along_axis(price_index["tier_price"][position], tier, axis=1)
+
+    parts_cost = order_qty * unit_price
+    assembly_cost = placed * (price_index["joints"][position] * price_index["joint_cost"][position])[:, None]
+    line_cost = parts_cost + assembly_cost
+    line_cost[~found] = np.nan
+
+    total = np.nansum(line_cost, axis=0)
+    return {
+        "found": found,
+        "order_qty": order_qty,
+        "unit_price": unit_price,
+        "parts_cost": parts_cost,
+        "assembly_cost": assembly_cost,
+        "line_cost": line_cost,
+        "total": total,
+        "per_board": total / board_quantities,
+        "short": found[:, None] & (order_qty > price_index["stock"][position][:, None]),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost a KiCad BOM or netlist with JLCPCB parts and assembly prices")
+    parser.add_argument("bom", help="KiCad BOM (.csv with an LCSC column) or netlist (.net)")
+    parser.add_argument("--quantities", type=int, nargs="+", default=[5, 10, 30, 50, 100, 250, 500, 1000])
+    parser.add_argument("--parts", default=parts_csv_filename, help="the JLCPCB parts list csv")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.parts):
+        print(f"Error: {args.parts} not found, run libraryCreatorScript.py first to download it")
+        exit(1)
+
+    price_index = load_price_index(args.parts)
+    bom = read_bom(args.bom)
+    costs = cost_bom(
+        price_index,
+        [lcsc if lcsc != None else -1 for lcsc, _, _ in bom],
+        [quantity for _, _, quantity in bom],
+        args.quantities,
+    )
+
+    for line, (lcsc, references, _) in enumerate(bom):
+        if lcsc == None:
+            print(f"Error: No LCSC part number for {references}")
+        elif costs["found"][line] == False:
+            print(f"Error: C{lcsc} ({references}) is not a basic/preferred part, it isn't included in the cost")
+        elif costs["short"][line].any():
+            quantity = args.quantities[int(np.argmax(costs["short"][line]))]
+            print(f"Warning: Not enough stock of C{lcsc} ({references}) for {quantity} boards")
+
+    print(f"{'Boards':>8}{'Parts':>12}{'Assembly':>12}{'Total':>12}{'Per Board':>12}")
+    parts_total = np.nansum(np.where(costs["found"][:, None], costs["parts_cost"], np.nan), axis=0)
+    assembly_total = np.nansum(np.where(costs["found"][:, None], costs["assembly_cost"], np.nan), axis=0)
+    for column, quantity in enumerate(args.quantities):
+        print(
+            f"{quantity:>8}{parts_total[column]:>12.2f}{assembly_total[column]:>12.2f}"
+            f"{costs['total'][column]:>12.2f}{costs['per_board'][column]:>12.3f}"
+        )
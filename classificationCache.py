@@ -0,0 +1,120 @@
+# classificationCache.py
+# Remembers how each part was classified so the next run only has to classify new or changed parts:
+#   {"version": "<hash of the classifier's source>",
+#    "parts": {"C1234": ["<hash of the fields the classifier reads>", {<result>}, "<what the classifier printed>"]}}
+import contextlib
+import hashlib
+import inspect
+import io
+import json
+import os
+from fileTransaction import *  # fileTransaction.py
+
+classification_cache_filename = "classification-cache.json"
+
+
+def get_classifier_version(functions, tables=[]):
+    """
+    Hashes the source of the classifier functions and the tables they use,
+    so changing any classification rule invalidates the cache.
+    """
+    source_hash = hashlib.blake2b(digest_size=8)
+    for function in functions:
+        source_hash.update(inspect.getsource(function).encode("utf-8"))
+    for table in tables:
+        source_hash.update(json.dumps(table, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+    return source_hash.hexdigest()
+
+
+def get_classification_key(part):
+    """Hashes the fields of a part the classifier looks at."""
+    fields = [
+        part.description,
+        part.main_category,
+        part.subcategory,
+        part.footprint,
+        part.joints,
+        part.attributes == {},  # Capacitors without attributes get their voltage from the description
+    ]
+    return hashlib.blake2b(json.dumps(fields, ensure_ascii=False).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def load_classification_cache(version, filename=classification_cache_filename):
+    """
+    Returns the cache, empty if there is none yet (or filename is None) or it was written by a different version
+    of the classifier.
+    """
+    cache = {"version": version, "parts": {}, "used": {}, "hits": 0, "misses": 0}
+    if filename != None and os.path.exists(filename):
+        try:
+            with open(filename, "r", encoding="utf-8") as file:
+                saved = json.load(file)
+            if saved.get("version") == version:
+                cache["parts"] = saved["parts"]
+        except (json.JSONDecodeError, KeyError):
+            print(f"Error: {filename} is not a valid classification cache, it will be rebuilt")
+    return cache
+
+
+def save_classification_cache(cache, filename=classification_cache_filename, transaction=None):
+    """
+    Writes the parts seen in this run (parts that dropped out of the parts list are forgotten).
+
+    :param transaction: Stage the write in this transaction (see fileTransaction.py) instead of writing it straight away.
+    """
+    data = json.dumps({"version": cache["version"], "parts": cache["used"]}, ensure_ascii=False, separators=(",", ":"))
+    write_transaction_file(transaction, filename, data.encode("utf-8"))
+    total = cache["hits"] + cache["misses"]
+    if total > 0:
+        print(
+            f"Classification cache: {cache['hits']} hits, {cache['misses']} misses "
+            f"({cache['hits'] / total:.1%} hit rate)"
+        )
+
+
+def classify_part_cached(cache, part, classify):
+    """
+    Classifies a part with classify(part), or applies the stored result if the part hasn't changed since it was cached.
+    Whatever the classifier printed (e.g. values it couldn't extract) is stored too and printed again on a hit.
+
+    :param classify: Function that sets the part's mode, secondary_mode, value, units and footprint
+                     and returns the handmade library the part belongs in (or None).
+    :return: What classify returned.
+    """
+    lcsc = f"C{part.lcsc}"
+    key = get_classification_key(part)
+    entry = cache["parts"].get(lcsc)
+
+    if entry != None and entry[0] == key:
+        cache["hits"] += 1
+        result = entry[1]
+        part.mode = result["mode"]
+        part.secondary_mode = result["secondary_mode"]
+        part.value = result["value"]
+        part.units = result["units"]
+        part.footprint = result["footprint"]
+        if "attributes" in result:
+            part.attributes = result["attributes"]
+        print(entry[2], end="")
+        cache["used"][lcsc] = entry
+        return result["library"]
+
+    cache["misses"] += 1
+    attributes = part.attributes
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        library = classify(part)
+    print(output.getvalue(), end="")
+
+    result = {
+        "library": library,
+        "mode": part.mode,
+        "secondary_mode": part.secondary_mode,
+        "value": part.value,
+        "units": part.units,
+        "footprint": part.footprint,
+    }
+    if part.attributes is not attributes:
+        result["attributes"] = part.attributes
+    cache["used"][lcsc] = [key, result, output.getvalue()]
+    return library
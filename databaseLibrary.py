@@ -0,0 +1,294 @@
+# databaseLibrary.py
+import os
+import json
+import shutil
+import sqlite3
+from autoLibrarySymbols import *  # autoLibrarySymbols.py
+from partRecord import *  # partRecord.py
+from fileTransaction import *  # fileTransaction.py
+
+database_folder = "JLCPCB-Kicad-Database"
+database_filename = "JLCPCB-Parts.sqlite"
+database_symbols_lib_name = "JLCPCB-Database-Symbols"
+
+# Columns every parts table has, in the order they are shown in KiCad (name: sqlite type)
+database_columns = {
+    "Name": "TEXT",
+    "LCSC": "TEXT PRIMARY KEY",
+    "Symbol": "TEXT",
+    "Value": "TEXT",
+    "Footprint": "TEXT",
+    "Datasheet": "TEXT",
+    "Description": "TEXT",
+    "Stock": "INTEGER",
+    "Price": "TEXT",
+    "Process": "TEXT",
+    "Minimum Qty": "INTEGER",
+    "Attrition Qty": "INTEGER",
+    "Class": "TEXT",
+    "Category": "TEXT",
+    "Manufacturer": "TEXT",
+    "Part": "TEXT",
+    "Keywords": "TEXT",
+    "Footprint Filters": "TEXT",
+}
+
+# Columns that get an index so KiCad's chooser/search queries don't scan the table
+indexed_columns = ["Name", "Value", "Footprint", "Part"]
+
+
+def get_generic_symbol_name(mode, secondary_mode, footprint, units):
+    """
+    Returns the name of the generic symbol that a part is drawn with in the database library.
+    Parts share a generic symbol when their graphics and pinout are identical.
+    """
+    name = mode
+    if secondary_mode != None and secondary_mode != "":
+        name += f",{secondary_mode}"
+    if units > 1:
+        name += f",x{units}"
+    if mode == "Capacitors" and is_polarized_footprint(f"C_{get_footprint_package(footprint)}"):
+        name += ",Polarized"
+    return name
+
+
+def generate_database_part(part, names_lookup):
+    """
+    Builds the database row for a classified part, using the same naming, value and footprint rules
+    as generate_kicad_symbol so both output modes describe a part identically.
+
+    :param part: The Part (see partRecord.py), with mode (the library), secondary_mode, value and units set.
+    :return: A dict of column name -> value for the parts table of the given mode (library).
+    """
+    mode = part.mode
+    footprint = part.footprint
+    style = get_symbol_style(mode, part.secondary_mode, part.lcsc, footprint, part.value, part.manufacturerPartID)
+    ref_designator = style["ref_designator"]
+    generic_symbol_name = get_generic_symbol_name(mode, part.secondary_mode, footprint, part.units)
+
+    row = {
+        "Name": get_unique_name(style["name"], names_lookup),
+        "LCSC": f"C{part.lcsc}",
+        "Symbol": f"{database_symbols_lib_name}:{generic_symbol_name}",
+        "Value": style["value"],
+        "Footprint": f"JLCPCB-Kicad-Footprints:{get_footprint_name(ref_designator, footprint)}",
+        "Datasheet": part.datasheet,
+        "Description": part.description,
+        "Stock": int(part.stock),
+        "Price": part.price_str,
+        "Process": part.assembly_process,
+        "Minimum Qty": int(part.min_order_qty),
+        "Attrition Qty": int(part.attrition_qty),
+        "Class": part.component_class,
+        "Category": part.category,
+        "Manufacturer": part.manufacturer,
+        "Part": part.manufacturerPartID,
+        "Keywords": part.keywords,
+        "Footprint Filters": f"{ref_designator}_*",
+    }
+
+    if type(part.attributes) == dict:
+        for key, value in part.attributes.items():
+            if key not in row:
+                row[key] = f"{value}"
+
+    return row
+
+
+def generate_database_symbol_lib(generic_symbols, transaction=None):
+    """
+    Writes the small library of generic symbols that every database part points at.
+
+    :param generic_symbols: dict of generic symbol name -> (mode, secondary_mode, footprint, units) of a part drawn with it.
+    :param transaction: Stage the write in this transaction (see fileTransaction.py) instead of writing it straight away.
+    """
+    lib_content = "(kicad_symbol_lib\n"
+    lib_content += "\t(version 20231120)\n"
+    lib_content += '\t(generator "CDFER")\n'
+    lib_content += '\t(generator_version "8.0")\n'
+    for name, (mode, secondary_mode, footprint, units) in sorted(generic_symbols.items()):
+        part = Part(mode=mode, secondary_mode=secondary_mode, footprint=footprint, value="", units=units)
+        lib_content += generate_kicad_symbol(part, [], symbol_name=name) + "\n"
+    lib_content += ")\n"
+
+    filename = os.path.join(database_folder, f"{database_symbols_lib_name}.kicad_sym")
+    write_transaction_file(transaction, filename, lib_content.encode("utf-8"))
+
+
+def update_parts_database(database_parts, transaction=None):
+    """
+    Brings the sqlite parts database in line with the current parts list. Rows are upserted by LCSC id and
+    parts that are no longer listed are deleted, so a daily stock/price change is a row update rather than
+    a rebuild of the whole file. The tables of libraries that no longer have any parts are dropped. The changes are made to a copy of the database that is renamed over it once
+    they are all in, so KiCad (or an interrupted run) never sees a half updated database.
+
+    :param database_parts: dict of library name -> list of part dicts from generate_database_part.
+    :param transaction: Rename the updated copy over the database when this transaction (see fileTransaction.py)
+                        is committed instead of straight away.
+    :return: dict of library name -> list of attribute columns the table ended up with, for the libraries with parts.
+    """
+    filename = os.path.join(database_folder, database_filename)
+    if os.path.exists(f"{filename}.tmp"):
+        os.remove(f"{filename}.tmp")  # Left over from an interrupted run
+    if os.path.exists(get_transaction_path(transaction, filename)):
+        shutil.copyfile(get_transaction_path(transaction, filename), f"{filename}.tmp")
+    connection = sqlite3.connect(f"{filename}.tmp")
+    table_columns = {}
+
+    with connection:
+        for lib_name, parts in database_parts.items():
+            if len(parts) == 0:
+                continue  # Its table is dropped below
+
+            # sqlite column names are case-insensitive, so attributes are matched on their casefolded name
+            columns = {column.casefold(): (column, sql_type) for column, sql_type in database_columns.items()}
+            rows = []
+            for part in parts:
+                row = {}
+                for key, value in part.items():
+                    if key.casefold() not in columns:
+                        columns[key.casefold()] = (key, "TEXT")
+                    row.setdefault(key.casefold(), value)
+                rows.append(row)
+
+            column_definitions = ", ".join(f'"{column}" {sql_type}' for column, sql_type in columns.values())
+            connection.execute(f'CREATE TABLE IF NOT EXISTS "{lib_name}" ({column_definitions})')
+
+            # Attributes can appear on later runs, add any columns the existing table is missing
+            existing_columns = [row[1] for row in connection.execute(f'PRAGMA table_info("{lib_name}")')]
+            existing_keys = [column.casefold() for column in existing_columns]
+            for key, (column, sql_type) in columns.items():
+                if key not in existing_keys:
+                    connection.execute(f'ALTER TABLE "{lib_name}" ADD COLUMN "{column}" {sql_type}')
+                    existing_columns.append(column)
+                    existing_keys.append(key)
+
+            for column in indexed_columns:
+                connection.execute(f'CREATE INDEX IF NOT EXISTS "idx_{lib_name}_{column}" ON "{lib_name}" ("{column}")')
+
+            column_list = ", ".join(f'"{column}"' for column in existing_columns)
+            placeholders = ", ".join("?" for _ in existing_columns)
+            updates = ", ".join(f'"{column}" = excluded."{column}"' for column in existing_columns if column != "LCSC")
+            connection.executemany(
+                f'INSERT INTO "{lib_name}" ({column_list}) VALUES ({placeholders}) ON CONFLICT("LCSC") DO UPDATE SET {updates}',
+                [[row.get(key) for key in existing_keys] for row in rows],
+            )
+
+            connection.execute(f'CREATE TEMP TABLE "current_lcsc" ("LCSC" TEXT PRIMARY KEY)')
+            connection.executemany(
+                'INSERT OR IGNORE INTO "current_lcsc" VALUES (?)', [(part["LCSC"],) for part in parts]
+            )
+            removed = connection.execute(
+                f'DELETE FROM "{lib_name}" WHERE "LCSC" NOT IN (SELECT "LCSC" FROM "current_lcsc")'
+            ).rowcount
+            connection.execute('DROP TABLE "current_lcsc"')
+            if removed > 0:
+                print(f"Removed {removed} parts from database table {lib_name}")
+
+            table_columns[lib_name] = [column for column in existing_columns if column not in database_columns]
+
+        tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for lib_name in tables:
+            if lib_name not in table_columns:
+                connection.execute(f'DROP TABLE "{lib_name}"')  # Its indexes go with it
+                print(f"Removed database table {lib_name}, the library has no parts any more")
+
+    connection.close()
+    if transaction == None:
+        os.replace(f"{filename}.tmp", filename)
+    else:
+        move_transaction_file(transaction, f"{filename}.tmp", filename)
+    return table_columns
+
+
+def generate_kicad_dbl(table_columns, transaction=None):
+    """
+    Writes the .kicad_dbl descriptor that tells KiCad how to read each parts table.
+
+    :param table_columns: dict of library name -> list of attribute columns (from update_parts_database).
+    :param transaction: Stage the write in this transaction (see fileTransaction.py) instead of writing it straight away.
+    """
+    hidden_fields = [
+        "Datasheet",
+        "Description",
+        "LCSC",
+        "Stock",
+        "Price",
+        "Process",
+        "Minimum Qty",
+        "Attrition Qty",
+        "Class",
+        "Category",
+        "Manufacturer",
+        "Part",
+    ]
+
+    libraries = []
+    for lib_name, attribute_columns in table_columns.items():
+        fields = [
+            {
+                "column": "Value",
+                "name": "Value",
+                "visible_on_add": True,
+                "visible_in_chooser": True,
+                "show_name": False,
+                "inherit_properties": True,
+            }
+        ]
+        for column in hidden_fields + attribute_columns:
+            fields.append(
+                {
+                    "column": column,
+                    "name": column,
+                    "visible_on_add": False,
+                    "visible_in_chooser": column in ["LCSC", "Stock", "Price", "Class"],
+                    "show_name": False,
+                }
+            )
+
+        libraries.append(
+            {
+                "name": f"JLCPCB-{lib_name}",
+                "table": lib_name,
+                "key": "Name",
+                "symbols": "Symbol",
+                "footprints": "Footprint",
+                "fields": fields,
+                "properties": {
+                    "description": "Description",
+                    "keywords": "Keywords",
+                    "footprint_filters": "Footprint Filters",
+                },
+            }
+        )
+
+    dbl = {
+        "meta": {"version": 0},
+        "name": "JLCPCB Database Library",
+        "description": "JLCPCB basic and preferred parts served from an sqlite database",
+        "source": {
+            "type": "odbc",
+            "dsn": "",
+            "username": "",
+            "password": "",
+            "timeout_seconds": 2,
+            "connection_string": f"Driver=SQLite3;Database=${{CWD}}/{database_filename}",
+        },
+        "libraries": libraries,
+    }
+
+    data = json.dumps(dbl, indent=4, ensure_ascii=False) + "\n"
+    write_transaction_file(transaction, os.path.join(database_folder, "JLCPCB-Parts.kicad_dbl"), data.encode("utf-8"))
+
+
+def generate_kicad_database_lib(database_parts, generic_symbols, transaction=None):
+    """
+    Writes the database library output: the sqlite parts database, its .kicad_dbl descriptor and
+    the generic symbols library.
+
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    """
+    os.makedirs(database_folder, exist_ok=True)
+    table_columns = update_parts_database(database_parts, transaction)
+    generate_kicad_dbl(table_columns, transaction)
+    generate_database_symbol_lib(generic_symbols, transaction)
@@ -0,0 +1,209 @@
+# datasheetLinks.py
+# Checks the Datasheet links of the symbols in the libraries still work, e.g.
+#   python libraryCreatorScript.py check-datasheets
+# The links are checked concurrently with asyncio, each request running in a worker thread: at most --concurrency
+# at a time and at most --per-host to the same server, which gets its own Session so its connections are kept open
+# and reused. Each link gets a HEAD request, then a GET if the server doesn't answer the HEAD (plenty of servers
+# reject HEAD with a 403 or 405). Once a server can't be connected to at all, its other links aren't requested.
+# The results are kept in datasheet-links.json:
+#   {"<url>": {"status": 200 (null if there was no response), "error": "...", "checked": <unix time>}}
+# so the next run only checks the links whose result is older than --ttl (broken links are checked again sooner).
+import asyncio
+import json
+import os
+import time
+import urllib.parse
+from kicadSexpr import *  # kicadSexpr.py
+from httpDownload import *  # httpDownload.py
+
+datasheet_links_filename = "datasheet-links.json"
+
+# How long a result is trusted before the link is checked again, in seconds
+datasheet_link_ttl = 7 * 24 * 3600
+broken_datasheet_link_ttl = 24 * 3600
+
+
+def collect_datasheet_links(symbols_folder="JLCPCB-Kicad-Symbols"):
+    """
+    Collects the distinct Datasheet links of every symbol library in a folder.
+
+    :return: dict of url -> list of (symbol name, library filename) of the symbols that link to it.
+    """
+    links = {}
+    for library_filename in sorted(os.listdir(symbols_folder)):
+        if not library_filename.endswith(".kicad_sym"):
+            continue
+        with open(os.path.join(symbols_folder, library_filename), "r", encoding="utf-8") as file:
+            for symbol in iter_sexpr_lists(file.read()):
+                if symbol.head != "symbol":
+                    continue
+                url = get_symbol_property(symbol, "Datasheet", "")
+                if url.startswith("http://") or url.startswith("https://"):
+                    links.setdefault(url, []).append((unquote_sexpr_string(symbol[1]), library_filename))
+    return links
+
+
+def load_datasheet_links_cache(filename=datasheet_links_filename):
+    """Returns the results of earlier runs, empty if there are none yet."""
+    if not os.path.exists(filename):
+        return {}
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except json.JSONDecodeError:
+        print(f"Error: {filename} is not a valid datasheet link cache, every link will be checked")
+        return {}
+
+
+def save_datasheet_links_cache(cache, filename=datasheet_links_filename):
+    with open(filename, "w", encoding="utf-8") as file:
+        json.dump(cache, file, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+def is_datasheet_link_broken(result):
+    return result["status"] == None or result["status"] >= 400
+
+
+def is_datasheet_link_stale(result, now, ttl=datasheet_link_ttl, broken_ttl=broken_datasheet_link_ttl):
+    """Checks whether a link has to be checked again (it never was, or its result is older than the ttl)."""
+    if result == None:
+        return True
+    return now - result["checked"] >= (broken_ttl if is_datasheet_link_broken(result) else ttl)
+
+
+def get_datasheet_host_session(per_host):
+    """Returns a Session for the links of one server, keeping up to per_host connections to it open."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    # pool_block makes a request wait for a free connection instead of opening one more
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=per_host, pool_block=True, max_retries=1)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def is_connect_failure(e):
+    """Checks whether a request failed because the server couldn't be reached (unknown host, refused, timed out)."""
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    reason = getattr(e.args[0], "reason", None) if len(e.args) > 0 else None
+    return isinstance(e, requests.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+
+def request_datasheet_link(session, url):
+    """
+    Checks one link (in a worker thread): a HEAD request, then a GET if the HEAD fails.
+    The GET's body isn't downloaded, the connection is closed as soon as the status is in.
+
+    :return: ({"status": the HTTP status or None, "error": why the link is broken or ""},
+              False if the server couldn't be reached at all).
+    """
+    import requests
+
+    try:
+        response = session.head(url, timeout=download_settings["timeout"], allow_redirects=True)
+        if response.status_code < 400:
+            return {"status": response.status_code, "error": ""}, True
+    except requests.RequestException as e:
+        if is_connect_failure(e):
+            return {"status": None, "error": str(e) or type(e).__name__}, False
+    try:
+        with session.get(url, timeout=download_settings["timeout"], allow_redirects=True, stream=True) as response:
+            error = "" if response.status_code < 400 else response.reason
+            return {"status": response.status_code, "error": error}, True
+    except requests.RequestException as e:
+        return {"status": None, "error": str(e) or type(e).__name__}, not is_connect_failure(e)
+
+
+async def request_datasheet_links(urls, concurrency=32, per_host=4):
+    """
+    Checks links concurrently, see the top of this file.
+
+    :return: dict of url -> result of request_datasheet_link.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    limit = asyncio.Semaphore(concurrency)
+    host_limits = {}
+    host_sessions = {}
+    unreachable_hosts = {}  # host -> the link that found it unreachable
+
+    async def check(url):
+        host = urllib.parse.urlsplit(url).netloc.lower()
+        if host not in host_limits:
+            host_limits[host] = asyncio.Semaphore(per_host)
+            host_sessions[host] = get_datasheet_host_session(per_host)
+        # The host's limit first, so links waiting for a busy server don't hold up the links of other servers
+        async with host_limits[host]:
+            if host in unreachable_hosts:
+                return url, {"status": None, "error": f"{host} couldn't be reached ({unreachable_hosts[host]})"}
+            async with limit:
+                result, reachable = await loop.run_in_executor(
+                    executor, request_datasheet_link, host_sessions[host], url
+                )
+            if not reachable:
+                unreachable_hosts[host] = url
+            return url, result
+
+    results = {}
+    try:
+        for task in asyncio.as_completed([check(url) for url in urls]):
+            url, result = await task
+            results[url] = result
+    finally:
+        executor.shutdown()
+        for session in host_sessions.values():
+            session.close()
+    return results
+
+
+def check_datasheet_links(
+    links,
+    filename=datasheet_links_filename,
+    ttl=datasheet_link_ttl,
+    broken_ttl=broken_datasheet_link_ttl,
+    concurrency=32,
+    per_host=4,
+):
+    """
+    Checks the links whose result in the cache is stale, updates the cache and prints the broken links.
+
+    :param links: The links from collect_datasheet_links.
+    :param filename: The cache file, None to check every link without one.
+    :return: {"links", "checked", "broken", "seconds"} of the run.
+    """
+    cache = load_datasheet_links_cache(filename) if filename != None else {}
+    now = time.time()
+    stale = [url for url in sorted(links) if is_datasheet_link_stale(cache.get(url), now, ttl, broken_ttl)]
+
+    start = time.perf_counter()
+    if len(stale) > 0:
+        for url, result in asyncio.run(request_datasheet_links(stale, concurrency, per_host)).items():
+            cache[url] = {**result, "checked": now}
+    elapsed = time.perf_counter() - start
+
+    # Links no symbol uses anymore are forgotten
+    cache = {url: cache[url] for url in sorted(links)}
+    if filename != None:
+        save_datasheet_links_cache(cache, filename)
+
+    broken = 0
+    for url, result in cache.items():
+        if not is_datasheet_link_broken(result):
+            continue
+        broken += 1
+        reason = f"{result['status']} {result['error']}" if result["status"] != None else result["error"]
+        for symbol_name, library_filename in links[url]:
+            print(f"Broken Datasheet Link For Symbol: {symbol_name} -> {url} ({reason}) ({library_filename})")
+
+    throughput = f", {len(stale) / elapsed:.1f} links/s" if elapsed > 0 and len(stale) > 0 else ""
+    print(
+        f"Datasheet links: {len(links)} links, {len(stale)} checked in {elapsed:.1f}s{throughput}, "
+        f"{len(links) - len(stale)} from the cache, {broken} broken"
+    )
+    return {"links": len(links), "checked": len(stale), "broken": broken, "seconds": elapsed}
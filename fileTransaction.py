@@ -0,0 +1,241 @@
+# fileTransaction.py
+# Makes a run of libraryCreatorScript.py all or nothing: every library write, archive move and removal is staged first
+# and only applied to the tree when the run finishes, so an interrupted run can simply be run again.
+#   - Writes go to a file in the staging folder (.update-staging), moves and removals are only recorded.
+#   - Committing syncs the staged files to disk, writes the journal (update-journal.json) listing every operation
+#     and then applies them all with renames, which are atomic on the same file system.
+#   - recover_transaction() at the start of the next run finishes a commit that was interrupted (the journal exists)
+#     or throws away the staged files of a run that never got to commit (it doesn't).
+# While a transaction is open, reads go through get_transaction_path/list_transaction_dir so the run sees its own
+# staged changes.
+import json
+import os
+import shutil
+
+transaction_journal_filename = "update-journal.json"
+transaction_staging_folder = ".update-staging"
+
+
+def begin_transaction(journal_filename=transaction_journal_filename, staging_folder=transaction_staging_folder):
+    """
+    Starts a transaction, see the top of this file.
+
+    :return: The transaction: {"journal": ..., "staging": ..., "operations": [["write", target, staged file] /
+             ["move", source, target] / ["remove", target]], "view": {path: where its content is now, None if removed},
+             "staged": {target: staged file still safe to overwrite}}.
+    """
+    os.makedirs(staging_folder, exist_ok=True)
+    return {
+        "journal": journal_filename,
+        "staging": staging_folder,
+        "operations": [],
+        "view": {},
+        "staged": {},
+    }
+
+
+def get_transaction_path(transaction, filename):
+    """Returns the file to read for filename, the staged copy if the transaction has written or moved it."""
+    if transaction == None:
+        return filename
+    path = transaction["view"].get(os.path.normpath(filename), filename)
+    if path == None:
+        return filename  # Removed, reading it fails like it would after the commit
+    return path
+
+
+def list_transaction_dir(transaction, folder):
+    """os.listdir of a folder as it will be once the transaction is committed."""
+    filenames = os.listdir(folder) if os.path.isdir(folder) else []
+    if transaction == None:
+        return filenames
+
+    folder = os.path.normpath(folder)
+    removed = set()
+    added = []
+    for path, content in transaction["view"].items():
+        if os.path.dirname(path) == folder:
+            if content == None:
+                removed.add(os.path.basename(path))
+            else:
+                added.append(os.path.basename(path))
+    filenames = [filename for filename in filenames if filename not in removed]
+    return filenames + sorted(set(added) - set(filenames))
+
+
+def write_transaction_file(transaction, filename, data):
+    """
+    Writes bytes to filename, staged until the transaction is committed.
+    Without a transaction the file is written next to filename and renamed over it, so it is never left half written.
+    """
+    if transaction == None:
+        with open(f"{filename}.tmp", "wb") as file:
+            file.write(data)
+        os.replace(f"{filename}.tmp", filename)
+        return
+
+    target = os.path.normpath(filename)
+    staged = transaction["staged"].get(target)
+    if staged == None:
+        # Rewriting a file keeps overwriting the same staged copy until it is moved or removed
+        staged = os.path.join(transaction["staging"], f"{len(transaction['operations'])}")
+        transaction["operations"].append(["write", target, staged])
+        transaction["staged"][target] = staged
+    with open(staged, "wb") as file:
+        file.write(data)
+    transaction["view"][target] = staged
+
+
+def append_transaction_file(transaction, filename, data, offset):
+    """
+    Replaces the end of filename from offset on with data, keeping the bytes in front of it as they are.
+    Staged (or written next to filename and renamed over it) like write_transaction_file, but the kept bytes are
+    copied file to file instead of the caller building the whole file again.
+    """
+    if transaction == None:
+        staged = f"{filename}.tmp"
+        shutil.copyfile(filename, staged)
+    else:
+        target = os.path.normpath(filename)
+        staged = transaction["staged"].get(target)
+        if staged == None:
+            staged = os.path.join(transaction["staging"], f"{len(transaction['operations'])}")
+            shutil.copyfile(get_transaction_path(transaction, filename), staged)
+            transaction["operations"].append(["write", target, staged])
+            transaction["staged"][target] = staged
+            transaction["view"][target] = staged
+    with open(staged, "r+b") as file:
+        file.seek(offset)
+        file.write(data)
+        file.truncate()
+    if transaction == None:
+        os.replace(staged, filename)
+
+
+def move_transaction_file(transaction, source, target):
+    """Moves a file, once the transaction is committed."""
+    if transaction == None:
+        shutil.move(source, target)
+        return
+
+    source = os.path.normpath(source)
+    target = os.path.normpath(target)
+    transaction["operations"].append(["move", source, target])
+    transaction["view"][target] = transaction["view"].get(source, source)
+    transaction["view"][source] = None
+    transaction["staged"].pop(source, None)
+    transaction["staged"].pop(target, None)
+
+
+def remove_transaction_file(transaction, filename):
+    """Deletes a file, once the transaction is committed."""
+    if transaction == None:
+        os.remove(filename)
+        return
+
+    target = os.path.normpath(filename)
+    transaction["operations"].append(["remove", target])
+    transaction["view"][target] = None
+    transaction["staged"].pop(target, None)
+
+
+def apply_transaction_operations(operations):
+    """Applies journaled operations to the tree. Operations already applied by an interrupted commit are skipped."""
+    for operation in operations:
+        if operation[0] == "write":
+            _, target, staged = operation
+            if os.path.exists(staged):
+                os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                os.replace(staged, target)
+        elif operation[0] == "move":
+            _, source, target = operation
+            if os.path.exists(source):
+                os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                os.replace(source, target)
+        elif operation[0] == "remove":
+            if os.path.exists(operation[1]):
+                os.remove(operation[1])
+
+
+def commit_transaction(transaction):
+    """Applies everything staged in the transaction to the tree, see the top of this file."""
+    # Every staged file is synced once, however many times it was rewritten
+    for operation in transaction["operations"]:
+        if operation[0] == "write":
+            staged = operation[2]
+            with open(staged, "rb+") as file:
+                os.fsync(file.fileno())
+
+    with open(f"{transaction['journal']}.tmp", "w") as file:
+        json.dump({"operations": transaction["operations"]}, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(f"{transaction['journal']}.tmp", transaction["journal"])
+
+    apply_transaction_operations(transaction["operations"])
+
+    os.remove(transaction["journal"])
+    shutil.rmtree(transaction["staging"], ignore_errors=True)
+    transaction["operations"] = []
+    transaction["view"] = {}
+    transaction["staged"] = {}
+
+
+def rollback_transaction(transaction):
+    """Throws away everything staged in the transaction, the tree is left as it was when it began."""
+    shutil.rmtree(transaction["staging"], ignore_errors=True)
+    transaction["operations"] = []
+    transaction["view"] = {}
+    transaction["staged"] = {}
+
+
+def checkpoint_transaction(transaction):
+    """
+    Returns what needs saving to carry on with the transaction after the process exits (see resume_transaction).
+    Files written from here on get new staged copies, so the ones the checkpoint refers to are never changed.
+    """
+    transaction["staged"] = {}
+    return {"operations": transaction["operations"], "view": transaction["view"]}
+
+
+def resume_transaction(
+    checkpoint, journal_filename=transaction_journal_filename, staging_folder=transaction_staging_folder
+):
+    """
+    Reopens a transaction from checkpoint_transaction, or returns None if its staged files are gone
+    (recover_transaction has cleaned them up or it was committed).
+    """
+    if not os.path.isdir(staging_folder) or os.path.exists(journal_filename):
+        return None
+    for operation in checkpoint["operations"]:
+        if operation[0] == "write" and not os.path.exists(operation[2]):
+            return None
+    transaction = begin_transaction(journal_filename, staging_folder)
+    transaction["operations"] = checkpoint["operations"]
+    transaction["view"] = checkpoint["view"]
+    return transaction
+
+
+def recover_transaction(journal_filename=transaction_journal_filename, staging_folder=transaction_staging_folder):
+    """
+    Cleans up after an interrupted run: finishes its commit if the journal was written, otherwise discards its staged files.
+
+    :return: "committed", "rolled back" or None if the last run wasn't interrupted.
+    """
+    if os.path.exists(journal_filename):
+        # The journal is only renamed into place once it is complete, so it can always be finished
+        with open(journal_filename, "r") as file:
+            operations = json.load(file)["operations"]
+        apply_transaction_operations(operations)
+        os.remove(journal_filename)
+        shutil.rmtree(staging_folder, ignore_errors=True)
+        print(f"Finished the interrupted update in {journal_filename} ({len(operations)} operations)")
+        return "committed"
+
+    if os.path.exists(f"{journal_filename}.tmp"):
+        os.remove(f"{journal_filename}.tmp")
+    if os.path.isdir(staging_folder):
+        shutil.rmtree(staging_folder)
+        print(f"Discarded the staged files of an interrupted update ({staging_folder})")
+        return "rolled back"
+    return None
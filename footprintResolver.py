@@ -0,0 +1,95 @@
+# footprintResolver.py
+# Works out which footprint the symbol of each auto-generated part links to, before the symbols are rendered:
+#   package_name_replacements  Fixes applied to the parts list's package names as they are read (see iter_parts)
+#   footprint_package_names    Packages whose footprint is named after a different package, e.g. SOT-23-3 -> SOT-23
+# resolve_footprints then looks each distinct footprint up once in the set of footprint files, so a part whose
+# footprint doesn't exist is listed (or left out) when the libraries are generated, not only by the check stage.
+import os
+from fileTransaction import *  # fileTransaction.py
+
+footprints_folder = "JLCPCB-Kicad-Footprints"
+archived_footprints_folder = os.path.join("Archived-Symbols-Footprints", footprints_folder)
+
+# Substrings replaced in every package name of the parts list
+package_name_replacements = {
+    "插件": "Plugin",  # Some through-hole parts use the prefix Plugin, some the chinese equivalent
+}
+
+# Package name -> the package its footprint (and transistor symbol names) are named after
+footprint_package_names = {
+    "SMA(DO-214AC)": "SMA",
+    "SMB(DO-214AA)": "SMB",
+    "SOT-23-3": "SOT-23",
+    "SOT-23-3L": "SOT-23",
+    "SOT-89-3": "SOT-89",
+}
+
+
+def normalize_package_names(packages):
+    """
+    Applies package_name_replacements to a parts list's package column.
+    The column is categorical, so each distinct package name is only fixed once however many parts use it.
+
+    :param packages: The package column (a Series).
+    :return: The fixed column.
+    """
+    if packages.dtype.name != "category":
+        packages = packages.astype("category")
+    names = packages.cat.categories
+    fixed_names = names.astype(str)
+    for old, new in package_name_replacements.items():
+        fixed_names = fixed_names.str.replace(old, new, regex=False)
+    if (fixed_names == names).all():
+        return packages
+    return packages.map(dict(zip(names, fixed_names)))
+
+
+def get_footprint_package(footprint):
+    return footprint_package_names.get(footprint, footprint)
+
+
+def get_footprint_name(ref_designator, footprint):
+    """Returns the name of a part's footprint file in JLCPCB-Kicad-Footprints (without .kicad_mod), e.g. R_0402."""
+    return f"{ref_designator}_{get_footprint_package(footprint)}"
+
+
+def load_footprints_lookup(transaction=None):
+    """
+    Returns the set of footprint names the symbols can link to, the footprints in JLCPCB-Kicad-Footprints and the
+    archived ones (the check stage moves an archived footprint back once a symbol uses it again).
+    """
+    footprints_lookup = set()
+    for folder in [footprints_folder, archived_footprints_folder]:
+        for filename in list_transaction_dir(transaction, folder):
+            if filename.endswith(".kicad_mod"):
+                footprints_lookup.add(os.path.splitext(filename)[0])
+    return footprints_lookup
+
+
+def resolve_footprints(named_parts, footprints_lookup, reject=False):
+    """
+    Checks the footprint of every part exists, looking each distinct footprint up only once, and lists the
+    footprints that don't with the parts that use them.
+
+    :param named_parts: list of (footprint name, part) of the parts about to be rendered, see get_footprint_name.
+    :param footprints_lookup: The footprint names that exist, see load_footprints_lookup.
+    :param reject: Leave the parts whose footprint doesn't exist out instead of just listing them.
+    :return: (the parts to render, dict of missing footprint name -> LCSC ids of the parts using it).
+    """
+    found = {}
+    missing = {}
+    parts = []
+    for footprint_name, part in named_parts:
+        if footprint_name not in found:
+            found[footprint_name] = footprint_name in footprints_lookup
+        if not found[footprint_name]:
+            missing.setdefault(footprint_name, []).append(f"C{part.lcsc}")
+            if reject:
+                continue
+        parts.append(part)
+
+    for footprint_name, lcsc_ids in sorted(missing.items()):
+        more = f" and {len(lcsc_ids) - 5} more" if len(lcsc_ids) > 5 else ""
+        left_out = ", left out" if reject else ""
+        print(f"Missing Footprint For Parts: {footprint_name} -> {', '.join(lcsc_ids[:5])}{more}{left_out}")
+    return parts, missing
@@ -1,133 +1,240 @@
 # handmadeLibrarySymbols.py
 import os
-import pandas as pd
 import re
+from kicadSexpr import *  # kicadSexpr.py
+from symbolIndex import *  # symbolIndex.py
+from partsCsv import *  # partsCsv.py
+from symbolArchive import *  # symbolArchive.py
+
+handmade_library_names = [
+    "Analog",
+    "Connectors_Buttons",
+    "Crystals",
+    "Diode-Packages",
+    "Display-Drivers",
+    "ICs",
+    "Interface",
+    "Memory",
+    "MCUs",
+    "Optocouplers",
+    "Power",
+    "Transformers",
+    "Transistor-Packages",
+]
 
 
 def generate_property(property, value):
-    str = f"""\t\t(property "{property}" "{value}"\n\t\t\t(at 0 0 0)\n\t\t\t(effects\n\t\t\t\t(font\n\t\t\t\t\t(size 1.27 1.27)\n\t\t\t\t)\n\t\t\t\t(hide yes)\n\t\t\t)\n\t\t)\n"""
+    str = f"""\t\t(property {quote_sexpr_string(property)} {quote_sexpr_string(value)}\n\t\t\t(at 0 0 0)\n\t\t\t(effects\n\t\t\t\t(font\n\t\t\t\t\t(size 1.27 1.27)\n\t\t\t\t)\n\t\t\t\t(hide yes)\n\t\t\t)\n\t\t)\n"""
     return str
 
 
-def update_component_inplace(lcsc, libraryName, properties):
-    filename = os.path.join("JLCPCB-Kicad-Symbols", f"JLCPCB-{libraryName}.kicad_sym")
-    with open(filename, "r") as file:
-        lines = file.readlines()
-
-    lcsc_found = False
-    properties_found = {prop: False for prop in properties.keys()}
-
-    for i, line in enumerate(lines):
-        if lcsc_found == False:
-            if f'(property "LCSC" "C{lcsc}"' in line:
-                lcsc_found = True
-                line_offset = 1
-                # print(f"Found {lcsc} on line {i} of {filename}")
-                # Work Upwards to find datasheet
-                if "datasheet" in properties or "description" in properties:
-                    while ("(symbol" not in lines[i - line_offset]) and (line_offset < 30):
-                        if '(property "Datasheet"' in lines[i - line_offset] and "datasheet" in properties:
-                            lines[i - line_offset] = f'		(property "Datasheet" "{properties["datasheet"]}"\n'
-                            properties_found["datasheet"] = True
-                        elif '(property "Description"' in lines[i - line_offset] and "description" in properties:
-                            lines[i - line_offset] = f'		(property "Description" "{properties["description"]}"\n'
-                            properties_found["description"] = True
-                        line_offset += 1
-
-        else:
-            if '(property "ki_keywords"' in line:
-                keywords_index = i
-
-            elif "(property " in line:
-                for prop, found in properties_found.items():
-                    if f'(property "{prop.title()}"' in line:
-                        if not found and prop != "datasheet" and prop != "description":
-                            lines[i] = f'\t\t(property "{prop.title()}" "{properties[prop]}"\n'
-                            properties_found[prop] = True
-
-            elif "(symbol" in line:
-                for prop, found in properties_found.items():
-                    if not found and prop != "datasheet" and prop != "description":
-                        lines.insert(keywords_index, generate_property(prop.title(), properties[prop]))
-                break
-
-    if lcsc_found == False:
-        archived_symbol_path = os.path.join("Archived-Symbols-Footprints", "JLCPCB-Kicad-Symbols")
-        archived_symbols_lcsc = [
-            os.path.splitext(filename)[0]
-            for filename in os.listdir(archived_symbol_path)
-            if filename.endswith(".kicad_sym")
-        ]
-        if f"{lcsc}" in archived_symbols_lcsc:
-            print(
-                f"Error: C{lcsc} not found in library {filename} but it was found in the archive folder: {archived_symbol_path}"
-            )
+def get_insert_position(symbol_text, node):
+    # Insert in front of the line the node starts on, or right in front of it if the symbol is all on one line
+    line_start = symbol_text.rfind("\n", 0, node.start) + 1
+    if line_start == 0:
+        return node.start
+    return line_start
+
+
+def load_handmade_library(libraries, libraryName, transaction=None):
+    """
+    Returns a handmade library's contents and index, reading them the first time the library is asked for.
+    Edits are made to the returned dict and written by save_handmade_libraries, so a build that updates
+    hundreds of parts writes each library (and its index) once.
+
+    :param libraries: dict of the libraries loaded so far (start with {}), the library is added to it.
+    :return: {"filename", "data": library bytes, "index", "changed": data changed, "index-changed": index changed}
+    """
+    if libraryName not in libraries:
+        filename = os.path.join("JLCPCB-Kicad-Symbols", f"JLCPCB-{libraryName}.kicad_sym")
+        with open(get_transaction_path(transaction, filename), "rb") as file:
+            data = file.read()
+        libraries[libraryName] = {
+            "filename": filename,
+            "data": data,
+            "index": read_symbol_index(filename, transaction),
+            "changed": False,
+            "index-changed": False,
+        }
+    return libraries[libraryName]
+
+
+def save_handmade_libraries(libraries, transaction=None):
+    """
+    Writes the handmade libraries (and indexes) load_handmade_library loaded that were changed since.
+
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    """
+    for library in libraries.values():
+        if library["changed"]:
+            write_transaction_file(transaction, library["filename"], library["data"])
+        if library["changed"] or library["index-changed"]:
+            write_symbol_index(library["filename"], library["index"], transaction)
+        library["changed"] = False
+        library["index-changed"] = False
+
+
+def update_component_inplace(part, libraryName, include_datasheet=True, archive=None, transaction=None, libraries=None):
+    """
+    Updates the stock, price etc. of a part's symbol in a handmade library, adding any attributes it is missing.
+    A part that isn't in the library but is in the archive (it is back in stock) is restored to the library.
+
+    :param part: The Part (see partRecord.py).
+    :param include_datasheet: False to keep the datasheet and description already in the symbol.
+    :param archive: The archive from load_symbol_archive, loaded (and saved) just for this part if not given.
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    :param libraries: The libraries loaded so far (see load_handmade_library), the edit is kept in them until
+                      save_handmade_libraries. The library is read and written just for this part if not given.
+    :return: True if the symbol was found and updated.
+    """
+    if libraries == None:
+        part_libraries = {}
+    else:
+        part_libraries = libraries
+    library = load_handmade_library(part_libraries, libraryName, transaction)
+    updated = update_library_component(part, library, include_datasheet, archive, transaction)
+    if libraries == None:
+        save_handmade_libraries(part_libraries, transaction)
+    return updated
+
+
+def update_library_component(part, library, include_datasheet, archive, transaction):
+    lcsc = part.lcsc
+    properties = part.get_component_properties(include_datasheet)
+    filename = library["filename"]
+    data = library["data"]
+
+    # Seek straight to the symbol with the sidecar index, only scanning the library if the index is missing or out of date
+    index = library["index"]
+    found = find_indexed_symbol(index, data, lcsc=f"C{lcsc}")
+    if found == None and (index == None or f"C{lcsc}" in index["lcsc"]):
+        index = build_symbol_index(data)
+        library["index"] = index
+        library["index-changed"] = True
+        found = find_indexed_symbol(index, data, lcsc=f"C{lcsc}")
+
+    if found == None:
+        if archive == None:
+            part_archive = load_symbol_archive()
         else:
+            part_archive = archive
+        archived_symbol = restore_archived_symbol(part_archive, f"C{lcsc}")
+        if archived_symbol == None:
             print(f"Error: https://jlcpcb.com/parts/componentSearch?searchTxt=c{lcsc} not found in library {filename}")
-        return False
-    else:
-        with open(filename, "w") as file:
-            file.writelines(lines)
-            return True
-
-
-symbol_header_lines = """(kicad_symbol_lib
-    (version 20231120)
-    (generator "CDFER_Archive_Tool")
-    (generator_version "0.0")
- """
-
-symbol_footer_lines = """)
-"""
+            return False
+
+        # Put the symbol back in front of the library's closing bracket
+        insert_at = data.rfind(b"\n", 0, data.rstrip().rfind(b")")) + 1
+        data = data[:insert_at] + b"\t" + archived_symbol.encode("utf-8") + b"\n" + data[insert_at:]
+        index = build_symbol_index(data)
+        library["data"] = data
+        library["index"] = index
+        library["changed"] = True
+        found = find_indexed_symbol(index, data, lcsc=f"C{lcsc}")
+        print(f"Restored C{lcsc} from the archive to {filename}")
+        if archive == None:
+            save_symbol_archive(part_archive, transaction)
+
+    name, offset, length = found
+    symbol_text = data[offset : offset + length].decode("utf-8")
+    symbol = parse_sexpr(symbol_text)[0]
+
+    edits = []
+    missing_properties = ""
+    for prop, value in properties.items():
+        property = find_symbol_property(symbol, prop.title())
+        if property != None:
+            # Only the value is replaced, the rest of the symbol keeps its layout
+            value_start, value_end = get_sexpr_atom_offset(symbol_text, property, 2)
+            edits.append((value_start, value_end, quote_sexpr_string(value)))
+        elif prop != "datasheet" and prop != "description":
+            missing_properties += generate_property(prop.title(), value)
+
+    if missing_properties != "":
+        # New properties go in front of ki_keywords (or the symbol's units if it has no keywords)
+        anchor = find_symbol_property(symbol, "ki_keywords")
+        if anchor == None:
+            anchor = find_sexpr_child(symbol, "symbol")
+        if anchor != None:
+            insert_at = get_insert_position(symbol_text, anchor)
+        else:
+            insert_at = symbol_text.rfind("\n", 0, symbol.end) + 1 or symbol.end - 1
+        edits.append((insert_at, insert_at, missing_properties))
 
+    new_block = apply_text_edits(symbol_text, edits).encode("utf-8")
+    replace_indexed_symbol(index, name, offset, length, new_block)
 
-def create_archived_symbol_file(symbol_start_line, symbol_end_line, lines, lcsc):
-    archived_symbols_folder = os.path.join("Archived-Symbols-Footprints", "JLCPCB-Kicad-Symbols")
-    archived_symbol_lines = lines[symbol_start_line:symbol_end_line]
+    library["data"] = data[:offset] + new_block + data[offset + length :]
+    library["changed"] = True
+    return True
 
-    # Write archived symbol to file
-    archived_filename = os.path.join(archived_symbols_folder, f"{lcsc}.kicad_sym")
-    with open(archived_filename, "w") as archived_file:
-        archived_file.writelines(symbol_header_lines)
-        archived_file.writelines(archived_symbol_lines)
-        archived_file.writelines(symbol_footer_lines)
-    print(f"Archived symbol as: {archived_filename}")
 
+def update_library_stock_inplace(libraryName, lcsc_in_stock=None, archive=None, transaction=None):
+    """
+    Moves the symbols of parts that are no longer in the parts list from a handmade library to the archive.
 
-def update_library_stock_inplace(libraryName):
-    df = pd.read_csv("jlcpcb-components-basic-preferred.csv")
+    :param lcsc_in_stock: set of the LCSC ids in the parts list, read from the parts list if not given.
+    :param archive: The archive from load_symbol_archive, loaded (and saved) just for this library if not given.
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    """
+    if lcsc_in_stock == None:
+        lcsc_in_stock = read_parts_lcsc_ids()
+    if archive == None:
+        library_archive = load_symbol_archive()
+    else:
+        library_archive = archive
     filename = os.path.join("JLCPCB-Kicad-Symbols", f"JLCPCB-{libraryName}.kicad_sym")
-    with open(filename, "r") as file:
-        lines = file.readlines()
-
-    no_stock = False
-    lcsc = 0
-    symbol_start_line = 0
-
-    for i, line in enumerate(lines):
-        lines[i] = lines[i].replace("℃", "°C")
-        if line.startswith("\t(") or line.startswith(")"):
-            if no_stock == True:
-                create_archived_symbol_file(symbol_start_line, i, lines, lcsc)
-                lines[symbol_start_line:i] = [""] * (
-                    i - symbol_start_line
-                )  # Remove symbol from library by replacing lines with empty strings
-                no_stock = False
-            symbol_start_line = i
-
-        elif '(property "LCSC" "C' in line:
-            # print(f"LCSC Found on line {i} {line}")
-            numbers = [int(num) for num in re.findall("\\d+", line)]
-            lcsc = numbers[0]
-
-            rows = df[df["lcsc"] == lcsc]
-            if len(rows) == 0:
-                no_stock = True
-                print(f"Error: No Stock found for https://jlcpcb.com/partdetail/C{lcsc}")
-
-        elif '(property "Stock"' in line and no_stock == True:
-            lines[i] = f'		(property "Stock" "0"\n'
-
-    with open(filename, "w") as file:
-        file.writelines(lines)
-        return
+    with open(get_transaction_path(transaction, filename), "r") as file:
+        text = file.read().replace("℃", "°C")
+
+    edits = []
+    for symbol in iter_sexpr_lists(text):
+        lcsc_value = get_symbol_property(symbol, "LCSC", "")
+        if symbol.head != "symbol" or not lcsc_value.startswith("C"):
+            continue
+
+        numbers = [int(num) for num in re.findall("\\d+", lcsc_value)]
+        if len(numbers) == 0:
+            continue
+        lcsc = numbers[0]
+
+        if lcsc not in lcsc_in_stock:
+            print(f"Error: No Stock found for https://jlcpcb.com/partdetail/C{lcsc}")
+            symbol_edits = []
+            stock = find_symbol_property(symbol, "Stock")
+            if stock != None:
+                stock_start, stock_end = get_sexpr_atom_offset(text, stock, 2)
+                symbol_edits.append((stock_start - symbol.start, stock_end - symbol.start, '"0"'))
+            archive_symbol(library_archive, f"C{lcsc}", apply_text_edits(text[symbol.start : symbol.end], symbol_edits))
+            print(f"Archived C{lcsc} in {library_archive['filename']}")
+            symbol_start, symbol_end = get_line_span(text, symbol)
+            edits.append((symbol_start, symbol_end, ""))  # Remove symbol from library
+
+    write_transaction_file(transaction, filename, apply_text_edits(text, edits).encode("utf-8"))
+    write_symbol_index(filename, transaction=transaction)
+    if archive == None:
+        save_symbol_archive(library_archive, transaction)
+
+
+def archive_dropped_symbols(lcsc_in_stock=None, transaction=None, dropped=None):
+    """
+    Moves the symbols of parts that are no longer in the parts list from every handmade library to the archive.
+
+    :param lcsc_in_stock: set of the LCSC ids in the parts list, read from the parts list if not given.
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    :param dropped: The LCSC ids that dropped out of the parts list since the last run (see partsDelta.py), if known.
+                    Only the libraries whose index has one of them are read then.
+    :return: The LCSC ids (e.g. "C1234") of the symbols that were archived.
+    """
+    if lcsc_in_stock == None:
+        lcsc_in_stock = read_parts_lcsc_ids()
+    symbol_archive = load_symbol_archive(transaction=transaction)
+    for library_name in handmade_library_names:
+        if dropped != None:
+            filename = os.path.join("JLCPCB-Kicad-Symbols", f"JLCPCB-{library_name}.kicad_sym")
+            index = read_symbol_index(filename, transaction)
+            if index != None and not any(f"C{lcsc}" in index["lcsc"] for lcsc in dropped):
+                continue
+        update_library_stock_inplace(library_name, lcsc_in_stock, symbol_archive, transaction)
+    save_symbol_archive(symbol_archive, transaction)
+    return symbol_archive["archived"]
@@ -0,0 +1,171 @@
+# httpDownload.py
+# Downloads that survive a flaky connection:
+#   - Every download shares one requests Session, so the connection to the server is kept open and reused.
+#   - A request that fails to connect, times out or gets a server error (429/5xx) is retried with exponential backoff.
+#   - A download that breaks off part way carries on from the last byte received with a Range request, also in the
+#     next run: the bytes received so far are kept in <filename>.part and the server's validator (ETag or
+#     Last-Modified, so a file that has changed since isn't resumed) in <filename>.part.json.
+#   - The size of the finished file is checked against what the server said it would be before it replaces <filename>.
+# requests is imported on first use, so importing this module stays cheap.
+import json
+import os
+import time
+
+# How downloads behave, the commands that download can change them (--timeout, --retries)
+download_settings = {
+    "timeout": 30.0,  # Seconds to wait for the server to accept the connection or send the next bytes
+    "retries": 5,  # Times to retry a failed request, or to resume a download that broke off, before giving up
+    "backoff": 1.0,  # Seconds to wait before the first retry, doubling for each retry after it
+}
+
+# Sessions made by get_download_session, by (retries, backoff)
+download_sessions = {}
+
+
+def get_download_session():
+    """Returns the Session downloads share, retrying failed requests as download_settings says."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    key = (download_settings["retries"], download_settings["backoff"])
+    if key not in download_sessions:
+        retry = Retry(
+            total=download_settings["retries"],
+            backoff_factor=download_settings["backoff"],
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["HEAD", "GET"],
+            raise_on_status=False,  # The last response is returned and raise_for_status reports it
+        )
+        session = requests.Session()
+        session.mount("http://", HTTPAdapter(max_retries=retry))
+        session.mount("https://", HTTPAdapter(max_retries=retry))
+        download_sessions[key] = session
+    return download_sessions[key]
+
+
+def url_exists(url):
+    """Checks whether the server has a file (a HEAD request, on the shared connection)."""
+    response = get_download_session().head(url, timeout=download_settings["timeout"], allow_redirects=True)
+    return response.status_code == 200
+
+
+def get_download_validator(response):
+    """Returns what identifies this version of the file for If-Range (a strong ETag, else Last-Modified), or None."""
+    etag = response.headers.get("ETag")
+    if etag != None and not etag.startswith("W/"):
+        return etag
+    return response.headers.get("Last-Modified")
+
+
+def get_download_size(response):
+    """Returns the size of the whole file the response is (part of), or None if the server didn't say."""
+    content_range = response.headers.get("Content-Range", "")
+    if response.status_code == 206 and "/" in content_range and not content_range.endswith("/*"):
+        return int(content_range.rsplit("/", 1)[1])
+    if response.status_code == 200 and response.headers.get("Content-Encoding", "identity") == "identity":
+        length = response.headers.get("Content-Length")
+        return int(length) if length != None else None
+    return None  # Compressed on the fly, Content-Length is the compressed size
+
+
+def iter_resumable_download(url, filename, stats=None):
+    """
+    Yields the bytes of url as they arrive, saving them to filename (see the top of this file).
+    Bytes kept from an earlier, interrupted download of the same file are yielded first.
+
+    :param stats: dict that gets the "transferred" (bytes received over the network, before any Content-Encoding is
+                  decoded), "resumed_from" (bytes already there from an earlier run), "retries" and "encoding" (the
+                  Content-Encoding requests decoded the bytes from, "identity" if none) of the download.
+    """
+    import requests
+
+    part_filename = f"{filename}.part"
+    state_filename = f"{filename}.part.json"
+    if stats == None:
+        stats = {}
+    stats.update({"transferred": 0, "resumed_from": 0, "retries": 0, "encoding": "identity"})
+
+    received = 0  # Bytes in the .part file
+    yielded = 0  # Bytes handed to the caller
+    validator = None
+    size = None
+    if os.path.exists(part_filename) and os.path.exists(state_filename):
+        try:
+            with open(state_filename, "r") as file:
+                state = json.load(file)
+            if state.get("url") == url and state.get("validator") != None:
+                received = os.path.getsize(part_filename)
+                validator = state["validator"]
+                size = state.get("size")
+                stats["encoding"] = state.get("encoding", "identity")
+        except json.JSONDecodeError:
+            pass
+
+    while True:
+        headers = {}
+        if received > 0:
+            # Ranges are byte offsets into the file itself, so it mustn't be compressed on the fly
+            headers = {"Range": f"bytes={received}-", "If-Range": validator, "Accept-Encoding": "identity"}
+        response = get_download_session().get(url, headers=headers, stream=True, timeout=download_settings["timeout"])
+        response.raise_for_status()
+
+        skip = 0
+        if received > 0 and response.status_code != 206:
+            if yielded > 0 and get_download_validator(response) == validator:
+                skip = received  # The server ignores Range, read past what was already received
+            elif yielded > 0:
+                response.close()
+                raise requests.RequestException(f"{url} changed while it was being downloaded, run again")
+            else:
+                # The server can't resume it or the file has changed since, start again from the beginning
+                received = 0
+                print(f"Can't resume {url}, downloading it again")
+        if received == 0:
+            validator = get_download_validator(response)
+            size = get_download_size(response)
+            stats["encoding"] = response.headers.get("Content-Encoding", "identity")
+            with open(part_filename, "wb"):
+                pass
+            with open(state_filename, "w") as file:
+                json.dump({"url": url, "validator": validator, "size": size, "encoding": stats["encoding"]}, file)
+        elif yielded == 0 and skip == 0:
+            stats["resumed_from"] = received
+            print(f"Resuming {url} from byte {received:,}")
+
+        with open(part_filename, "ab") as file:
+            if yielded < received:
+                # What an earlier run received, now that it's certain the rest follows on from it
+                with open(part_filename, "rb") as kept:
+                    while yielded < received:
+                        chunk = kept.read(min(64 * 1024, received - yielded))
+                        yielded += len(chunk)
+                        yield chunk
+            try:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if skip > 0:
+                        skipped = min(skip, len(chunk))
+                        chunk = chunk[skipped:]
+                        skip -= skipped
+                    file.write(chunk)
+                    received += len(chunk)
+                    yielded = received
+                    yield chunk
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                if validator == None or stats["retries"] >= download_settings["retries"]:
+                    raise
+                delay = download_settings["backoff"] * 2 ** stats["retries"]
+                stats["retries"] += 1
+                print(f"Download of {url} broke off after {received:,} bytes ({e}), resuming in {delay:.0f}s")
+                time.sleep(delay)
+            finally:
+                stats["transferred"] += response.raw.tell()
+                response.close()
+
+    if size != None and received != size:
+        os.remove(part_filename)
+        os.remove(state_filename)
+        raise requests.RequestException(f"{url} should be {size:,} bytes but {received:,} were received")
+    os.replace(part_filename, filename)
+    os.remove(state_filename)
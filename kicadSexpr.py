@@ -0,0 +1,252 @@
+# kicadSexpr.py
+# Tokenizer, parser and serializer for the s-expression subset used by KiCad files (.kicad_sym, .kicad_mod, .kicad_sch)
+import re
+
+# Quoted strings (with escapes), brackets and bare atoms of a KiCad s-expression
+sexpr_token_pattern = re.compile(r'"(?:[^"\\]|\\.)*"|\(|\)|[^\s()"]+')
+
+# Only the tokens that change the nesting depth (strings are matched so brackets inside them are skipped)
+sexpr_bracket_pattern = re.compile(r'"(?:[^"\\]|\\.)*"|[()]')
+
+# Width after which the KiCad editors wrap a list of (xy ...) points onto a new line
+pts_line_width = 99
+
+
+class SExpr(list):
+    """
+    A parsed (list ...). Children are SExpr nodes or atoms, atoms are kept exactly as they appear in the
+    file (quoted strings keep their quotes and escapes) so nothing is lost on the way back out.
+    start/end are the offsets of the opening and just past the closing bracket in the parsed text,
+    which lets callers splice edits into the original text without reformatting anything else.
+    """
+
+    __slots__ = ("start", "end")
+
+    def __init__(self, children=(), start=None, end=None):
+        super().__init__(children)
+        self.start = start
+        self.end = end
+
+    @property
+    def head(self):
+        if len(self) > 0 and type(self[0]) == str:
+            return self[0]
+        return None
+
+
+def tokenize_sexpr(text):
+    return sexpr_token_pattern.findall(text)
+
+
+def iter_sexpr_events(text):
+    """
+    Streams a file as (kind, depth, token, offset) events without building a tree.
+    kind is "open", "atom" or "close", depth is the depth of the enclosing list (1 for the file's root list).
+    offset is where the token starts, except for "close" where it is just past the bracket.
+    """
+    depth = 0
+    for match in sexpr_token_pattern.finditer(text):
+        token = match.group()
+        if token == "(":
+            depth += 1
+            yield ("open", depth, token, match.start())
+        elif token == ")":
+            yield ("close", depth, token, match.end())
+            depth -= 1
+        else:
+            yield ("atom", depth, token, match.start())
+
+
+def parse_sexpr(text, start=0, end=None):
+    """
+    Parses the text (or the text[start:end] slice, offsets stay relative to the whole text) into a tree.
+    Returns a root SExpr holding the top level lists
+    (for a KiCad file that is just the one (kicad_symbol_lib ...) / (footprint ...) list).
+    """
+    if end == None:
+        end = len(text)
+    root = SExpr(start=start, end=end)
+    stack = [root]
+    for match in sexpr_token_pattern.finditer(text, start, end):
+        token = match.group()
+        if token == "(":
+            node = SExpr(start=match.start())
+            stack[-1].append(node)
+            stack.append(node)
+        elif token == ")":
+            if len(stack) == 1:
+                raise ValueError(f"Unexpected ')' at offset {match.start()}")
+            stack.pop().end = match.end()
+        else:
+            stack[-1].append(token)
+    if len(stack) != 1:
+        raise ValueError(f"Missing ')' for the list opened at offset {stack[-1].start}")
+    return root
+
+
+def iter_sexpr_lists(text, depth=2):
+    """
+    Yields every list at the given depth as its own tree, one at a time, so only one of them is in memory.
+    depth=2 gives the children of the file's root list, e.g. each (symbol ...) of a .kicad_sym file.
+    """
+    stack = []
+    level = 0
+    for match in sexpr_token_pattern.finditer(text):
+        token = match.group()
+        if token == "(":
+            level += 1
+            if level >= depth:
+                node = SExpr(start=match.start())
+                if len(stack) > 0:
+                    stack[-1].append(node)
+                stack.append(node)
+        elif token == ")":
+            if level >= depth:
+                node = stack.pop()
+                node.end = match.end()
+                if level == depth:
+                    yield node
+            level -= 1
+        elif level >= depth:
+            stack[-1].append(token)
+
+
+def iter_sexpr_spans(text, depth=2):
+    """
+    Yields the (start, end) offsets of every list at the given depth without parsing their contents,
+    which is several times faster than iter_sexpr_lists when only a few of them are of interest.
+    """
+    level = 0
+    for match in sexpr_bracket_pattern.finditer(text):
+        token = match.group()
+        if token == "(":
+            level += 1
+            if level == depth:
+                start = match.start()
+        elif token == ")":
+            if level == depth:
+                yield start, match.end()
+            level -= 1
+
+
+def dump_sexpr(node, pretty=True, indent=0):
+    """
+    Serializes a tree back to text. pretty=True writes something close to the layout of the KiCad 8 editors
+    (one list per line, tab indented, (xy ...) points kept together), pretty=False writes the whole list on one line.
+    Use the start/end offsets with apply_text_edits instead to edit a file without touching its layout.
+    parse_sexpr(dump_sexpr(tree))[0] == tree for any tree.
+    """
+    if type(node) == str:
+        return node
+
+    if pretty == False:
+        return "(" + " ".join(dump_sexpr(child, False) for child in node) + ")"
+
+    if all(type(child) == str for child in node):
+        return "(" + " ".join(node) + ")"
+
+    child_indent = "\n" + "\t" * (indent + 1)
+    text = "("
+    previous = "("
+    line_length = 0
+    for child in node:
+        if type(child) == str:
+            text += child if previous == "(" else " " + child
+        elif node.head == "pts" and type(previous) != str:
+            # KiCad keeps points on one line and wraps them once the line gets long
+            point = dump_sexpr(child, True, indent + 1)
+            if line_length + len(point) + 1 > pts_line_width:
+                text += child_indent + point
+                line_length = indent + 1 + len(point)
+            else:
+                text += " " + point
+                line_length += len(point) + 1
+        else:
+            text += child_indent + dump_sexpr(child, True, indent + 1)
+            line_length = len(text) - text.rfind("\n") - 1
+        previous = child
+    return text + "\n" + "\t" * indent + ")"
+
+
+def dump_sexpr_document(root, pretty=True):
+    """Serializes the root returned by parse_sexpr, one top level list per line like a KiCad file."""
+    return "".join(dump_sexpr(child, pretty) + "\n" for child in root)
+
+
+def quote_sexpr_string(value):
+    value = f"{value}".replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{value}"'
+
+
+def unquote_sexpr_string(atom):
+    if len(atom) >= 2 and atom[0] == '"' and atom[-1] == '"':
+        return re.sub(r"\\(.)", lambda match: "\n" if match.group(1) == "n" else match.group(1), atom[1:-1])
+    return atom
+
+
+def find_sexpr_child(node, head):
+    for child in node:
+        if type(child) != str and child.head == head:
+            return child
+    return None
+
+
+def find_sexpr_children(node, head):
+    return [child for child in node if type(child) != str and child.head == head]
+
+
+def find_symbol_property(symbol, key):
+    """Returns the (property "key" "value" ...) list of a symbol, or None."""
+    quoted_key = quote_sexpr_string(key)
+    for child in symbol:
+        if type(child) != str and child.head == "property" and len(child) > 2 and child[1] == quoted_key:
+            return child
+    return None
+
+
+def get_symbol_property(symbol, key, default=None):
+    """Returns the unquoted value of a symbol's property, or default if the symbol doesn't have it."""
+    property = find_symbol_property(symbol, key)
+    if property == None:
+        return default
+    return unquote_sexpr_string(property[2])
+
+
+def get_sexpr_atom_offset(text, node, index):
+    """Returns the (start, end) offsets of the index-th atom of node within text."""
+    position = node.start + 1
+    for child_index, child in enumerate(node):
+        if type(child) != str:
+            position = child.end
+            continue
+        match = sexpr_token_pattern.search(text, position)
+        if child_index == index:
+            return match.start(), match.end()
+        position = match.end()
+    raise IndexError(f"{node.head} has no atom at index {index}")
+
+
+def apply_text_edits(text, edits):
+    """
+    Applies (start, end, replacement) edits to text in one pass. Edits must not overlap, an edit with
+    start == end is an insertion. Everything outside the edits is kept byte for byte.
+    """
+    pieces = []
+    position = 0
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1])):
+        pieces.append(text[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
+def get_line_span(text, node):
+    """Returns the (start, end) offsets of the whole lines a node occupies, including the trailing newline."""
+    start = text.rfind("\n", 0, node.start) + 1
+    end = text.find("\n", node.end)
+    if end == -1:
+        end = len(text)
+    else:
+        end += 1
+    return start, end
@@ -0,0 +1,1108 @@
+# libraryBenchmarks.py
+# Rough timing/size measurements for the library generation pipeline, run with e.g.
+#   python libraryBenchmarks.py output-modes
+# selfcheck is a check rather than a measurement, it exits with 1 if the s-expression writer or the parts list
+# downloads misbehave. output-modes and sexpr exit with 1 too if a library doesn't round-trip.
+import argparse
+import contextlib
+import gc
+import io
+import os
+import subprocess
+import sys
+import time
+from autoLibrarySymbols import *  # autoLibrarySymbols.py
+from parametricSearch import *  # parametricSearch.py
+from bomCosting import *  # bomCosting.py
+
+# Parsing every symbol library into a tree should stay within this many seconds
+parse_time_budget = 2.0
+
+# Checked by selfcheck along with the library files: a description with everything quote_sexpr_string escapes,
+# and the library it is written in
+round_trip_test_description = 'A "quoted" C:\\path (with brackets)\nand a second line, ±1% 10µF'
+round_trip_test_library = r"""(kicad_symbol_lib
+	(version 20231120)
+	(symbol "R,4.7kΩ"
+		(property "Description" "A \"quoted\" C:\\path (with brackets)\nand a second line, ±1% 10µF")
+	)
+)
+"""
+
+auto_library_names = ["Resistors", "Capacitors", "Diodes", "Transistors", "Inductors", "Variable-Resistors"]
+
+
+def time_call(function, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()  # Keep garbage collection pauses out of the measurement
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = time.perf_counter() - start
+        gc.enable()
+        if best == None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def split_top_level_symbols(lib_content):
+    """Splits a pretty printed library into its header lines and its top level (symbol ...) blocks."""
+    header = []
+    symbols = []
+    current = None
+    for line in lib_content.splitlines(keepends=True):
+        if line.startswith("\t(symbol "):
+            current = [line]
+            symbols.append(current)
+        elif current != None and line != ")\n":
+            current.append(line)
+        elif line != ")\n":
+            header.append(line)
+    return "".join(header), ["".join(symbol) for symbol in symbols]
+
+
+def read_sexpr_files():
+    """Returns (filename, text) for every symbol library and footprint of the library."""
+    files = []
+    for folder, extension in [("JLCPCB-Kicad-Symbols", ".kicad_sym"), ("JLCPCB-Kicad-Footprints", ".kicad_mod")]:
+        for filename in sorted(os.listdir(folder)):
+            if filename.endswith(extension):
+                with open(os.path.join(folder, filename), "r") as file:
+                    files.append((filename, file.read()))
+    return files
+
+
+def get_round_trip_error(text, tree=None):
+    """
+    Checks a library file comes back unchanged from the s-expression writer.
+
+    :param text: The file's content.
+    :param tree: The file already parsed, if it has been.
+    :return: What doesn't round-trip, or None if it all does.
+    """
+    if tree == None:
+        tree = parse_sexpr(text)
+    if parse_sexpr(dump_sexpr_document(tree)) != tree:
+        return "the pretty layout does not parse to the same tree"
+    if parse_sexpr(dump_sexpr_document(tree, False)) != tree:
+        return "the compact layout does not parse to the same tree"
+    if apply_text_edits(text, []) != text:
+        return "applying no edits changes the text"
+    header, symbols = split_top_level_symbols(text)
+    if len(symbols) > 0:
+        compact_content = header + "".join(compact_symbol(symbol) + "\n" for symbol in symbols) + ")\n"
+        if parse_sexpr(compact_content) != tree:
+            return "the one symbol per line layout (compact_symbol) does not parse to the same tree"
+    # Edited property values are written with quote_sexpr_string, each one has to read back as the same single string
+    for token in sexpr_token_pattern.findall(text):
+        if token.startswith('"'):
+            value = unquote_sexpr_string(token)
+            quoted = quote_sexpr_string(value)
+            if sexpr_token_pattern.findall(quoted) != [quoted] or unquote_sexpr_string(quoted) != value:
+                return f"{token} does not read back from quote_sexpr_string as the same string"
+    return None
+
+
+def benchmark_output_modes():
+    """Compares file size and parse time of the pretty and compact (--pretty vs default) library layouts."""
+    print(f"{'Library':<22}{'Pretty':>12}{'Compact':>12}{'Saved':>8}{'Pretty parse':>15}{'Compact parse':>15}")
+    total_pretty = 0
+    total_compact = 0
+    errors = 0
+    for lib_name in auto_library_names:
+        filename = os.path.join("JLCPCB-Kicad-Symbols", f"JLCPCB-{lib_name}.kicad_sym")
+        if not os.path.exists(filename):
+            errors += 1
+            print(f"Error: {filename} is missing")
+            continue
+        with open(filename, "r") as file:
+            pretty_content = file.read()
+
+        header, symbols = split_top_level_symbols(pretty_content)
+        compact_content = header + "".join(compact_symbol(symbol) + "\n" for symbol in symbols) + ")\n"
+
+        pretty_size = len(pretty_content.encode())
+        compact_size = len(compact_content.encode())
+        pretty_time, pretty_tree = time_call(parse_sexpr, pretty_content)
+        compact_time, compact_tree = time_call(parse_sexpr, compact_content)
+        if pretty_tree != compact_tree:
+            errors += 1
+            print(f"Error: compact layout of {filename} does not parse to the same tree")
+
+        total_pretty += pretty_size
+        total_compact += compact_size
+        print(
+            f"{lib_name:<22}{pretty_size:>12,}{compact_size:>12,}{1 - compact_size / pretty_size:>8.0%}"
+            f"{pretty_time * 1000:>13.1f}ms{compact_time * 1000:>13.1f}ms"
+        )
+    if total_pretty > 0:
+        print(f"{'Total':<22}{total_pretty:>12,}{total_compact:>12,}{1 - total_compact / total_pretty:>8.0%}")
+    if errors > 0:
+        exit(1)
+
+
+def benchmark_sexpr():
+    """
+    Measures the shared s-expression parser on every symbol library and footprint, and checks it round-trips.
+    Exits with 1 if a file doesn't round-trip.
+    """
+    files = read_sexpr_files()
+
+    size = sum(len(text.encode()) for _, text in files)
+    tokens = sum(len(tokenize_sexpr(text)) for _, text in files)
+    print(f"{len(files)} files, {size:,} bytes, {tokens:,} tokens")
+
+    measurements = [
+        ("tokenize", lambda text: tokenize_sexpr(text)),
+        ("spans", lambda text: sum(1 for _ in iter_sexpr_spans(text))),
+        ("events", lambda text: sum(1 for _ in iter_sexpr_events(text))),
+        ("stream lists", lambda text: sum(1 for _ in iter_sexpr_lists(text))),
+        ("tree", parse_sexpr),
+    ]
+    times = {}
+    for name, function in measurements:
+        elapsed, _ = time_call(lambda: [function(text) for _, text in files])
+        times[name] = elapsed
+        print(f"{name:<14}{elapsed * 1000:>10.1f}ms{tokens / elapsed / 1e6:>8.2f}M tokens/s")
+
+    trees = [(filename, text, parse_sexpr(text)) for filename, text in files]
+    elapsed, _ = time_call(lambda: [dump_sexpr_document(tree) for _, _, tree in trees])
+    print(f"{'dump pretty':<14}{elapsed * 1000:>10.1f}ms")
+    elapsed, _ = time_call(lambda: [dump_sexpr_document(tree, False) for _, _, tree in trees])
+    print(f"{'dump compact':<14}{elapsed * 1000:>10.1f}ms")
+
+    round_trip_errors = 0
+    for filename, text, tree in trees:
+        error = get_round_trip_error(text, tree)
+        if error != None:
+            round_trip_errors += 1
+            print(f"Error: {filename} does not round-trip, {error}")
+    print(f"Round-trip: {len(trees) - round_trip_errors}/{len(trees)} files")
+
+    if times["tree"] > parse_time_budget:
+        print(f"Error: parsing all files took {times['tree']:.2f}s, over the {parse_time_budget}s budget")
+    else:
+        print(f"Parsing all files took {times['tree']:.2f}s (budget {parse_time_budget}s)")
+    if round_trip_errors > 0:
+        exit(1)
+
+
+def benchmark_parametric():
+    """Measures building the parametric search index and answering queries from it."""
+    read_time, parts = time_call(read_parametric_parts, repeat=1)
+    build_time, index = time_call(build_parametric_index, parts)
+    print(
+        f"{len(parts):,} parts in {len(index):,} groups, read {read_time * 1000:.1f}ms, index {build_time * 1000:.1f}ms"
+    )
+
+    queries = [
+        ("nearest 0402 resistor to 4.99k", find_nearest_parts, (index, "Resistors", 4990.0, "0402")),
+        (
+            "5 nearest resistors to 4.99k",
+            lambda *args: find_nearest_parts(*args, count=5),
+            (index, "Resistors", 4990.0),
+        ),
+        ("0603 caps >= 10uF, >= 16V", find_parts_in_range, (index, "Capacitors", 10e-6, None, "0603", None, 16.0)),
+        ("caps 1nF..100nF <= 10%", find_parts_in_range, (index, "Capacitors", 1e-9, 100e-9, None, 0.1)),
+    ]
+    for name, function, args in queries:
+        elapsed, results = time_call(function, *args, repeat=100)
+        print(f"{name:<34}{elapsed * 1e6:>8.1f}µs{len(results):>6} parts")
+
+
+def benchmark_bom():
+    """Measures costing a large BOM for many board quantities against the parts list."""
+    if not os.path.exists(parts_csv_filename):
+        print(f"Error: {parts_csv_filename} not found, run libraryCreatorScript.py first to download it")
+        return
+    load_time, price_index = time_call(load_price_index, repeat=1)
+    print(f"{len(price_index['lcsc']):,} parts indexed in {load_time * 1000:.1f}ms")
+
+    generator = np.random.default_rng(0)
+    board_quantities = [5, 10, 20, 30, 50, 100, 200, 250, 500, 1000, 2000, 5000, 10000]
+    for line_count in [100, 1000, 10000]:
+        bom_lcsc = generator.choice(price_index["lcsc"], line_count)
+        bom_quantity = generator.integers(1, 20, line_count)
+        elapsed, costs = time_call(cost_bom, price_index, bom_lcsc, bom_quantity, board_quantities)
+        print(
+            f"{line_count:>6} lines x {len(board_quantities)} quantities{elapsed * 1000:>10.2f}ms"
+            f"  ({costs['per_board'][0]:.2f} per board at {board_quantities[0]})"
+        )
+
+
+# Ways of loading the parts list, each run in a fresh interpreter so its peak memory (RSS) can be compared
+ingest_methods = {
+    "read_csv defaults": "df = pd.read_csv(filename)\nrows = len(df)",
+    "dtypes + usecols": "df = read_parts_csv(filename)[0]\nrows = len(df)",
+    "chunks of 10000": "rows = 0\nfor df in read_parts_csv(filename, chunksize=10000):\n    rows += len(df)",
+}
+
+
+def benchmark_ingest():
+    """Compares time and peak memory of reading the parts list with default types, declared types and in chunks."""
+    if not os.path.exists(parts_csv_filename):
+        print(f"Error: {parts_csv_filename} not found, run libraryCreatorScript.py first to download it")
+        return
+    print(f"{parts_csv_filename}: {os.path.getsize(parts_csv_filename):,} bytes")
+    print(f"{'Method':<22}{'Rows':>10}{'Time':>12}{'Peak RSS':>12}{'Over import':>14}")
+    for name, code in ingest_methods.items():
+        script = (
+            "import resource, sys, time\n"
+            f"sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})\n"
+            "import pandas as pd\n"
+            "from partsCsv import *\n"
+            f"filename = {parts_csv_filename!r}\n"
+            "baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+            "start = time.perf_counter()\n"
+            f"{code}\n"
+            "elapsed = time.perf_counter() - start\n"
+            "print(rows, elapsed, baseline, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+        )
+        output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        rows, elapsed, baseline, peak = output.split()
+        print(
+            f"{name:<22}{int(rows):>10,}{float(elapsed) * 1000:>10.1f}ms"
+            f"{int(peak) / 1024:>10.1f}MB{(int(peak) - int(baseline)) / 1024:>12.1f}MB"
+        )
+
+
+def serve_test_files(folder, bytes_per_second=None, failures=None):
+    """
+    Serves a folder on a free local port, as a stand-in for the parts list's website: with ETags and Range requests
+    like a static file host, at a limited speed and failing on purpose if asked to.
+
+    :param failures: dict of the failures still to come (the server counts them down): "errors" requests answered
+                     with a 503, "cuts" downloads cut off after "cut_after" bytes, "ranges" False to ignore Range and
+                     "encoded" True to send .gz files with Content-Encoding: gzip (like a host that serves them as a
+                     compressed csv).
+    """
+    import http.server
+    import threading
+
+    if failures == None:
+        failures = {}
+
+    class TestFileHandler(http.server.BaseHTTPRequestHandler):
+        def do_HEAD(self):
+            self.send_file(False)
+
+        def do_GET(self):
+            self.send_file(True)
+
+        def send_file(self, send_body):
+            path = os.path.join(folder, self.path.lstrip("/"))
+            if not os.path.isfile(path):
+                self.send_error(404)
+                return
+            if failures.get("errors", 0) > 0:
+                failures["errors"] -= 1
+                self.send_error(503)
+                return
+
+            with open(path, "rb") as file:
+                data = file.read()
+            etag = f'"{len(data):x}-{int(os.path.getmtime(path)):x}"'
+            start = 0
+            resumable = failures.get("ranges", True) and self.headers.get("If-Range") in [None, etag]
+            if self.headers.get("Range") != None and resumable:
+                start = int(self.headers["Range"].removeprefix("bytes=").split("-")[0])
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+            else:
+                self.send_response(200)
+            self.send_header("ETag", etag)
+            if failures.get("encoded", False) and path.endswith(".gz"):
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data) - start))
+            self.end_headers()
+            if not send_body:
+                return
+
+            body = data[start:]
+            if failures.get("cuts", 0) > 0 and len(body) > failures["cut_after"]:
+                failures["cuts"] -= 1
+                body = body[: failures["cut_after"]]
+                self.close_connection = True  # Hang up part way, the client gets fewer bytes than Content-Length
+            block_size = 16 * 1024
+            for offset in range(0, len(body), block_size):
+                self.wfile.write(body[offset : offset + block_size])
+                if bytes_per_second != None:
+                    time.sleep(block_size / bytes_per_second)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), TestFileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def benchmark_stream(bytes_per_second=2e6):
+    """Compares downloading the parts list then classifying it with classifying it as it downloads (build --stream)."""
+    import tempfile
+    from libraryBuilder import classify_part
+    from partRecord import iter_parts
+
+    if not os.path.exists(parts_csv_filename):
+        print(f"Error: {parts_csv_filename} not found, run libraryCreatorScript.py first to download it")
+        return
+    server, url = serve_test_files(".", bytes_per_second)
+    print(
+        f"{parts_csv_filename}: {os.path.getsize(parts_csv_filename):,} bytes served at {bytes_per_second / 1e6:.1f}MB/s"
+    )
+
+    def classify(parts_csv):
+        rows = 0
+        for df in parts_csv:
+            for _, part in iter_parts(df):
+                classify_part(part)
+                rows += 1
+        return rows
+
+    classify(read_parts_csv(parts_csv_filename))  # Warm up, so neither run pays for the first imports and regexes
+    library_folder = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)  # Download into a scratch folder, the library's own parts list is left alone
+        try:
+            start = time.perf_counter()
+            download_parts_csv(url, parts_csv_filename)
+            download_time = time.perf_counter() - start
+            rows = classify(read_parts_csv(parts_csv_filename))
+            sequential_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            classify(stream_parts_csv(url, parts_csv_filename))
+            stream_time = time.perf_counter() - start
+        finally:
+            os.chdir(library_folder)
+            server.shutdown()
+
+    print(f"{'Download then classify':<24}{sequential_time * 1000:>10.1f}ms  (download {download_time * 1000:.1f}ms)")
+    print(f"{'Classify as it downloads':<24}{stream_time * 1000:>10.1f}ms  ({rows:,} rows)")
+    print(f"Overlap saved {(sequential_time - stream_time) * 1000:.1f}ms ({1 - stream_time / sequential_time:.0%})")
+
+
+def benchmark_compression(bytes_per_second=2e6):
+    """Compares downloading the plain parts list with downloading a gzip/zstd copy and decompressing it."""
+    import gzip
+    import shutil
+    import tempfile
+
+    if not os.path.exists(parts_csv_filename):
+        print(f"Error: {parts_csv_filename} not found, run libraryCreatorScript.py first to download it")
+        return
+    with open(parts_csv_filename, "rb") as file:
+        data = file.read()
+
+    library_folder = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        served_folder = os.path.join(folder, "served")
+        os.makedirs(served_folder)
+        shutil.copy(parts_csv_filename, served_folder)
+        with open(os.path.join(served_folder, f"{parts_csv_filename}.gz"), "wb") as file:
+            file.write(gzip.compress(data, 9))
+        compressions = {"plain": {}, "gzip": {".gz": "gzip"}}
+        if get_decompressor("zstd") != None:
+            import zstandard
+
+            with open(os.path.join(served_folder, f"{parts_csv_filename}.zst"), "wb") as file:
+                file.write(zstandard.ZstdCompressor(level=19).compress(data))
+            compressions["zstd"] = {".zst": "zstd"}
+        else:
+            print("zstandard isn't installed, skipping zstd")
+
+        server, url = serve_test_files(served_folder, bytes_per_second)
+        print(f"{len(data):,} bytes served at {bytes_per_second / 1e6:.1f}MB/s")
+        print(f"{'Download':<10}{'Transferred':>14}{'Time':>12}")
+        os.chdir(folder)
+        try:
+            for name, extensions in compressions.items():
+                start = time.perf_counter()
+                download_parts_csv(url, parts_csv_filename, extensions)
+                elapsed = time.perf_counter() - start
+                with open(parts_csv_filename, "rb") as file:
+                    if file.read() != data:
+                        print(f"Error: the {name} download doesn't match {parts_csv_filename}")
+                extension = list(extensions.keys())[0] if len(extensions) > 0 else ""
+                size = os.path.getsize(os.path.join(served_folder, f"{parts_csv_filename}{extension}"))
+                print(f"{name:<10}{size:>14,}{elapsed * 1000:>10.1f}ms")
+        finally:
+            os.chdir(library_folder)
+            server.shutdown()
+
+
+def benchmark_download():
+    """Downloads the parts list from a local server that fails on purpose, checking every download is complete."""
+    import tempfile
+
+    if not os.path.exists(parts_csv_filename):
+        print(f"Error: {parts_csv_filename} not found, run libraryCreatorScript.py first to download it")
+        return
+    with open(parts_csv_filename, "rb") as file:
+        data = file.read()
+    cut_after = len(data) // 3
+
+    scenarios = [
+        ("no failures", {}, 5),
+        ("2 server errors", {"errors": 2}, 5),
+        ("2 connections cut", {"cuts": 2, "cut_after": cut_after}, 5),
+        ("cut, no Range support", {"cuts": 1, "cut_after": cut_after, "ranges": False}, 5),
+        ("cut, no retries left", {"cuts": 1, "cut_after": cut_after}, 0),
+        ("resumed by the next run", {}, 5),
+        ("too many failures", {"errors": 10}, 2),
+    ]
+    backoff = download_settings["backoff"]
+    retries = download_settings["retries"]
+    download_settings["backoff"] = 0.01  # Don't wait seconds between the retries here
+
+    library_folder = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        served_folder = os.path.join(folder, "served")
+        os.makedirs(served_folder)
+        with open(os.path.join(served_folder, parts_csv_filename), "wb") as file:
+            file.write(data)
+        failures = {}
+        server, url = serve_test_files(served_folder, failures=failures)
+        os.chdir(folder)
+        try:
+            for name, scenario_failures, scenario_retries in scenarios:
+                failures.clear()
+                failures.update(scenario_failures)
+                download_settings["retries"] = scenario_retries
+                print(f"## {name}")
+                start = time.perf_counter()
+                downloaded = download_parts_csv(url, parts_csv_filename, {})
+                elapsed = time.perf_counter() - start
+
+                complete = False
+                if os.path.exists(parts_csv_filename):
+                    with open(parts_csv_filename, "rb") as file:
+                        complete = file.read() == data
+                    os.remove(parts_csv_filename)
+                part_filename = f"{parts_csv_filename}.part"
+                partial = os.path.getsize(part_filename) if os.path.exists(part_filename) else 0
+                if downloaded and not complete:
+                    print(f"Error: the download succeeded but {parts_csv_filename} doesn't match")
+                print(
+                    f"{'downloaded' if downloaded else 'failed'} in {elapsed * 1000:.1f}ms, "
+                    f"{'complete' if complete else 'nothing replaced'}, {partial:,} bytes kept for the next run"
+                )
+        finally:
+            os.chdir(library_folder)
+            server.shutdown()
+            download_settings["backoff"] = backoff
+            download_settings["retries"] = retries
+
+
+def benchmark_selfcheck(rows=20000):
+    """
+    Checks every symbol library and footprint round-trips through the s-expression writer (get_round_trip_error),
+    then the parts list downloads against a local server: a truncated, corrupt or not compressed gzip/zstd copy must
+    be discarded, falling back to the plain csv (or failing without replacing the parts list when there is none, or
+    when it is read as it downloads), and downloads resumed from a server that answers Range with a 200 (during the
+    download, or when the next run resumes it) must come out complete, downloaded on their own and with
+    stream_parts_csv. Nothing needs the network. zstd is only fully checked if the optional zstandard package is
+    installed, without it the zstd copy must be passed over.
+    Exits with 1 if any check fails, so it can be run before shipping changes to kicadSexpr.py, partsCsv.py or
+    httpDownload.py.
+    """
+    import gzip
+    import shutil
+    import tempfile
+    import pandas as pd
+    import requests
+
+    # A made-up parts list, so the check doesn't depend on the library's own
+    df = pd.DataFrame(
+        {
+            "lcsc": range(1, rows + 1),
+            "category": "Resistors",
+            "subcategory": "Chip Resistor - Surface Mount",
+            "mfr": [f"R{lcsc:07d}" for lcsc in range(1, rows + 1)],
+            "package": "0402",
+            "joints": 2,
+            "manufacturer": "UNI-ROYAL(Uniroyal Elec)",
+            "basic": 1,
+            "preferred": 0,
+            "description": [f"{lcsc % 997}kΩ ±1% 62.5mW" for lcsc in range(1, rows + 1)],
+            "datasheet": [f"https://example.com/{lcsc}.pdf" for lcsc in range(1, rows + 1)],
+            "stock": [lcsc * 7 % 100003 for lcsc in range(1, rows + 1)],
+            "price": "1-9:0.0011,10-99:0.0009",
+            "extra": "{}",
+            "Assembly Process": "SMT",
+            "Min Order Qty": 100,
+            "Attrition Qty": 10,
+        }
+    )
+    data = df.to_csv(index=False).encode("utf-8")
+    old_data = b"lcsc\n1\n"  # The parts list from the run before, a failed download has to leave it as it was
+
+    compressed = {".gz": gzip.compress(data, 9)}
+    if get_decompressor("zstd") != None:
+        import zstandard
+
+        compressed[".zst"] = zstandard.ZstdCompressor(level=19).compress(data)
+    else:
+        print("zstandard isn't installed, only checking the zstd copy is passed over")
+    compressions = {"plain": {}}
+    for extension, compressed_data in compressed.items():
+        compressions[parts_csv_compressions[extension]] = {extension: parts_csv_compressions[extension]}
+
+    failed = []
+    files = [("round_trip_test_library", round_trip_test_library)] + read_sexpr_files()
+    round_trip_errors = []
+    for filename, text in files:
+        error = get_round_trip_error(text)
+        if error != None:
+            round_trip_errors.append(f"{filename}: {error}")
+    if len(files) == 1:
+        round_trip_errors.append("no symbol libraries or footprints found")
+    description = find_sexpr_child(find_sexpr_child(parse_sexpr(round_trip_test_library)[0], "symbol"), "property")[2]
+    if quote_sexpr_string(round_trip_test_description) != description:
+        round_trip_errors.append(
+            f"round_trip_test_description is written as {quote_sexpr_string(round_trip_test_description)}"
+        )
+    if unquote_sexpr_string(description) != round_trip_test_description:
+        round_trip_errors.append(f"{description} reads back as {unquote_sexpr_string(description)!r}")
+    name = f"sexpr: all {len(files) - 1} symbol libraries and footprints (and a made-up library) round-trip"
+    print(f"{'ok' if len(round_trip_errors) == 0 else 'FAILED':<8}{name}")
+    if len(round_trip_errors) > 0:
+        failed.append(name)
+        for error in round_trip_errors:
+            print(f"        {error}")
+
+    backoff = download_settings["backoff"]
+    retries = download_settings["retries"]
+    download_settings["backoff"] = 0.01  # Don't wait seconds between the retries here
+
+    library_folder = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        # served/good has the parts list and its compressed copies, served/<broken> the parts list and broken copies,
+        # served/<broken>-only just the broken copies, served/unreadable-zstd a .zst that isn't zstd next to the .gz
+        served_folder = os.path.join(folder, "served")
+        broken_copies = ["truncated", "corrupt", "not-compressed"]
+        served_files = {
+            "good": {"": data},
+            "unreadable-zstd": {"": data, ".gz": compressed[".gz"], ".zst": b"\x28\xb5\x2f\xfd" + b"\x00" * 64},
+        }
+        for name in broken_copies:
+            served_files[name] = {"": data}
+            served_files[f"{name}-only"] = {}
+        for extension, compressed_data in compressed.items():
+            corrupt_data = bytearray(compressed_data)
+            corrupt_data[len(corrupt_data) // 2] ^= 0xFF
+            served_files["good"][extension] = compressed_data
+            for name, broken_data in [
+                ("truncated", compressed_data[: len(compressed_data) // 2]),
+                ("corrupt", bytes(corrupt_data)),
+                ("not-compressed", b"<html><body>Rate limit exceeded</body></html>\n"),  # An error page sent with a 200
+            ]:
+                served_files[name][extension] = broken_data
+                served_files[f"{name}-only"][extension] = broken_data
+        for name, files in served_files.items():
+            os.makedirs(os.path.join(served_folder, name))
+            for extension, served_data in files.items():
+                with open(os.path.join(served_folder, name, f"{parts_csv_filename}{extension}"), "wb") as file:
+                    file.write(served_data)
+
+        failures = {}
+        server, url = serve_test_files(served_folder, failures=failures)
+        download_folder = os.path.join(folder, "download")
+        os.makedirs(download_folder)
+        os.chdir(download_folder)
+
+        def check(name, scenario, scenario_failures=None, scenario_retries=5):
+            """Runs a scenario with its output held back, printed only if it fails."""
+            failures.clear()
+            failures.update(scenario_failures or {})
+            download_settings["retries"] = scenario_retries
+            output = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(output):
+                    error = scenario()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            if error == None and failures.get("cuts", 0) > 0:
+                error = "the server never cut the download off"
+            print(f"{'ok' if error == None else 'FAILED':<8}{name}")
+            if error != None:
+                failed.append(name)
+                print(f"        {error}")
+                for line in output.getvalue().splitlines():
+                    print(f"        | {line}")
+
+        def reset(parts_csv_data=None):
+            for filename in os.listdir(download_folder):
+                os.remove(filename)
+            if parts_csv_data != None:
+                with open(parts_csv_filename, "wb") as file:
+                    file.write(parts_csv_data)
+
+        def read_back():
+            with open(parts_csv_filename, "rb") as file:
+                return file.read()
+
+        def download_complete(served="good", extensions={}):
+            if not download_parts_csv(f"{url}/{served}", parts_csv_filename, extensions):
+                return "the download failed"
+            if read_back() != data:
+                return f"the download succeeded but {parts_csv_filename} doesn't match"
+            leftovers = [filename for filename in os.listdir(download_folder) if filename != parts_csv_filename]
+            if len(leftovers) > 0:
+                return f"left behind {', '.join(sorted(leftovers))}"
+            return None
+
+        def download_refused(served, extensions):
+            reset(old_data)
+            if download_parts_csv(f"{url}/{served}", parts_csv_filename, extensions):
+                return f"the {served} download succeeded"
+            if read_back() != old_data:
+                return f"{parts_csv_filename} was replaced"
+            leftovers = [filename for filename in os.listdir(download_folder) if filename != parts_csv_filename]
+            if len(leftovers) > 0:
+                return f"left behind {', '.join(sorted(leftovers))}, the next run would resume the broken copy"
+            return None
+
+        def stream_refused(served, extensions):
+            reset(old_data)
+            try:
+                for _ in stream_parts_csv(f"{url}/{served}", parts_csv_filename, compressions=extensions):
+                    pass
+            except requests.RequestException:
+                if read_back() != old_data:
+                    return f"{parts_csv_filename} was replaced"
+                leftovers = [filename for filename in os.listdir(download_folder) if filename != parts_csv_filename]
+                if len(leftovers) > 0:
+                    return f"left behind {', '.join(sorted(leftovers))}, the next run would resume the broken copy"
+                return None
+            return f"reading the {served} download as it arrived didn't fail"
+
+        def stream_complete(extensions):
+            lcsc_ids = []
+            for chunk in stream_parts_csv(f"{url}/good", parts_csv_filename, ["lcsc"], compressions=extensions):
+                lcsc_ids.extend(chunk["lcsc"].tolist())
+            if lcsc_ids != df["lcsc"].tolist():
+                return f"read {len(lcsc_ids):,} rows as it downloaded, expected {len(df):,}"
+            if read_back() != data:
+                return f"{parts_csv_filename} saved while reading it doesn't match"
+            return None
+
+        def resumed_by_next_run(extensions, resume):
+            reset()
+            failures.update(cut)
+            download_settings["retries"] = 0
+            if download_parts_csv(f"{url}/good", parts_csv_filename, extensions):
+                return "the first run wasn't cut off"
+            kept = [filename for filename in os.listdir(download_folder) if filename.endswith(".part")]
+            if len(kept) == 0 or os.path.getsize(kept[0]) == 0:
+                return "the first run kept nothing to resume"
+            failures.update({"ranges": False})
+            download_settings["retries"] = 5
+            return resume()
+
+        # Cut off after a few of the 64KB chunks the download reads at a time, so there are bytes to resume from
+        cut = {"cuts": 1, "cut_after": 128 * 1024}
+        try:
+            for name, extensions in compressions.items():
+                check(f"{name}: download", lambda: reset() or download_complete("good", extensions))
+                check(
+                    f"{name}: cut off, resumed from a server that answers Range with 200",
+                    lambda: reset() or download_complete("good", extensions),
+                    {**cut, "ranges": False},
+                )
+                check(
+                    f"{name}: cut off, resumed by the next run from a server that answers Range with 200",
+                    lambda: resumed_by_next_run(extensions, lambda: download_complete("good", extensions)),
+                )
+                check(f"{name}: read as it downloads", lambda: reset() or stream_complete(extensions))
+                check(
+                    f"{name}: cut off while read as it downloads, resumed from a server that answers Range with 200",
+                    lambda: reset() or stream_complete(extensions),
+                    {**cut, "ranges": False},
+                )
+                check(
+                    f"{name}: read as it downloads after the last run was cut off, from a server that answers "
+                    f"Range with 200",
+                    lambda: resumed_by_next_run(extensions, lambda: stream_complete(extensions)),
+                )
+                if name == "plain":
+                    continue
+                for broken in broken_copies:
+                    check(
+                        f"{name}: {broken} copy falls back to the plain csv",
+                        lambda: reset(old_data) or download_complete(broken, extensions),
+                    )
+                    check(
+                        f"{name}: {broken} copy without a plain csv fails",
+                        lambda: download_refused(f"{broken}-only", extensions),
+                    )
+                    check(
+                        f"{name}: {broken} copy fails when read as it downloads",
+                        lambda: stream_refused(broken, extensions),
+                    )
+            check(
+                "gzip: served with Content-Encoding: gzip",
+                lambda: reset() or download_complete("good", {".gz": "gzip"}),
+                {"encoded": True},
+            )
+            check(
+                "zstd: copy zstd can't read (or zstandard isn't installed) is passed over",
+                lambda: reset() or download_complete("unreadable-zstd", parts_csv_compressions),
+            )
+        finally:
+            os.chdir(library_folder)
+            server.shutdown()
+            download_settings["backoff"] = backoff
+            download_settings["retries"] = retries
+
+    if len(failed) > 0:
+        print(f"Error: {len(failed)} self-checks failed")
+        exit(1)
+    if get_decompressor("zstd") == None:
+        print("All self-checks passed, zstd only checked for being passed over as zstandard isn't installed")
+    else:
+        print("All self-checks passed")
+
+
+def serve_test_datasheets(latency):
+    """
+    Serves made-up datasheets on a free local port, as a stand-in for a datasheet host that takes latency seconds
+    to answer each request. Paths starting with /missing/ are 404s and those starting with /no-head/ answer
+    HEAD with a 405 (only GET works). Connections are kept open between requests (HTTP/1.1).
+
+    :return: (server, url, stats) where stats counts the "connections" and "requests" the server has had.
+    """
+    import http.server
+    import threading
+
+    stats = {"connections": 0, "requests": 0}
+    body = b"%PDF-1.4\n" + b"0" * 4096
+
+    class TestDatasheetHandler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            stats["connections"] += 1
+
+        def do_HEAD(self):
+            self.send_datasheet(False)
+
+        def do_GET(self):
+            self.send_datasheet(True)
+
+        def send_datasheet(self, send_body):
+            stats["requests"] += 1
+            time.sleep(latency)
+            if self.path.startswith("/missing/"):
+                status = 404
+            elif self.path.startswith("/no-head/") and not send_body:
+                status = 405
+            else:
+                status = 200
+            self.send_response(status)
+            self.send_header("Content-Type", "application/pdf" if status == 200 else "text/plain")
+            self.send_header("Content-Length", str(len(body) if status == 200 else 0))
+            self.end_headers()
+            if send_body and status == 200:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    class TestDatasheetServer(http.server.ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            pass  # Clients hanging up on a kept open connection isn't an error
+
+    server = TestDatasheetServer(("127.0.0.1", 0), TestDatasheetHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", stats
+
+
+def benchmark_datasheets(latency=0.02, host_count=3):
+    """Checks the libraries' datasheet links against local stand-in servers at different concurrencies."""
+    import tempfile
+    import urllib.parse
+    from datasheetLinks import collect_datasheet_links, check_datasheet_links
+
+    links = collect_datasheet_links()
+    servers = [serve_test_datasheets(latency) for _ in range(host_count)]
+    # Each real host is stood in for by one of the servers, every 20th link is broken and every 7th rejects HEAD
+    hosts = sorted({urllib.parse.urlsplit(url).netloc for url in links})
+    test_links = {}
+    for index, url in enumerate(sorted(links)):
+        parts = urllib.parse.urlsplit(url)
+        prefix = "/missing" if index % 20 == 0 else "/no-head" if index % 7 == 0 else ""
+        server_url = servers[hosts.index(parts.netloc) % host_count][1]
+        test_links[f"{server_url}{prefix}{parts.path}"] = links[url]
+    expected_broken = len([url for url in test_links if "/missing/" in url])
+    print(f"{len(test_links):,} links on {host_count} stand-in hosts answering in {latency * 1000:.0f}ms")
+
+    def reset_stats():
+        for _, _, stats in servers:
+            stats["connections"] = 0
+            stats["requests"] = 0
+
+    def run(name, *args, **kwargs):
+        reset_stats()
+        with contextlib.redirect_stdout(io.StringIO()):  # Not the list of broken links
+            result = check_datasheet_links(test_links, *args, **kwargs)
+        connections = sum(stats["connections"] for _, _, stats in servers)
+        requests_made = sum(stats["requests"] for _, _, stats in servers)
+        throughput = result["checked"] / result["seconds"] if result["checked"] > 0 else 0
+        print(
+            f"{name:<30}{result['checked']:>8,}{result['seconds'] * 1000:>10.0f}ms{throughput:>10.0f}/s"
+            f"{requests_made:>10,}{connections:>8,}{result['broken']:>8,}"
+        )
+        if result["broken"] != expected_broken:
+            print(f"Error: {result['broken']} broken links found, {expected_broken} expected")
+
+    print(f"{'Run':<30}{'Checked':>8}{'Time':>12}{'Rate':>12}{'Requests':>10}{'Conns':>8}{'Broken':>8}")
+    try:
+        for concurrency, per_host in [(1, 1), (8, 4), (32, 16)]:
+            run(f"concurrency {concurrency}, {per_host} per host", None, concurrency=concurrency, per_host=per_host)
+        with tempfile.TemporaryDirectory() as folder:
+            cache_filename = os.path.join(folder, "datasheet-links.json")
+            run("first run, with cache", cache_filename)
+            run("second run", cache_filename)
+            run("after broken links' TTL", cache_filename, broken_ttl=0)
+    finally:
+        for server, _, _ in servers:
+            server.shutdown()
+
+
+def classify_test_parts(df):
+    """Classifies a parts list, returning the parts that go in the auto-generated libraries."""
+    from libraryBuilder import classify_part, get_basic_or_prefered_type
+    from partRecord import iter_parts
+
+    parts = []
+    for _, part in iter_parts(df):
+        part.component_class = get_basic_or_prefered_type(part)
+        with contextlib.redirect_stdout(io.StringIO()):  # Not the values the classifier couldn't extract
+            classify_part(part)
+        if part.value != None:
+            parts.append(part)
+    return parts
+
+
+def render_test_libraries(df, canonical_order):
+    """Classifies a parts list and renders its auto-generated libraries (compact, one symbol per line) in memory."""
+    from libraryBuilder import get_part_order_key
+
+    parts = classify_test_parts(df)
+    if canonical_order:
+        parts.sort(key=get_part_order_key)
+
+    names_lookup = []
+    libraries = {}
+    for part in parts:
+        symbol = generate_kicad_symbol(part, names_lookup, pretty=False)
+        libraries.setdefault(part.mode, []).append(symbol)
+    return libraries
+
+
+def benchmark_ordering(changed_stock_fraction=0.1, dropped_fraction=0.005):
+    """
+    Measures the diff between the auto-generated libraries of two consecutive parts lists, with the symbols in
+    the parts list's row order and in the canonical order the libraries are written in (see get_part_order_key).
+    """
+    import difflib
+    from partsDelta import parts_snapshot_filename
+
+    if not os.path.exists(parts_csv_filename):
+        print(f"Error: {parts_csv_filename} not found, run libraryCreatorScript.py first to download it")
+        return
+    df = read_parts_csv(parts_csv_filename)[0]
+
+    # The next day's parts list as it can arrive: rows in a different order, some stock changed, a few parts gone
+    next_df = df.sample(frac=1, random_state=1).iloc[int(len(df) * dropped_fraction) :].copy()
+    changed = next_df.sample(frac=changed_stock_fraction, random_state=2).index
+    next_df.loc[changed, "stock"] = next_df.loc[changed, "stock"] + 100
+    snapshots = [("reshuffled next day", df, next_df)]
+    if os.path.exists(parts_snapshot_filename):
+        snapshots.append(("last run -> now", read_parts_csv(parts_snapshot_filename)[0], df))
+
+    print(f"{'Parts lists':<22}{'Order':<12}{'Symbols':>9}{'Changed lines':>15}{'Diff size':>12}")
+    for name, old_df, new_df in snapshots:
+        for order, canonical_order in [("row order", False), ("canonical", True)]:
+            old_libraries = render_test_libraries(old_df, canonical_order)
+            new_libraries = render_test_libraries(new_df, canonical_order)
+            changed_lines = 0
+            diff_size = 0
+            for lib_name in sorted(set(old_libraries) | set(new_libraries)):
+                diff = difflib.unified_diff(old_libraries.get(lib_name, []), new_libraries.get(lib_name, []), n=0)
+                for line in diff:
+                    if line[0] in "+-" and not line.startswith(("+++", "---")):
+                        changed_lines += 1
+                        diff_size += len(line.encode("utf-8")) + 1
+            symbols = sum(len(symbols) for symbols in new_libraries.values())
+            print(f"{name:<22}{order:<12}{symbols:>9,}{changed_lines:>15,}{diff_size / 1024:>10.1f}KB")
+
+
+def benchmark_history(years=3, changed_stock_fraction=0.1, changed_price_fraction=0.002, replaced_fraction=0.001):
+    """
+    Fills a stock history store (see stockHistory.py) with years of daily snapshots of the parts list, simulating
+    stock and price changes and parts coming and going, then times its queries.
+    """
+    import datetime
+    import gzip
+    import tempfile
+    import numpy as np
+    from stockHistory import append_stock_history, get_part_history, get_top_movers, stock_history_columns
+
+    if not os.path.exists(parts_csv_filename):
+        print(f"Error: {parts_csv_filename} not found, run libraryCreatorScript.py first to download it")
+        return
+    df = read_parts_csv(parts_csv_filename, stock_history_columns)[0]
+    random = np.random.default_rng(1)
+    prices = df["price"].dropna().unique()
+    next_lcsc = int(df["lcsc"].max()) + 1
+    day = datetime.date(2026, 1, 1)
+    days = int(years * 365)
+    lcsc = f"C{df['lcsc'].iloc[0]}"  # The part whose history is queried, unless it is replaced along the way
+
+    with tempfile.TemporaryDirectory() as folder:
+        store = os.path.join(folder, "stock-history")
+        filename = os.path.join(folder, "parts.csv")
+        csv_size = 0
+        append_time = 0
+        for _ in range(days):
+            changed = random.random(len(df)) < changed_stock_fraction
+            stock = df.loc[changed, "stock"] * random.uniform(0.5, 1.5, changed.sum())
+            df.loc[changed, "stock"] = stock.astype("int32")
+            changed = random.random(len(df)) < changed_price_fraction
+            df.loc[changed, "price"] = random.choice(prices, changed.sum())
+            replaced = random.random(len(df)) < replaced_fraction
+            df.loc[replaced, "lcsc"] = np.arange(next_lcsc, next_lcsc + replaced.sum(), dtype="int32")
+            next_lcsc += int(replaced.sum())
+            df.to_csv(filename, index=False)
+            with open(filename, "rb") as file:
+                csv_size += len(gzip.compress(file.read()))
+
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                append_stock_history(filename, day.isoformat(), store)
+            append_time += time.perf_counter() - start
+            day += datetime.timedelta(days=1)
+
+        store_size = 0
+        for path, _, filenames in os.walk(store):
+            store_size += sum(os.path.getsize(os.path.join(path, name)) for name in filenames)
+        print(f"{days} daily snapshots of {len(df):,} parts, {append_time / days * 1000:.1f}ms to add each")
+        print(f"Stock history store: {store_size / 1024:,.0f}KB ({store_size / days:,.0f} bytes a day)")
+        print(f"The same as a gzipped csv a day: {csv_size / 1024:,.0f}KB ({csv_size / store_size:.0f}x larger)")
+
+        elapsed, history = time_call(get_part_history, lcsc, None, None, store)
+        print(f"get_part_history({lcsc}), every day: {elapsed * 1000:.0f}ms for {len(history)} days")
+        last_day = (day - datetime.timedelta(days=1)).isoformat()
+        month_before = (day - datetime.timedelta(days=31)).isoformat()
+        for name, start in [("last 30 days", month_before), ("every day", None)]:
+            for by in ["stock", "price"]:
+                elapsed, result = time_call(get_top_movers, start, last_day, 20, by, "both", store)
+                print(f"get_top_movers by {by}, {name}: {elapsed * 1000:.0f}ms ({result['start']} to {result['end']})")
+
+
+def benchmark_footprints():
+    """
+    Compares resolving the auto-generated parts' footprints before they are rendered (footprintResolver.py) with
+    finding the missing footprints afterwards by scanning every library (check_footprints).
+    """
+    from fileTransaction import begin_transaction, rollback_transaction
+    from libraryChecks import check_footprints
+
+    if not os.path.exists(parts_csv_filename):
+        print(f"Error: {parts_csv_filename} not found, run libraryCreatorScript.py first to download it")
+        return
+    import pandas as pd
+
+    df = read_parts_csv(parts_csv_filename)[0]
+    # The parts list, and as many rows as the full JLCPCB catalogue
+    for packages in [df["package"], pd.concat([df["package"]] * 300, ignore_index=True)]:
+        column_time, _ = time_call(normalize_package_names, packages)
+        row_time, _ = time_call(lambda: [str(package).replace("插件", "Plugin") for package in packages])
+        print(
+            f"Package names of {len(packages):,} parts fixed as one column op: {column_time * 1000:.2f}ms, "
+            f"row by row: {row_time * 1000:.2f}ms"
+        )
+
+    parts = classify_test_parts(df)
+
+    def resolve():
+        with contextlib.redirect_stdout(io.StringIO()):
+            named_parts = [(get_part_footprint_name(part), part) for part in parts]
+            return resolve_footprints(named_parts, load_footprints_lookup())
+
+    elapsed, (_, missing) = time_call(resolve)
+    print(
+        f"Resolved the footprints of {len(parts):,} parts before rendering: {elapsed * 1000:.1f}ms, "
+        f"{len(missing)} missing"
+    )
+
+    def check():
+        transaction = begin_transaction()  # Nothing check_footprints moves out of the archive is kept
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            check_footprints(transaction)
+        rollback_transaction(transaction)
+        return output.getvalue().count("Missing Footprint")
+
+    elapsed, missing_count = time_call(check)
+    print(f"check_footprints over every library afterwards: {elapsed * 1000:.1f}ms, {missing_count} missing")
+
+
+def benchmark_startup(repeat=5):
+    """Times how long each libraryCreatorScript.py command takes to import what it needs, in a fresh interpreter."""
+    from libraryCreatorScript import command_modules
+
+    print(f"{'Command':<16}{'Import time':>14}{'Modules':>10}  pandas")
+    for command, modules in command_modules.items():
+        script = (
+            "import sys, time\n"
+            f"sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})\n"
+            "before = len(sys.modules)\n"
+            "start = time.perf_counter()\n"
+            "import libraryCreatorScript\n"
+            + "".join(f"import {module}\n" for module in modules)
+            + "elapsed = time.perf_counter() - start\n"
+            "print(elapsed, len(sys.modules) - before, 'pandas' in sys.modules)\n"
+        )
+        best = None
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+            elapsed, module_count, pandas_loaded = output.split()
+            if best == None or float(elapsed) < best:
+                best = float(elapsed)
+        print(
+            f"{command:<16}{best * 1000:>12.1f}ms{int(module_count):>10}  {'yes' if pandas_loaded == 'True' else 'no'}"
+        )
+
+
+benchmarks = {
+    "output-modes": benchmark_output_modes,
+    "sexpr": benchmark_sexpr,
+    "parametric": benchmark_parametric,
+    "bom": benchmark_bom,
+    "ingest": benchmark_ingest,
+    "stream": benchmark_stream,
+    "compression": benchmark_compression,
+    "download": benchmark_download,
+    "selfcheck": benchmark_selfcheck,
+    "datasheets": benchmark_datasheets,
+    "ordering": benchmark_ordering,
+    "history": benchmark_history,
+    "footprints": benchmark_footprints,
+    "startup": benchmark_startup,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for the JLCPCB KiCad library scripts")
+    parser.add_argument("benchmark", choices=list(benchmarks.keys()) + ["all"])
+    args = parser.parse_args()
+
+    if args.benchmark == "all":
+        for name, benchmark in benchmarks.items():
+            print(f"## {name}")
+            benchmark()
+    else:
+        benchmarks[args.benchmark]()
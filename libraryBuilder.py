@@ -0,0 +1,913 @@
+# libraryBuilder.py
+# The library update pipeline behind "python libraryCreatorScript.py build": classifies every part of the parts list,
+# generates the auto-generated libraries and updates the handmade ones, one stage at a time (see pipelineCheckpoints.py)
+import os
+import re
+from autoLibrarySymbols import *  # librarySymbols.py
+from handmadeLibrarySymbols import *  # handmadeLibrarySymbols.py
+from databaseLibrary import *  # databaseLibrary.py
+from partRecord import *  # partRecord.py
+from classificationCache import *  # classificationCache.py
+from partsCsv import *  # partsCsv.py
+from partsDelta import *  # partsDelta.py
+from fileTransaction import *  # fileTransaction.py
+from pipelineCheckpoints import *  # pipelineCheckpoints.py
+from libraryChecks import *  # libraryChecks.py
+from parametricSearch import *  # parametricSearch.py
+from partsChangelog import *  # partsChangelog.py
+from stockHistory import *  # stockHistory.py
+from volatileRefresh import *  # volatileRefresh.py
+
+
+def extract_capacitor_value(description, lcsc_id):
+    """
+    Extracts the capacitor value from the given description based on the LCSC ID.
+    If the LCSC ID matches a known value, it returns the corresponding capacitance.
+    Otherwise, it uses a regex pattern to extract the capacitance from the description.
+
+    :param description: The description of the capacitor.
+    :param lcsc_id: The LCSC ID of the capacitor.
+    :return: The extracted capacitance value as a string, or None if no value is found.
+    """
+    # Define known LCSC IDs and their corresponding capacitance values
+    known_values = {30274: "6pF", 3013473: "100nF", 3008298: "4.7nF"}
+
+    # Check if the LCSC ID matches a known value
+    if lcsc_id in known_values:
+        return known_values[lcsc_id]
+
+    # Define a regex pattern to match capacitance values
+    pattern = r"(\d+(?:\.\d+)?(?:[pnu]?)(?:f|farad))"  # matches numbers followed by F, f, Farad, farad, pF, pf, nF, nf, uF, uf
+
+    # Search for the pattern in the description
+    match = re.search(pattern, description, re.IGNORECASE)
+    if match:
+        return match.group(0)
+    else:
+        print(f"Error: No value found for https://jlcpcb.com/partdetail/C{lcsc_id}  ({description})")
+        return None
+
+
+def extract_resistance_value(description, lcsc_id):
+    """
+    Extracts the resistance value from the given description based on the LCSC ID.
+    If the LCSC ID matches a known value, it returns the corresponding resistance.
+    Otherwise, it uses a regex pattern to extract the resistance from the description.
+
+    :param description: The description of the resistor.
+    :param lcsc_id: The LCSC ID of the resistor.
+    :return: The extracted resistance value as a string, or None if no value is found.
+    """
+    # Define known LCSC IDs and their corresponding resistance values
+    known_values = {22818: "16kΩ"}
+
+    # Check if the LCSC ID matches a known value
+    if lcsc_id in known_values:
+        return known_values[lcsc_id]
+
+    # Define a regex pattern to match resistance values
+    pattern = r"(\d+(?:\.\d+)?(?:[kMGT]?)(?:Ω|ohm))"  # matches numbers followed by Ω, ohm, Ohm, or OHM
+
+    # Search for the pattern in the description
+    match = re.search(pattern, description, re.IGNORECASE)
+    if match:
+        return match.group(0)
+    else:
+        print(f"Error: No value found for https://jlcpcb.com/partdetail/C{lcsc_id}  ({description})")
+        return None
+
+
+def extract_diode_type(description, pins, lcsc_id):
+    if lcsc_id == 2990493:
+        return "TVS-Bi"
+    if lcsc_id == 2990473:
+        return "TVS-Bi"
+    if lcsc_id == 2990416:
+        return "TVS-Bi"
+    if lcsc_id == 2990414:
+        return "TVS-Bi"
+    if lcsc_id == 2990261:
+        return "TVS-Bi"
+    if lcsc_id == 2990124:
+        return "TVS-Bi"
+    if lcsc_id == 3019524:
+        return "TVS-Bi"
+    if lcsc_id == 1323289:
+        return "TVS-Bi"
+    if lcsc_id == 3001945:
+        return "TVS-Uni"
+    if lcsc_id == 2833277:
+        return "TVS-Bi"
+    if lcsc_id == 2975471:
+        return "TVS-Uni"
+    if lcsc_id == 78395:
+        return "TVS-Bi"
+    if lcsc_id == 2925443:
+        return "TVS-Uni"
+    if lcsc_id == 2936988:
+        return "TVS-Bi"
+    if lcsc_id == 2925441:
+        return "TVS-Bi"
+    if lcsc_id == 2925451:
+        return "TVS-Bi"
+    if lcsc_id == 20617908:
+        return "TVS-Bi"
+    if lcsc_id == 20617910:
+        return "TVS-Bi"
+    if lcsc_id == 22466368:
+        return "Schottky13"
+    if lcsc_id == 22466371:
+        return "Schottky13"
+    if lcsc_id == 28646292:
+        return "Schottky"
+    if lcsc_id == 28646296:
+        return "Schottky"
+    if lcsc_id == 28646302:
+        return "Schottky"
+    if lcsc_id == 28646299:
+        return "Schottky"
+    if lcsc_id == 28646283:
+        return "Schottky"
+    if lcsc_id == 41411783:
+        return "TVS-Uni"
+    if lcsc_id == 41376087:
+        return "TVS-Uni"
+
+    diode_types = {
+        "Schottky": {"pins": 2, "type": "Schottky"},
+        "Recovery": {"pins": 2, "type": "Recovery"},
+        "General": {"pins": 2, "type": "General"},
+        "Switching": {"pins": 2, "type": "Switching"},
+        "Zener": {"pins": 2, "type": "Zener"},
+        "Bidirectional": {"pins": 2, "type": "TVS-Bi"},
+        "Unidirectional": {"pins": 2, "type": "TVS-Uni"},
+    }
+    for keyword, diode_info in diode_types.items():
+        if keyword.casefold() in description.casefold():
+            if diode_info["pins"] == pins:
+                return diode_info["type"]
+            elif keyword == "Zener" and pins == 3:
+                return "Zener13"
+            else:
+                return None
+    return None
+
+
+def extract_transistor_type(description, pins, footprint, lcsc_id):
+    if lcsc_id == 484513:
+        return "NMOS"
+    if lcsc_id == 396043:
+        return "NMOS"
+    if lcsc_id == 916398:
+        return "NMOS"
+    if lcsc_id == 296127:
+        return None
+    if lcsc_id == 41375139:
+        return "PNPC2"
+    if lcsc_id == 28646267:
+        return "NPNC2"
+
+    transistor_types = {
+        "PNP": {"pins": 3, "type": "PNP"},
+        "NPN": {"pins": 3, "type": "NPN"},
+        "NChannel": {"pins": 3, "type": "NMOS"},
+        "PChannel": {"pins": 3, "type": "PMOS"},
+        "N-Channel": {"pins": 3, "type": "NMOS"},
+        "P-Channel": {"pins": 3, "type": "PMOS"},
+    }
+    for keyword, transistor_info in transistor_types.items():
+        if keyword.casefold() in description.casefold():
+            if transistor_info["pins"] == pins:
+                if footprint == "SOT-89":
+                    return f"{transistor_info["type"]}C2"  # Collector/ and Emitter pin number is flipped
+                else:
+                    return transistor_info["type"]
+            else:
+                # print(f"Error: Number of pins ({pins}) does not match expected ({transistor_info['pins']}) for https://jlcpcb.com/partdetail/C{lcsc_id}  ({description})")
+                return None
+    # print(f"Error: No transistor type found for https://jlcpcb.com/partdetail/C{lcsc_id}  ({description})")
+    return None
+
+
+def extract_LED_value(description, lcsc):
+    if lcsc == 2985996:
+        return "Red", "LED"
+    elif lcsc == 34499:
+        return "White", "LED"
+    elif lcsc == 2986058:
+        return "Blue", "LED"
+    elif lcsc == 2986059:
+        return "Green", "LED"
+
+    color_pattern = r"(Red|Green|Blue|Yellow|White|Emerald)"
+
+    color_match = re.search(color_pattern, description, re.IGNORECASE)
+
+    if color_match:
+        color = color_match.group(0).replace("Emerald", "Green")
+        return color, "LED"
+    else:
+        print(f"Error: No LED value extracted for https://jlcpcb.com/partdetail/C{lcsc}  ({description})")
+        return None, None
+
+
+def extract_inductor_type_value(description, joints, lcsc):
+    current = None
+    if lcsc == 2827387:
+        current = "300mA"
+    if lcsc == 2827415:
+        current = "900mA"
+    if lcsc == 3007708:
+        current = "410mA"
+    if lcsc == 2844914:
+        current = "305mA"
+    if lcsc == 2827354:
+        current = "5.5A"
+    if lcsc == 2827458:
+        current = "400mA"
+    if lcsc == 2835403:
+        return "120nH,80mA", "Inductor"
+
+    # Define patterns to match inductance values
+    inductance_patterns = [
+        r"\b(\d+\.\d+[u|m|n]H)\b",  # e.g. 10.5uH, 10.5mH, 10.5nH
+        r"\b(\d+[u|m|n]H)\b",  # e.g. 10uH, 10mH, 10nH
+    ]
+
+    # Define patterns to match current values
+    current_patterns = [
+        r"(\d+(\.\d+)?)A",  # e.g. 1A, 2A, 4.95A
+        r"(\d+)mA",  # e.g. 100mA, 2000mA
+    ]
+
+    # Iterate over patterns and search for matches
+    for pattern in inductance_patterns:
+        inductance_match = re.search(pattern, description, re.IGNORECASE)
+        if inductance_match:
+            # Extract inductance value
+            inductance = inductance_match.group(1)
+
+            # Extract current value
+            if current == None:
+                for current_pattern in current_patterns:
+                    current_match = re.search(current_pattern, description, re.IGNORECASE)
+                    if current_match:
+                        current = current_match.group(1)
+                        if "mA" in current_pattern:
+                            current += "mA"
+                        else:
+                            current += "A"
+                        break
+                else:
+                    current = ""
+                    print(
+                        f"Error: No current value extracted for https://jlcpcb.com/partdetail/C{lcsc}  ({description})"
+                    )
+
+            # Return inductance and current values
+            return f"{inductance},{current}", "Inductor"
+
+    if "Ferrite" in description:
+        return "", "Ferrite"
+
+    # If no match is found, print an error message and return None
+    print(f"Error: No inductance value extracted for https://jlcpcb.com/partdetail/C{lcsc}  ({description})")
+    return None, None
+
+
+def extract_variable_resistor_type_value(description, lcsc):
+    # NTC Thermistors
+    if lcsc == 2991699:
+        return "NTC", "47kΩ,4050"
+    if "NTC" in description:
+        pattern = r"(\d+(?:\.\d+)?Ω)"  # matches numbers followed by Ω
+        match = re.search(pattern, description)
+        if match:
+            return "NTC", match.group(0)
+        else:
+            print(f"Error: Unknown resistance for https://jlcpcb.com/partdetail/C{lcsc}  ({description})")
+            return None, None
+
+    # Varistors (MOV)
+    elif "Varistors" in description:
+        return "MOV", ""
+
+    # Fuses
+    elif "Fuse" or "fuse" in description:
+        if lcsc == 2924957:
+            value = "1.5A"
+        elif lcsc == 2838983:
+            value = "1.5A"
+        else:
+            value = ""
+        if "Resettable" in description:
+            return "Fuse,Resettable", value
+        else:
+            return "Fuse", value
+
+    # Unknown
+    else:
+        print(f"Error: Unknown type for https://jlcpcb.com/partdetail/C{lcsc}  ({description})")
+        return None, None
+
+
+def extract_capacitor_voltage(description, lcsc):
+    voltage_pattern = r"\b(\d+(?:\.\d+)?)(V|kV)\b"
+    voltage_match = re.search(voltage_pattern, description, re.IGNORECASE)
+
+    if voltage_match:
+        return voltage_match.group(0)
+    else:
+        return None
+
+
+def get_basic_or_prefered_type(part):
+    if part.basic > 0:
+        return "Basic Component"
+    elif part.preferred > 0:
+        return "Preferred Component"
+    else:
+        print("extended component found")
+        return "Extended Component"
+
+
+def classify_part(part):
+    """
+    Works out where a part goes: sets its mode (auto-generated library), secondary_mode, value, units and footprint,
+    or returns the handmade library whose symbol for it should be updated.
+
+    :return: The handmade library name, or None.
+    """
+    lcsc = part.lcsc
+    category = part.main_category
+    subcategory = part.subcategory
+
+    if category == "Resistors" and lcsc != 2909989:
+        part.value = extract_resistance_value(part.description, lcsc)
+        if "x4" in part.footprint:
+            part.units = 4
+        part.mode = "Resistors"
+
+    elif category == "Capacitors":
+        part.value = extract_capacitor_value(part.description, lcsc)
+        part.mode = "Capacitors"
+        if lcsc == 360353:
+            part.footprint = "Plugin,P=5mm"
+        if part.attributes == {}:
+            # {'Voltage Rated': '50V', 'Tolerance': '±5%', 'Capacitance': '15pF', 'Temperature Coefficient': 'NP0'}
+            capacitor_voltage = extract_capacitor_voltage(part.description, lcsc)
+            if capacitor_voltage != None:
+                part.attributes = {"Voltage Rated": capacitor_voltage}
+
+    elif category == "Diodes" or ("TVS" in subcategory) or ("ESD" in subcategory):
+        part.value = extract_diode_type(part.description, part.joints, lcsc)
+        part.secondary_mode = part.value
+        part.mode = "Diodes"
+        if part.value == None:
+            return "Diode-Packages"
+
+    elif subcategory == "Light Emitting Diodes (LED)":
+        if lcsc == 2895565 or lcsc == 2835341:
+            return "Diode-Packages"
+        else:
+            part.value, part.secondary_mode = extract_LED_value(part.description, lcsc)
+            part.mode = "Diodes"
+
+    elif (
+        subcategory == "MOSFETs"
+        or (subcategory == "Bipolar Transistors - BJT")
+        or (subcategory == "Bipolar (BJT)")
+        or (category == "Triode/MOS Tube/Transistor")
+        or (category == "Transistors")
+        or (category == "Transistors/Thyristors")
+    ):
+        part.footprint = get_footprint_package(part.footprint)  # Named after the package of their footprint
+
+        part.value = extract_transistor_type(part.description, part.joints, part.footprint, lcsc)
+        part.secondary_mode = part.value
+        part.mode = "Transistors"
+        if part.value == None:
+            return "Transistor-Packages"
+
+    elif subcategory == "Inductors (SMD)" or (subcategory == "Ferrite Beads") or (subcategory == "Power Inductors"):
+        part.value, part.secondary_mode = extract_inductor_type_value(part.description, part.joints, lcsc)
+        part.mode = "Inductors"
+
+    elif subcategory == "Crystals" or subcategory == "Oscillators":
+        return "Crystals"
+
+    elif (
+        subcategory == "NTC Thermistors"
+        or (subcategory == "Varistors")
+        or (subcategory == "Fuses")
+        or (subcategory == "Resettable Fuses")
+    ):
+        part.secondary_mode, part.value = extract_variable_resistor_type_value(part.description, lcsc)
+        part.mode = "Variable-Resistors"
+        if lcsc == 210465:
+            part.footprint = "Plugin,P=5mm"
+
+    elif category == "Embedded Processors & Controllers" or (category == "Single Chip Microcomputer/Microcontroller"):
+        return "MCUs"
+
+    elif category == "Connectors" or (category == "Key/Switch") or (category == "Switches") or (lcsc == 2909989):
+        return "Connectors_Buttons"
+
+    elif category == "Power Management" or (category == "Power Management ICs") or (lcsc == 394180):
+        return "Power"
+
+    elif (
+        category == "Amplifiers"
+        or (category == "Operational Amplifier/Comparator")
+        or subcategory == "Analog Switches / Multiplexers"
+        or subcategory == "Digital Potentiometers"
+    ):
+        return "Analog"
+
+    elif category == "Memory":
+        return "Memory"
+
+    elif (
+        category == "Communication Interface Chip"
+        or (category == "Communication Interface Chip/UART/485/232")
+        or (category == "Interface ICs")
+        or (category == "Signal Isolation Devices")
+    ):
+        return "Interface"
+
+    elif category == "Nixie Tube Driver/LED Driver" or (subcategory == "LCD Drivers"):
+        return "Display-Drivers"
+
+    elif (
+        subcategory == "Current Transformers"
+        or (subcategory == "Common Mode Filters")
+        or (subcategory == "Color Ring Inductors / Through Hole Inductors")
+    ):
+        return "Transformers"
+
+    elif (
+        category == "Optocoupler"
+        or (subcategory == "Optocouplers")
+        or (subcategory == "Optocouplers - Phototransistor Output")
+        or (subcategory == "Reflective Optical Interrupters")
+    ):
+        return "Optocouplers"
+
+    elif (
+        category == "Logic ICs"
+        or (subcategory == "Real-time Clocks (RTC)")
+        or (subcategory == "Timers / Clock Oscillators")
+        or (subcategory == "Real-Time Clocks(RTC)")
+        or (subcategory == "Clock Buffers/Drivers/Distributions")
+        or (subcategory == "Hall Sensor")
+    ):
+        # print(f"{lcsc},")
+        return "ICs"
+
+    return None
+
+
+def get_shard_library_name(lib_name, shard_by, footprint, secondary_mode):
+    """
+    Returns the name of the (sharded) library a part is written to.
+
+    :param lib_name: The auto-generated library the part belongs to (e.g. Resistors).
+    :param shard_by: "none", "package" or "type" (the diode/transistor/inductor sub-type, falling back to package).
+    :return: The library name, e.g. Resistors, Resistors-0402 or Diodes-LED.
+    """
+    if shard_by == "none":
+        return lib_name
+
+    if shard_by == "type" and secondary_mode != None and secondary_mode != "":
+        shard = secondary_mode
+    else:
+        shard = get_footprint_package(footprint)
+
+    shard = re.sub(r"[^\w.+-]+", "_", shard).strip("_")  # Keep library names filename and nickname safe
+    return f"{lib_name}-{shard}"
+
+
+def get_part_order_key(part):
+    """
+    Sort key that puts the auto-generated parts in a canonical order: by library, package, value (numerically when
+    it is one, so 4.7kΩ comes before 10kΩ) and LCSC id. The libraries then don't depend on the order of the parts
+    list's rows, and parts with the same name get their ",(2)" style suffixes in LCSC id order, so a part that
+    hasn't changed keeps its name and its symbol stays the same from one run to the next.
+    """
+    number = parse_si_value(part.value)
+    return (
+        part.mode,
+        get_footprint_package(part.footprint),
+        number == None,  # Values that aren't numbers (e.g. LED colours) after the numbers
+        number if number != None else 0.0,
+        f"{part.value}",
+        part.lcsc,
+    )
+
+
+def generate_kicad_symbol_libs(symbols, auto_library_names, transaction=None):
+    """
+    Writes one .kicad_sym file per library and removes auto-generated libraries (or shards of them)
+    that are no longer produced, e.g. after switching the shard key.
+
+    :param symbols: dict of library name -> list of symbols, already in the layout they are written in.
+    :param auto_library_names: The unsharded auto-generated library names (e.g. Resistors).
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    """
+    for lib_name, symbol_list in symbols.items():
+        lib_content = "(kicad_symbol_lib\n"
+        lib_content += "\t(version 20231120)\n"
+        lib_content += '\t(generator "CDFER")\n'
+        lib_content += '\t(generator_version "8.0")\n'
+        for symbol in symbol_list:
+            lib_content += symbol + "\n"
+        lib_content += ")\n"
+
+        lib_content = lib_content.replace("℃", "°C")
+
+        library_filename = f"JLCPCB-Kicad-Symbols/JLCPCB-{lib_name}.kicad_sym"
+        data = lib_content.encode("utf-8")
+        if read_symbol_index(library_filename, transaction) != None:
+            with open(get_transaction_path(transaction, library_filename), "rb") as file:
+                if file.read() == data:
+                    continue  # Unchanged (e.g. none of its parts changed in a --delta run), nor is its index
+        write_transaction_file(transaction, library_filename, data)
+        write_symbol_index(library_filename, transaction=transaction)
+
+    for symbol_lib_filename in list_transaction_dir(transaction, "JLCPCB-Kicad-Symbols"):
+        lib_name = symbol_lib_filename.removeprefix("JLCPCB-").removesuffix(".kicad_sym.idx").removesuffix(".kicad_sym")
+        if symbol_lib_filename.endswith((".kicad_sym", ".kicad_sym.idx")) and lib_name not in symbols:
+            for auto_library_name in auto_library_names:
+                if lib_name == auto_library_name or lib_name.startswith(f"{auto_library_name}-"):
+                    remove_transaction_file(transaction, os.path.join("JLCPCB-Kicad-Symbols", symbol_lib_filename))
+                    print(f"Removed stale symbol library: {symbol_lib_filename}")
+                    break
+
+
+def generate_sym_lib_table(uri_prefix="${KIPRJMOD}/JLCPCB-Kicad-Library", transaction=None):
+    """
+    Writes a sym-lib-table listing every symbol library, ready to be copied into a project's sym-lib-table.
+
+    :param uri_prefix: Where the library folder lives relative to the KiCad project (the git submodule path by default).
+    :param transaction: Stage the write in this transaction (see fileTransaction.py) instead of writing it straight away.
+    """
+    lib_content = "(sym_lib_table\n"
+    lib_content += "\t(version 7)\n"
+    for symbol_lib_filename in sorted(list_transaction_dir(transaction, "JLCPCB-Kicad-Symbols")):
+        if symbol_lib_filename.endswith(".kicad_sym"):
+            lib_name = os.path.splitext(symbol_lib_filename)[0]
+            uri = f"{uri_prefix}/JLCPCB-Kicad-Symbols/{symbol_lib_filename}"
+            lib_content += f'\t(lib (name "{lib_name}")(type "KiCad")(uri "{uri}")(options "")(descr ""))\n'
+    lib_content += ")\n"
+
+    write_transaction_file(transaction, "sym-lib-table", lib_content.encode("utf-8"))
+
+
+auto_library_names = [
+    "Resistors",
+    "Capacitors",
+    "Diodes",
+    "Transistors",
+    "Inductors",
+    "Variable-Resistors",
+]
+
+
+def download_stage(run):
+    if run["args"].stream and not run["args"].delta:
+        return  # classify_stage downloads the parts list while it reads it
+    if download_parts_csv() == False:
+        if not os.path.exists(parts_csv_filename):
+            print(f"Error: No {parts_csv_filename} to build the library from")
+            exit(1)
+        print(f"Building from the {parts_csv_filename} downloaded before")
+
+
+def classify_parts(df, classification_cache, symbol_archive, handmade_libraries, transaction=None):
+    """
+    Classifies the parts of a parts list DataFrame, updating the handmade libraries (and restoring archived parts)
+    as it goes. The rows of the parts that went in a library are dropped from df, leaving the leftovers.
+    The handmade libraries are edited in memory, see save_handmade_libraries.
+
+    :return: The classified parts for the auto-generated libraries (Part dicts, in parts list order).
+    """
+    classified_parts = []
+    for index, part in iter_parts(df):
+        lcsc = part.lcsc
+
+        if part.price > 3.0 or part.footprint == "0201" or lcsc == 882967:
+            df.drop(index=index, inplace=True)
+        else:
+            part.component_class = get_basic_or_prefered_type(part)
+
+            handmade_library = classify_part_cached(classification_cache, part, classify_part)
+            if handmade_library != None:
+                if (
+                    update_component_inplace(
+                        part,
+                        handmade_library,
+                        include_datasheet=handmade_library != "MCUs",
+                        archive=symbol_archive,
+                        transaction=transaction,
+                        libraries=handmade_libraries,
+                    )
+                    == True
+                ):
+                    df.drop(index=index, inplace=True)
+
+            if part.value != None:
+                df.drop(index=index, inplace=True)
+                classified_parts.append(part.to_dict())
+    return classified_parts
+
+
+def classify_changed_parts(snapshot, classification_cache, symbol_archive, handmade_libraries, transaction=None):
+    """
+    Classifies just the parts added or changed since the parts snapshot, the rest are taken from the snapshot.
+    Parts where only the stock, price or class changed aren't classified again: the auto-generated ones get the new
+    values, the symbols of the handmade ones are refreshed in place (see volatileRefresh.py).
+
+    :param snapshot: The last run's snapshot, see load_parts_snapshot.
+    :return: (classified parts in parts list order, every LCSC id in the parts list, leftover LCSC ids, the delta).
+    """
+    df = read_parts_csv("jlcpcb-components-basic-preferred.csv")[0]
+    delta = compute_parts_delta(snapshot["parts"], df)
+    print_parts_delta(delta)
+    changed = set(delta["added"]) | set(delta["changed"])
+    outdated = changed | set(delta["removed"])
+
+    classified = {part["lcsc"]: part for part in snapshot["classified-parts"] if part["lcsc"] not in outdated}
+    leftover = set(snapshot["leftover"]) - outdated
+
+    handmade_values = {}
+    for _, part in iter_parts(df[df["lcsc"].isin(delta["refreshed"])]):
+        if part.lcsc in classified or part.lcsc in leftover:
+            if part.price > 3.0:
+                # Left out by classify_parts now
+                changed.add(part.lcsc)
+                classified.pop(part.lcsc, None)
+                leftover.discard(part.lcsc)
+            elif part.lcsc in classified:
+                classified[part.lcsc].update(
+                    price=part.price,
+                    price_str=part.price_str,
+                    stock=part.stock,
+                    basic=part.basic,
+                    preferred=part.preferred,
+                    component_class=get_basic_or_prefered_type(part),
+                )
+        elif "price" in delta["refreshed"][part.lcsc]:
+            changed.add(part.lcsc)  # Handmade or left out by price before, classifying it again works out which
+        else:
+            handmade_values[f"C{part.lcsc}"] = {
+                "Stock": f"{part.stock}",
+                "Price": part.price_str,
+                "Class": get_basic_or_prefered_type(part),
+            }
+    if len(handmade_values) > 0:
+        # Before the handmade libraries are loaded for the changed parts, so they are loaded with the new values
+        library_filenames = [
+            os.path.join("JLCPCB-Kicad-Symbols", f"JLCPCB-{library_name}.kicad_sym")
+            for library_name in handmade_library_names
+        ]
+        refreshed_symbols, _ = refresh_libraries_volatile_properties(
+            [filename for filename in library_filenames if os.path.exists(get_transaction_path(transaction, filename))],
+            handmade_values,
+            transaction,
+        )
+        print(f"Refreshed the stock, price and class of {refreshed_symbols} handmade symbols in place")
+
+    changed_df = df[df["lcsc"].isin(changed)].copy()
+    for part in classify_parts(changed_df, classification_cache, symbol_archive, handmade_libraries, transaction):
+        classified[part["lcsc"]] = part
+    leftover.update(changed_df["lcsc"].tolist())
+
+    # The unchanged parts weren't classified, keep their classifications in the cache for the next full run
+    lcsc_order = df["lcsc"].tolist()
+    used = classification_cache["used"]
+    classification_cache["used"] = {}
+    for lcsc in lcsc_order:
+        entry = used.get(f"C{lcsc}", classification_cache["parts"].get(f"C{lcsc}"))
+        if entry != None:
+            classification_cache["used"][f"C{lcsc}"] = entry
+
+    # Parts that weren't used, for checking nothing was missed
+    write_transaction_file(
+        transaction, "leftover.csv", df[df["lcsc"].isin(leftover)].to_csv(index=False).encode("utf-8")
+    )
+
+    classified_parts = [classified[lcsc] for lcsc in lcsc_order if lcsc in classified]
+    return classified_parts, set(lcsc_order), leftover, delta
+
+
+def classify_stage(run):
+    """
+    Classifies every part of the parts list (or with --delta just the parts that changed since the last run),
+    updating the handmade libraries (and restoring archived parts) as it goes.
+
+    :return: The classified-parts table (the parts for the auto-generated libraries), the stock-index
+             (every LCSC id in the parts list), the parts-delta ({} unless this was a --delta run), the parts-changes
+             since the last run for the changelog ({} if there was no last run) and the restored-parts.
+    """
+    args = run["args"]
+    classifier_version = get_classifier_version(
+        [
+            classify_part,
+            extract_capacitor_value,
+            extract_resistance_value,
+            extract_diode_type,
+            extract_transistor_type,
+            extract_LED_value,
+            extract_inductor_type_value,
+            extract_variable_resistor_type_value,
+            extract_capacitor_voltage,
+            get_footprint_package,
+        ],
+        [package_name_replacements, footprint_package_names],
+    )
+    classification_cache = load_classification_cache(
+        classifier_version, None if args.no_cache else classification_cache_filename
+    )
+    symbol_archive = load_symbol_archive(transaction=run["transaction"])
+    handmade_libraries = {}
+
+    snapshot = None
+    if args.delta and args.no_cache:
+        print("--no-cache classifies every part again, ignoring --delta")
+    elif args.delta:
+        snapshot = load_parts_snapshot(classifier_version)
+
+    delta = {}
+    if snapshot != None:
+        classified_parts, lcsc_in_stock, leftover, delta = classify_changed_parts(
+            snapshot, classification_cache, symbol_archive, handmade_libraries, run["transaction"]
+        )
+    else:
+        classified_parts = []
+        lcsc_in_stock = set()
+        leftover = set()
+        leftover_csv = []
+        if args.stream and not args.delta:
+            parts_csv = stream_parts_csv(chunksize=args.chunk_size or 2000)
+        else:
+            parts_csv = read_parts_csv("jlcpcb-components-basic-preferred.csv", chunksize=args.chunk_size)
+        for df in parts_csv:
+            lcsc_in_stock.update(df["lcsc"].tolist())
+            classified_parts += classify_parts(
+                df, classification_cache, symbol_archive, handmade_libraries, run["transaction"]
+            )
+
+            # Parts that weren't used, for checking nothing was missed
+            leftover_csv.append(df.to_csv(index=False, header=len(leftover_csv) == 0))
+            leftover.update(df["lcsc"].tolist())
+        write_transaction_file(run["transaction"], "leftover.csv", "".join(leftover_csv).encode("utf-8"))
+
+    # The parts list the snapshot still holds is the last run's until it is saved below
+    parts_changes = {}
+    previous_parts_filename = get_transaction_path(run["transaction"], parts_snapshot_filename)
+    if os.path.exists(previous_parts_filename):
+        parts_changes = compute_parts_changes(
+            read_parts_csv(previous_parts_filename, changelog_columns)[0],
+            read_parts_csv("jlcpcb-components-basic-preferred.csv", changelog_columns)[0],
+        )
+
+    save_classification_cache(classification_cache, transaction=run["transaction"])
+    save_handmade_libraries(handmade_libraries, run["transaction"])
+    save_symbol_archive(symbol_archive, run["transaction"])
+    save_parts_snapshot(classifier_version, classified_parts, leftover, transaction=run["transaction"])
+    return {
+        "classified-parts": classified_parts,
+        "stock-index": sorted(lcsc_in_stock),
+        "parts-delta": delta,
+        "parts-changes": parts_changes,
+        "restored-parts": symbol_archive["restored"],
+    }
+
+
+def render_stage(run):
+    """
+    Generates the symbols (and database rows) of the classified parts, in canonical order (see get_part_order_key).
+    Each part's footprint is resolved first (see footprintResolver.py), with --skip-missing-footprints the parts
+    whose footprint doesn't exist are left out.
+
+    :return: The rendered-symbols: symbols (library name -> symbols, in the --pretty layout or compact), database_parts,
+             generic_symbols and pretty.
+    """
+    args = run["args"]
+
+    if args.shard_by == "none":
+        symbols = {lib_name: [] for lib_name in auto_library_names}
+    else:
+        symbols = {}  # Shards are created as parts are found
+
+    database_parts = {lib_name: [] for lib_name in auto_library_names}
+    generic_symbols = {}
+
+    names_lookup = []
+    database_names_lookup = []
+
+    parts = sorted((Part(**fields) for fields in get_artifact(run, "classified-parts")), key=get_part_order_key)
+    parts, _ = resolve_footprints(
+        [(get_part_footprint_name(part), part) for part in parts],
+        load_footprints_lookup(run["transaction"]),
+        reject=args.skip_missing_footprints,
+    )
+    for part in parts:
+        if args.output != "symbols":
+            database_part = generate_database_part(part, database_names_lookup)
+            database_parts[part.mode].append(database_part)
+            generic_symbol_name = database_part["Symbol"].split(":", 1)[1]
+            generic_symbols[generic_symbol_name] = (part.mode, part.secondary_mode, part.footprint, part.units)
+
+        if args.output == "database":
+            continue
+
+        symbol = generate_kicad_symbol(part, names_lookup, pretty=args.pretty)
+        shard_lib_name = get_shard_library_name(part.mode, args.shard_by, part.footprint, part.secondary_mode)
+        symbols.setdefault(shard_lib_name, []).append(symbol)
+
+    return {
+        "rendered-symbols": {
+            "symbols": symbols,
+            "database_parts": database_parts,
+            "generic_symbols": generic_symbols,
+            "pretty": args.pretty,
+        }
+    }
+
+
+def write_stage(run):
+    args = run["args"]
+    rendered = get_artifact(run, "rendered-symbols")
+    if rendered.get("pretty") != args.pretty and args.output != "database":
+        # e.g. --stage write --pretty, the symbols are rendered again in the layout asked for
+        rendered = render_stage(run)["rendered-symbols"]
+    if args.output != "database":
+        generate_kicad_symbol_libs(rendered["symbols"], auto_library_names, run["transaction"])
+        generate_sym_lib_table(transaction=run["transaction"])
+    if args.output != "symbols":
+        generate_kicad_database_lib(rendered["database_parts"], rendered["generic_symbols"], run["transaction"])
+
+
+def archive_stage(run):
+    delta = get_artifact(run, "parts-delta")
+    dropped = delta["removed"] if len(delta) > 0 else None  # A --delta run only looks for the removed parts
+    archived = archive_dropped_symbols(set(get_artifact(run, "stock-index")), run["transaction"], dropped)
+    return {"archived-parts": archived}
+
+
+def check_stage(run):
+    check_footprints(run["transaction"])
+    check_models(run["transaction"])
+
+
+def history_stage(run):
+    append_stock_history(transaction=run["transaction"])
+
+
+def changelog_stage(run):
+    write_update_changelog(
+        get_artifact(run, "parts-changes"),
+        get_artifact(run, "archived-parts"),
+        get_artifact(run, "restored-parts"),
+        run["transaction"],
+    )
+
+
+pipeline_stages = [
+    ("download", download_stage),
+    ("classify", classify_stage),
+    ("render", render_stage),
+    ("write", write_stage),
+    ("archive", archive_stage),
+    ("check", check_stage),
+    ("history", history_stage),
+    ("changelog", changelog_stage),
+]
+
+
+def run_build(args):
+    """
+    Runs the whole pipeline, or just args.stage, carrying on from where an interrupted run stopped.
+
+    :param args: The options of the build command (see libraryCreatorScript.py).
+    """
+    if args.restart and os.path.exists(get_checkpoint_filename("state")):
+        os.remove(get_checkpoint_filename("state"))
+
+    run = {
+        "args": args,
+        # A run is only resumed with the same options, as they change what the stages produce
+        "options": {
+            "output": args.output,
+            "shard_by": args.shard_by,
+            "pretty": args.pretty,
+            "chunk_size": args.chunk_size,
+            "no_cache": args.no_cache,
+            "delta": args.delta,
+            "stream": args.stream,
+            "skip_missing_footprints": args.skip_missing_footprints,
+        },
+        "artifacts": {},
+    }
+    run_pipeline(pipeline_stages, run, args.stage)
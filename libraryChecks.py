@@ -0,0 +1,165 @@
+# libraryChecks.py
+# Checks every symbol has its footprint and every footprint its 3D model, archiving the ones nothing uses
+# (and un-archiving the ones that are needed again)
+import os
+import re
+from kicadSexpr import *  # kicadSexpr.py
+from fileTransaction import *  # fileTransaction.py
+
+
+def check_models(transaction=None):
+    exempt_footprints = [
+        "Hole, 3mm",
+        "Hole_Tooling_JLCPCB",
+        "MouseBites, Cosmetic, JLCPCB, 1.6mm",
+        "MouseBites, Mechanical, JLCPCB, 1.6mm",
+        "Part_Num_JLCPCB",
+    ]
+
+    footprints_folder_path = "JLCPCB-Kicad-Footprints"
+    models_folder_path = os.path.join(footprints_folder_path, "3dModels")
+    archived_models_folder_path = os.path.join("Archived-Symbols-Footprints", models_folder_path)
+
+    footprint_names = [
+        os.path.splitext(filename)[0]
+        for filename in list_transaction_dir(transaction, footprints_folder_path)
+        if filename.endswith(".kicad_mod")
+    ]
+    archived_model_names = [
+        os.path.splitext(filename)[0]
+        for filename in list_transaction_dir(transaction, archived_models_folder_path)
+        if filename.endswith(".step")
+    ]
+    model_names = [
+        os.path.splitext(filename)[0]
+        for filename in list_transaction_dir(transaction, models_folder_path)
+        if filename.endswith(".step")
+    ]
+
+    model_names_used = []
+
+    for footprint_name in footprint_names:
+        footprint_file_path = os.path.join(footprints_folder_path, f"{footprint_name}.kicad_mod")
+
+        with open(get_transaction_path(transaction, footprint_file_path), "r") as file:
+            footprint = parse_sexpr(file.read())[0]
+            model = find_sexpr_child(footprint, "model")
+
+            if model != None and len(model) > 1:
+                model_path = unquote_sexpr_string(model[1])
+                model = re.search(r'/3dModels/([^"]+).step', model_path)
+                if model:
+                    model = model.group(1)
+                    if model not in model_names:
+                        if model in archived_model_names:
+                            post_move_file_path = os.path.join(models_folder_path, f"{model}.step")
+                            pre_move_file_path = os.path.join(archived_models_folder_path, f"{model}.step")
+                            move_transaction_file(transaction, pre_move_file_path, post_move_file_path)
+                            archived_model_names.remove(model)
+                            print(f"Un-archived needed model: {model}")
+                        else:
+                            print(f"Missing 3D Model for Footprint: {footprint_name} ({model_path})")
+                    else:
+                        model_names_used.append(model)
+                else:
+                    print(f"Incorrect Model path for Footprint: {footprint_name} ({model_path})")
+            elif footprint_name not in exempt_footprints:
+                print(f"Empty Model Field for Footprint: {footprint_name}")
+
+    for model in model_names:
+        if model not in model_names_used:
+            pre_move_file_path = os.path.join(models_folder_path, f"{model}.step")
+            post_move_file_path = os.path.join(archived_models_folder_path, f"{model}.step")
+            move_transaction_file(transaction, pre_move_file_path, post_move_file_path)
+            print(f"Archived unused model: {model}")
+
+
+def iter_database_footprints(database_filename, transaction=None):
+    """
+    Yields (part name, footprint) for each footprint the parts tables of the database library (--output database or
+    both, see databaseLibrary.py) link to, with the name of one of the parts using it.
+    """
+    database_path = get_transaction_path(transaction, database_filename)
+    if not os.path.exists(database_path):
+        return
+    import sqlite3
+
+    connection = sqlite3.connect(f"file:{database_path}?mode=ro", uri=True)
+    try:
+        tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            yield from connection.execute(
+                f'SELECT MIN("Name"), "Footprint" FROM "{table}" WHERE "Footprint" != \'\' GROUP BY "Footprint"'
+            )
+    finally:
+        connection.close()
+
+
+def check_footprints(transaction=None, database_filename=os.path.join("JLCPCB-Kicad-Database", "JLCPCB-Parts.sqlite")):
+    """
+    Checks the footprint of every symbol and of every part in the database library exists, un-archiving the ones that
+    are needed again, and archives the footprints nothing links to.
+    """
+    symbols_folder_path = "JLCPCB-Kicad-Symbols"
+    footprints_folder_path = "JLCPCB-Kicad-Footprints"
+    archived_footprints_folder_path = os.path.join("Archived-Symbols-Footprints", footprints_folder_path)
+
+    archived_footprint_names = [
+        os.path.splitext(filename)[0]
+        for filename in list_transaction_dir(transaction, archived_footprints_folder_path)
+        if filename.endswith(".kicad_mod")
+    ]
+    footprint_names = [
+        os.path.splitext(filename)[0]
+        for filename in list_transaction_dir(transaction, footprints_folder_path)
+        if filename.endswith(".kicad_mod")
+    ]
+    footprint_names_used = []
+
+    # (symbol or part name, its Footprint, the file it is in) of everything that links to a footprint
+    footprint_links = []
+    for symbol_lib_filename in list_transaction_dir(transaction, symbols_folder_path):
+        footprint_file_path = os.path.join(symbols_folder_path, symbol_lib_filename)
+
+        if os.path.isfile(get_transaction_path(transaction, footprint_file_path)) and symbol_lib_filename.endswith(
+            ".kicad_sym"
+        ):
+            with open(get_transaction_path(transaction, footprint_file_path), "r") as file:
+                for symbol in iter_sexpr_lists(file.read()):
+                    if symbol.head != "symbol":
+                        continue
+                    symbol_name = unquote_sexpr_string(symbol[1])
+                    footprint_name = get_symbol_property(symbol, "Footprint", "")
+                    if footprint_name != "":
+                        footprint_links.append((symbol_name, footprint_name, footprint_file_path))
+    for part_name, footprint_name in iter_database_footprints(database_filename, transaction):
+        footprint_links.append((part_name, footprint_name, database_filename))
+
+    for symbol_name, footprint_name, footprint_file_path in footprint_links:
+        footprint_lib_match = re.search(r'JLCPCB-Kicad-Footprints:([^"]+)', footprint_name)
+        if footprint_lib_match:
+            footprint_name = footprint_lib_match.group(1)
+            if footprint_name not in footprint_names:
+                if footprint_name in archived_footprint_names:
+                    post_move_file_path = os.path.join(footprints_folder_path, f"{footprint_name}.kicad_mod")
+                    pre_move_file_path = os.path.join(archived_footprints_folder_path, f"{footprint_name}.kicad_mod")
+                    move_transaction_file(transaction, pre_move_file_path, post_move_file_path)
+                    archived_footprint_names.remove(footprint_name)
+                    footprint_names.append(footprint_name)
+                    footprint_names_used.append(footprint_name)
+                    print(f"Un-archived needed footprint: {footprint_name}")
+                else:
+                    print(f"Missing Footprint For Symbol: {symbol_name} -> {footprint_name} ({footprint_file_path})")
+            else:
+                footprint_names_used.append(footprint_name)
+        else:
+            print(
+                f"Incorrect Symbol Footprint Library For Symbol: {symbol_name} -> {footprint_name} ({footprint_file_path})"
+            )
+
+    for footprint in footprint_names:
+        if footprint not in footprint_names_used:
+            pre_move_file_path = os.path.join(footprints_folder_path, f"{footprint}.kicad_mod")
+            post_move_file_path = os.path.join(archived_footprints_folder_path, f"{footprint}.kicad_mod")
+            move_transaction_file(transaction, pre_move_file_path, post_move_file_path)
+            print(f"Archived unused footprint: {footprint}")
@@ -0,0 +1,333 @@
+# parametricSearch.py
+# Parametric search over the generated symbol libraries, e.g.
+#   python parametricSearch.py nearest Resistors 4.99k --package 0402
+#   python parametricSearch.py range Capacitors --min 10u --package 0603 --min-voltage 16
+import argparse
+import os
+import re
+import time
+import numpy as np
+from kicadSexpr import *  # kicadSexpr.py
+
+# Libraries that can be searched by value, and the unit their values are in
+parametric_libraries = {"Resistors": "Ω", "Capacitors": "F", "Inductors": "H", "Variable-Resistors": "Ω"}
+
+# Powers of ten of the SI prefixes, the value is built as "<number>e<power>" so 10uF is exactly 10e-6.
+# Prefixes are case sensitive (m is milli, M is mega), u/µ/μ and K are the only aliases.
+si_prefixes = {
+    "p": -12,
+    "n": -9,
+    "u": -6,
+    "µ": -6,
+    "μ": -6,
+    "m": -3,
+    "": 0,
+    "k": 3,
+    "K": 3,
+    "M": 6,
+    "G": 9,
+    "T": 12,
+}
+
+si_value_pattern = re.compile(
+    r"^\s*(\d+(?:\.\d+)?|\.\d+)\s*((?-i:[pnuµμmkKMGT]?))\s*(Ω|ohms?|F|H|V|A|W)?\s*$", re.IGNORECASE
+)
+
+# 4k7 / 2R2 / 4n7 style values
+si_infix_pattern = re.compile(r"^\s*(\d+)([pnuµμmkKMGTR])(\d+)\s*(Ω|ohms?|F|H|V|A|W)?\s*$")
+
+
+def parse_si_value(text, unit=None):
+    """
+    Converts a value string like "4.7kΩ", "100nF", "10uH,900mA", "4k7" or "16V" to a float in SI units.
+    Only the first comma separated field is used (inductors carry their current after the value).
+
+    :param text: The value string.
+    :param unit: If given, the value must be in this unit (or have no unit) to be accepted.
+    :return: The value as a float, or None if it can't be read.
+    """
+    if text == None:
+        return None
+    text = f"{text}".split(",")[0]
+
+    match = si_value_pattern.match(text)
+    if match:
+        number, prefix, value_unit = match.groups()
+    else:
+        match = si_infix_pattern.match(text)
+        if match == None:
+            return None
+        whole, prefix, fraction, value_unit = match.groups()
+        number = f"{whole}.{fraction}"
+        if prefix == "R":
+            prefix = ""
+
+    if value_unit != None and value_unit.lower().startswith("ohm"):
+        value_unit = "Ω"
+    if prefix not in si_prefixes:
+        return None
+    if unit != None and value_unit != None and value_unit.upper() != unit.upper():
+        return None
+    return float(f"{number}e{si_prefixes[prefix]}")
+
+
+def parse_tolerance(text):
+    """Converts a tolerance like "±1%" to a fraction (0.01), absolute tolerances like "±0.25pF" give None."""
+    match = re.match(r"^\s*±?\s*(\d+(?:\.\d+)?)\s*%\s*$", f"{text}")
+    if match == None:
+        return None
+    return float(match.group(1)) / 100
+
+
+def format_si_value(value, unit=""):
+    """Formats a float the way the library values are written, e.g. 4700.0 -> "4.7kΩ"."""
+    if value == 0:
+        return f"0{unit}"
+    for prefix in ["T", "G", "M", "k", "", "m", "u", "n", "p"]:
+        if abs(value) >= 10.0 ** si_prefixes[prefix] * 0.9995:
+            return f"{value / 10.0 ** si_prefixes[prefix]:.4g}{prefix}{unit}"
+    return f"{value:.4g}{unit}"
+
+
+def get_parametric_library_name(lib_name):
+    """Maps a (possibly sharded) library name like "Resistors-0402" to its searchable library, or None."""
+    # Longest name first so Variable-Resistors isn't taken for a Resistors shard
+    for library in sorted(parametric_libraries, key=len, reverse=True):
+        if lib_name == library or lib_name.startswith(f"{library}-"):
+            return library
+    return None
+
+
+def read_parametric_parts(symbols_folder="JLCPCB-Kicad-Symbols"):
+    """
+    Reads the searchable parts out of the generated symbol libraries.
+
+    :return: A list of dicts with library, package, tolerance, voltage, value, stock, price, lcsc and name.
+    """
+    parts = []
+    for symbol_lib_filename in sorted(os.listdir(symbols_folder)):
+        if not symbol_lib_filename.endswith(".kicad_sym"):
+            continue
+        lib_name = symbol_lib_filename.removeprefix("JLCPCB-").removesuffix(".kicad_sym")
+        library = get_parametric_library_name(lib_name)
+        if library == None:
+            continue
+
+        with open(os.path.join(symbols_folder, symbol_lib_filename), "r") as file:
+            text = file.read()
+
+        for symbol in iter_sexpr_lists(text):
+            if symbol.head != "symbol":
+                continue
+            value = parse_si_value(get_symbol_property(symbol, "Value"), parametric_libraries[library])
+            if value == None:
+                continue
+
+            footprint = get_symbol_property(symbol, "Footprint", "")
+            package = footprint.split(":")[-1].split("_", 1)[-1]
+            voltage = get_symbol_property(symbol, "Voltage Rated", get_symbol_property(symbol, "Rated Voltage"))
+            price = re.match(r"^\s*(\d+(?:\.\d+)?)", get_symbol_property(symbol, "Price", ""))
+            stock = get_symbol_property(symbol, "Stock", "0")
+
+            parts.append(
+                {
+                    "library": library,
+                    "package": package,
+                    "tolerance": parse_tolerance(get_symbol_property(symbol, "Tolerance", "")),
+                    "voltage": parse_si_value(voltage, "V"),
+                    "value": value,
+                    "stock": int(stock) if stock.isdigit() else 0,
+                    "price": float(price.group(1)) if price else np.nan,
+                    "lcsc": get_symbol_property(symbol, "LCSC", ""),
+                    "name": unquote_sexpr_string(symbol[1]),
+                }
+            )
+    return parts
+
+
+def build_parametric_index(parts):
+    """
+    Groups parts by (library, package, tolerance, voltage) and sorts every group by value, so a query only
+    has to pick the matching groups and binary search each of them.
+
+    :param parts: list of part dicts from read_parametric_parts.
+    :return: dict of (library, package, tolerance, voltage) -> dict of numpy arrays
+             (value, stock, price, lcsc, name), all sorted by value.
+    """
+    grouped = {}
+    for part in parts:
+        key = (part["library"], part["package"], part["tolerance"], part["voltage"])
+        grouped.setdefault(key, []).append(part)
+
+    index = {}
+    for key, group_parts in grouped.items():
+        values = np.array([part["value"] for part in group_parts], dtype=np.float64)
+        order = np.argsort(values, kind="stable")
+        index[key] = {
+            "value": values[order],
+            "stock": np.array([part["stock"] for part in group_parts], dtype=np.int64)[order],
+            "price": np.array([part["price"] for part in group_parts], dtype=np.float64)[order],
+            "lcsc": np.array([part["lcsc"] for part in group_parts])[order],
+            "name": np.array([part["name"] for part in group_parts])[order],
+        }
+    return index
+
+
+def load_parametric_index(symbols_folder="JLCPCB-Kicad-Symbols"):
+    return build_parametric_index(read_parametric_parts(symbols_folder))
+
+
+def get_matching_groups(index, library, package=None, max_tolerance=None, min_voltage=None):
+    for key, group in index.items():
+        group_library, group_package, tolerance, voltage = key
+        if group_library != library:
+            continue
+        if package != None and group_package != package:
+            continue
+        if max_tolerance != None and (tolerance == None or tolerance > max_tolerance):
+            continue
+        if min_voltage != None and (voltage == None or voltage < min_voltage):
+            continue
+        yield key, group
+
+
+def get_group_result(key, group, position):
+    library, package, tolerance, voltage = key
+    return {
+        "library": library,
+        "package": package,
+        "tolerance": tolerance,
+        "voltage": voltage,
+        "value": float(group["value"][position]),
+        "stock": int(group["stock"][position]),
+        "price": float(group["price"][position]),
+        "lcsc": str(group["lcsc"][position]),
+        "name": str(group["name"][position]),
+    }
+
+
+def find_nearest_parts(index, library, value, package=None, max_tolerance=None, min_voltage=None, min_stock=1, count=1):
+    """
+    Finds the parts closest in value, e.g. the nearest 0402 resistor to 4.99kΩ that is in stock.
+
+    :param value: The target value as a float in SI units (see parse_si_value).
+    :param min_stock: Parts with less stock than this are skipped (0 to include out of stock parts).
+    :param count: How many parts to return.
+    :return: A list of result dicts, closest first.
+    """
+    candidates = []
+    for key, group in get_matching_groups(index, library, package, max_tolerance, min_voltage):
+        values = group["value"]
+        stocked = np.flatnonzero(group["stock"] >= min_stock)
+        if len(stocked) == 0:
+            continue
+        # values are sorted, so the closest count parts are within count places either side of the target
+        position = np.searchsorted(values[stocked], value)
+        around = stocked[max(position - count, 0) : position + count]
+        for item in around:
+            candidates.append((abs(values[item] - value), -group["stock"][item], key, item))
+
+    candidates.sort(key=lambda candidate: candidate[:2])
+    return [get_group_result(key, index[key], item) for _, _, key, item in candidates[:count]]
+
+
+def find_parts_in_range(
+    index, library, minimum=None, maximum=None, package=None, max_tolerance=None, min_voltage=None, min_stock=0
+):
+    """
+    Finds every part with minimum <= value <= maximum, e.g. all 0603 capacitors >= 10uF rated >= 16V.
+
+    :param minimum: The lowest value as a float in SI units, or None for no lower bound.
+    :param maximum: The highest value as a float in SI units, or None for no upper bound.
+    :return: A list of result dicts sorted by value.
+    """
+    results = []
+    for key, group in get_matching_groups(index, library, package, max_tolerance, min_voltage):
+        values = group["value"]
+        start = 0 if minimum == None else np.searchsorted(values, minimum, side="left")
+        end = len(values) if maximum == None else np.searchsorted(values, maximum, side="right")
+        for item in range(start, end):
+            if group["stock"][item] >= min_stock:
+                results.append(get_group_result(key, group, item))
+
+    results.sort(key=lambda result: (result["value"], -result["stock"]))
+    return results
+
+
+def format_parametric_result(result):
+    unit = parametric_libraries[result["library"]]
+    tolerance = f"±{result['tolerance'] * 100:g}%" if result["tolerance"] != None else ""
+    voltage = format_si_value(result["voltage"], "V") if result["voltage"] != None else ""
+    return (
+        f"{result['lcsc']:<10}{format_si_value(result['value'], unit):>9}  {result['package']:<12}{tolerance:<7}"
+        f"{voltage:<7}{result['stock']:>9}  {result['name']}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parametric search of the JLCPCB KiCad libraries")
+    subparsers = parser.add_subparsers(dest="query", required=True)
+
+    nearest_parser = subparsers.add_parser("nearest", help="Parts closest to a value")
+    nearest_parser.add_argument("library", choices=list(parametric_libraries.keys()))
+    nearest_parser.add_argument("value", help="e.g. 4.99k, 4k7, 100nF")
+    nearest_parser.add_argument("--count", type=int, default=1)
+    nearest_parser.add_argument("--min-stock", type=int, default=1)
+
+    range_parser = subparsers.add_parser("range", help="Parts within a range of values")
+    range_parser.add_argument("library", choices=list(parametric_libraries.keys()))
+    range_parser.add_argument("--min", help="e.g. 10u")
+    range_parser.add_argument("--max", help="e.g. 47u")
+    range_parser.add_argument("--min-stock", type=int, default=0)
+
+    for query_parser in [nearest_parser, range_parser]:
+        query_parser.add_argument("--package", help="e.g. 0402")
+        query_parser.add_argument("--max-tolerance", help="e.g. 1%%")
+        query_parser.add_argument("--min-voltage", help="e.g. 16 or 16V")
+    args = parser.parse_args()
+
+    def parse_argument(text, unit=None):
+        if text == None:
+            return None
+        value = parse_si_value(text, unit)
+        if value == None:
+            parser.error(f"Can't read the value {text}")
+        return value
+
+    max_tolerance = None
+    if args.max_tolerance != None:
+        max_tolerance = parse_tolerance(args.max_tolerance)
+        if max_tolerance == None:
+            parser.error(f"Can't read the tolerance {args.max_tolerance}")
+    min_voltage = parse_argument(args.min_voltage, "V")
+
+    index = load_parametric_index()
+    unit = parametric_libraries[args.library]
+    start = time.perf_counter()
+    if args.query == "nearest":
+        results = find_nearest_parts(
+            index,
+            args.library,
+            parse_argument(args.value, unit),
+            args.package,
+            max_tolerance,
+            min_voltage,
+            args.min_stock,
+            args.count,
+        )
+    else:
+        results = find_parts_in_range(
+            index,
+            args.library,
+            parse_argument(args.min, unit),
+            parse_argument(args.max, unit),
+            args.package,
+            max_tolerance,
+            min_voltage,
+            args.min_stock,
+        )
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        print(format_parametric_result(result))
+    print(f"{len(results)} parts found in {elapsed * 1e6:.0f}µs")
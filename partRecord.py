@@ -0,0 +1,198 @@
+# partRecord.py
+# One part of the parts list, parsed once and handed to the symbol, database and handmade library writers
+import json
+import sys
+from footprintResolver import *  # footprintResolver.py
+
+# Assembly cost per solder joint (USD)
+smt_joint_cost = 0.0017
+hand_solder_joint_cost = 0.0173
+
+
+def get_joint_cost(assembly_process):
+    """Assembly cost per joint for the parts list's assembly process (bomCosting.py costs BOMs with the same rule)."""
+    if assembly_process == "THT":
+        return hand_solder_joint_cost
+    return smt_joint_cost
+
+
+class Part:
+    """
+    A parsed row of the parts list plus how it was classified: mode is the auto-generated library it goes in
+    (e.g. "Resistors"), secondary_mode/value/units are filled in by the extract_* functions.
+    category is the "<category>,<subcategory>" shown in the symbols, main_category just its first half.
+    Slotted so the tens of thousands of parts in a run don't each carry a __dict__.
+    """
+
+    __slots__ = (
+        "lcsc",
+        "main_category",
+        "category",
+        "subcategory",
+        "manufacturer",
+        "manufacturerPartID",
+        "footprint",
+        "description",
+        "datasheet",
+        "joints",
+        "assembly_process",
+        "min_order_qty",
+        "attrition_qty",
+        "price",
+        "price_str",
+        "stock",
+        "basic",
+        "preferred",
+        "component_class",
+        "attributes",
+        "mode",
+        "secondary_mode",
+        "value",
+        "units",
+        "keywords",
+    )
+
+    def __init__(
+        self,
+        lcsc="",
+        main_category="",
+        category="",
+        subcategory="",
+        manufacturer="",
+        manufacturerPartID="",
+        footprint="",
+        description="",
+        datasheet="",
+        joints=0,
+        assembly_process="",
+        min_order_qty="",
+        attrition_qty="",
+        price=0.0,
+        price_str="",
+        stock="",
+        basic=0,
+        preferred=0,
+        component_class="",
+        attributes=None,
+        mode=None,
+        secondary_mode="",
+        value=None,
+        units=1,
+        keywords="",
+    ):
+        self.lcsc = lcsc
+        self.main_category = main_category
+        self.category = category
+        self.subcategory = subcategory
+        self.manufacturer = manufacturer
+        self.manufacturerPartID = manufacturerPartID
+        self.footprint = footprint
+        self.description = description
+        self.datasheet = datasheet
+        self.joints = joints
+        self.assembly_process = assembly_process
+        self.min_order_qty = min_order_qty
+        self.attrition_qty = attrition_qty
+        self.price = price
+        self.price_str = price_str
+        self.stock = stock
+        self.basic = basic
+        self.preferred = preferred
+        self.component_class = component_class
+        self.attributes = attributes if attributes != None else {}
+        self.mode = mode
+        self.secondary_mode = secondary_mode
+        self.value = value
+        self.units = units
+        self.keywords = keywords
+
+    def get_component_properties(self, include_datasheet=True):
+        """
+        Returns the properties update_component_inplace writes into a handmade symbol, keyed by their lower case name.
+
+        :param include_datasheet: False to leave the symbol's own datasheet and description alone.
+        """
+        properties = {"price": self.price_str, "stock": self.stock}
+        if include_datasheet:
+            properties["datasheet"] = self.datasheet
+            properties["description"] = self.description
+        properties["process"] = self.assembly_process
+        properties["minimum qty"] = self.min_order_qty
+        properties["attrition qty"] = self.attrition_qty
+        properties["class"] = self.component_class
+        properties["category"] = self.category
+        properties["manufacturer"] = self.manufacturer
+        properties["part"] = self.manufacturerPartID
+        properties.update(self.attributes)
+        return properties
+
+    def to_dict(self):
+        """Returns the part as a dict of its fields, Part(**part.to_dict()) gives the part back."""
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+def parse_part_price(price, lcsc, joints, joint_cost):
+    """
+    Returns the price of a part (first price tier plus the assembly cost of its joints) as (float, "0.123USD").
+    Prints an error and returns (0.0, "") if the price can't be read.
+    """
+    try:
+        price_json = json.loads(price)
+        if price_json and len(price_json) > 0 and "price" in price_json[0]:
+            base_price = float(price_json[0]["price"])
+            # Calculate the total price considering joints and joint cost
+            price = round(base_price + (joints * joint_cost), 3)
+            return price, f"{price:.3f}USD"
+        print(f"Error: Price is missing or invalid for https://jlcpcb.com/partdetail/C{lcsc} ({price_json})")
+    except (json.JSONDecodeError, ValueError, KeyError, TypeError):
+        print(f"Error: Price cannot be parsed https://jlcpcb.com/partdetail/C{lcsc}")
+    return 0.0, ""
+
+
+def parse_part_attributes(extra):
+    """Returns the attributes from the extra column as a dict, with the keys interned as they repeat on every part."""
+    try:
+        attributes = json.loads(extra)["attributes"]
+        return {sys.intern(key): value for key, value in attributes.items() if value != "-"}
+    except:
+        return {}
+
+
+def iter_parts(df):
+    """
+    Yields (row index, Part) for every row of a parts list DataFrame (see read_parts_csv).
+    The columns are read by position from plain tuples, so no Series or dict is built per row.
+    The package names are fixed for the whole column first, see normalize_package_names.
+    """
+    df = df.assign(package=normalize_package_names(df["package"]))
+    position = {column: offset for offset, column in enumerate(df.columns, 1)}
+    for row in df.itertuples(index=True, name=None):
+        lcsc = int(row[position["lcsc"]])
+        joints = int(row[position["joints"]])
+        assembly_process = row[position["Assembly Process"]]
+        price, price_str = parse_part_price(row[position["price"]], lcsc, joints, get_joint_cost(assembly_process))
+        if assembly_process == "THT":
+            assembly_process = "Hand-Soldered"
+
+        part = Part(
+            lcsc=lcsc,
+            main_category=str(row[position["category"]]),
+            category=f'{row[position["category"]]},{row[position["subcategory"]]}',
+            subcategory=str(row[position["subcategory"]]),
+            manufacturer=str(row[position["manufacturer"]]),
+            manufacturerPartID=row[position["mfr"]],
+            footprint=str(row[position["package"]]),
+            description=str(row[position["description"]]).replace("  ", " "),  # Gets rid of double spaces
+            datasheet=row[position["datasheet"]],
+            joints=joints,
+            assembly_process=assembly_process,
+            min_order_qty=int(row[position["Min Order Qty"]]),
+            attrition_qty=int(row[position["Attrition Qty"]]),
+            price=price,
+            price_str=price_str,
+            stock=int(row[position["stock"]]),
+            basic=int(row[position["basic"]]),
+            preferred=int(row[position["preferred"]]),
+            attributes=parse_part_attributes(row[position["extra"]]),
+        )
+        yield row[0], part
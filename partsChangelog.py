@@ -0,0 +1,200 @@
+# partsChangelog.py
+# What a library update changed, written at the end of every run (see libraryBuilder.py):
+#   update-changelog.json  {"date": ..., "summary": {"added": 3, ...}, "added": [part], "removed": [part],
+#                           "archived": ["C1234"], "restored": ["C1234"], "stock": [change], "price": [change]}
+#   update-changelog.md    The same as a short Markdown summary (the workflow shows it as the run's job summary)
+# The added, removed, restocked and repriced parts come from one keyed merge of the parts list the last run was
+# built from (parts-snapshot.csv, see partsDelta.py) with the new one. The archived and restored parts come from
+# the symbol archive (see symbolArchive.py).
+import json
+import time
+from fileTransaction import *  # fileTransaction.py
+from partsCsv import *  # partsCsv.py
+
+changelog_json_filename = "update-changelog.json"
+changelog_markdown_filename = "update-changelog.md"
+
+# The parts list columns the changelog shows
+changelog_columns = ["lcsc", "mfr", "package", "stock", "price"]
+
+# Stock and price changes smaller than these fractions of the old value aren't listed
+# (stock running out or coming back always is)
+changelog_stock_threshold = 0.5
+changelog_price_threshold = 0.05
+
+# Parts listed per section of the Markdown summary, the JSON has all of them
+changelog_markdown_rows = 25
+
+
+def get_unit_price(price):
+    """Returns the price of the parts list's first (smallest quantity) price tier, or None if it has none."""
+    try:
+        tiers = [tier for tier in json.loads(price) if tier.get("price") != None]
+    except (TypeError, ValueError):
+        return None
+    if len(tiers) == 0:
+        return None
+    return float(min(tiers, key=lambda tier: tier.get("qFrom") or 0)["price"])
+
+
+def compute_parts_changes(
+    previous, current, stock_threshold=changelog_stock_threshold, price_threshold=changelog_price_threshold
+):
+    """
+    Compares two parts lists with a single merge on the LCSC id.
+    Only the rows whose price string differs have their price tiers parsed.
+
+    :param previous: DataFrame of the parts list of the last run (with the changelog_columns).
+    :param current: DataFrame of the parts list now.
+    :return: {"added": [part], "removed": [part], "stock": [change], "price": [change]}, in LCSC order.
+             part is {"lcsc": "C1234", "mfr", "package", "stock", "price"}, change {"lcsc", "mfr", "old", "new"}.
+    """
+    merged = previous[changelog_columns].merge(
+        current[changelog_columns], on="lcsc", how="outer", suffixes=("_old", "_new"), indicator=True, sort=True
+    )
+
+    def get_parts(rows, suffix):
+        return [
+            {
+                "lcsc": f"C{lcsc}",
+                "mfr": f"{mfr}",
+                "package": f"{package}",
+                "stock": int(stock),
+                "price": get_unit_price(price),
+            }
+            for lcsc, mfr, package, stock, price in zip(
+                rows["lcsc"],
+                rows[f"mfr{suffix}"],
+                rows[f"package{suffix}"],
+                rows[f"stock{suffix}"],
+                rows[f"price{suffix}"],
+            )
+        ]
+
+    def get_changes(rows, old, new):
+        return [
+            {"lcsc": f"C{lcsc}", "mfr": f"{mfr}", "old": old_value, "new": new_value}
+            for lcsc, mfr, old_value, new_value in zip(rows["lcsc"], rows["mfr_new"], old, new)
+        ]
+
+    both = merged[merged["_merge"] == "both"]
+    old_stock = both["stock_old"].astype("int64")
+    new_stock = both["stock_new"].astype("int64")
+    restocked = (old_stock != new_stock) & (
+        (old_stock == 0) | (new_stock == 0) | ((new_stock - old_stock).abs() >= stock_threshold * old_stock)
+    )
+
+    repriced = both[both["price_old"].astype(object) != both["price_new"].astype(object)]
+    old_price = repriced["price_old"].map(get_unit_price).astype(float)
+    new_price = repriced["price_new"].map(get_unit_price).astype(float)
+    price_changed = (old_price.isna() != new_price.isna()) | (
+        (new_price - old_price).abs() >= price_threshold * old_price
+    )
+
+    def to_price(value):
+        return None if value != value else round(float(value), 6)  # NaN, the part has no price
+
+    return {
+        "added": get_parts(merged[merged["_merge"] == "right_only"], "_new"),
+        "removed": get_parts(merged[merged["_merge"] == "left_only"], "_old"),
+        "stock": get_changes(both[restocked], old_stock[restocked].tolist(), new_stock[restocked].tolist()),
+        "price": get_changes(
+            repriced[price_changed],
+            [to_price(price) for price in old_price[price_changed]],
+            [to_price(price) for price in new_price[price_changed]],
+        ),
+    }
+
+
+def format_changelog_price(price):
+    return "" if price == None else f"{price:.4f}USD"
+
+
+def get_changelog_markdown(changelog):
+    """Renders the changelog as a Markdown summary, at most changelog_markdown_rows parts per section."""
+    summary = changelog["summary"]
+    lines = [
+        f"# Library update {changelog['date']}",
+        "",
+        ", ".join(f"{count} {name}" for name, count in summary.items()),
+    ]
+    if changelog["compared"] == False:
+        lines += ["", "No earlier parts list to compare with, only the archived and restored parts are listed."]
+
+    def add_section(title, header, rows):
+        if len(rows) == 0:
+            return
+        lines.extend(["", f"## {title}", "", "| " + " | ".join(header) + " |", "|" + "---|" * len(header)])
+        for row in rows[:changelog_markdown_rows]:
+            lines.append("| " + " | ".join(f"{cell}".replace("|", "\\|") for cell in row) + " |")
+        if len(rows) > changelog_markdown_rows:
+            lines.append(f"\n...and {len(rows) - changelog_markdown_rows} more in {changelog_json_filename}")
+
+    def part_rows(parts):
+        return [
+            [part["lcsc"], part["mfr"], part["package"], part["stock"], format_changelog_price(part["price"])]
+            for part in parts
+        ]
+
+    add_section("Added", ["LCSC", "Part", "Package", "Stock", "Price"], part_rows(changelog["added"]))
+    add_section("Removed", ["LCSC", "Part", "Package", "Stock", "Price"], part_rows(changelog["removed"]))
+    for title, key in [("Archived", "archived"), ("Restored from the archive", "restored")]:
+        if len(changelog[key]) > 0:
+            lines.extend(["", f"## {title}", "", ", ".join(changelog[key])])
+    add_section(
+        "Stock",
+        ["LCSC", "Part", "Old", "New"],
+        [[change["lcsc"], change["mfr"], change["old"], change["new"]] for change in changelog["stock"]],
+    )
+    add_section(
+        "Price",
+        ["LCSC", "Part", "Old", "New", "Change"],
+        [
+            [
+                change["lcsc"],
+                change["mfr"],
+                format_changelog_price(change["old"]),
+                format_changelog_price(change["new"]),
+                f"{change['new'] / change['old'] - 1:+.1%}" if change["old"] and change["new"] != None else "",
+            ]
+            for change in changelog["price"]
+        ],
+    )
+    return "\n".join(lines) + "\n"
+
+
+def write_update_changelog(parts_changes, archived, restored, transaction=None):
+    """
+    Writes update-changelog.json and update-changelog.md and prints the summary.
+
+    :param parts_changes: From compute_parts_changes, or {} if there was no earlier parts list to compare with.
+    :param archived: LCSC ids (e.g. "C1234") of the symbols archived in this run.
+    :param restored: LCSC ids of the symbols restored from the archive in this run.
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    """
+    compared = len(parts_changes) > 0
+    if not compared:
+        parts_changes = {"added": [], "removed": [], "stock": [], "price": []}
+    archived = sorted(set(archived), key=lambda lcsc: int(lcsc[1:]))
+    restored = sorted(set(restored), key=lambda lcsc: int(lcsc[1:]))
+
+    changelog = {
+        "date": time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime()),
+        "compared": compared,  # False if there was no earlier parts list to compare with
+        "thresholds": {"stock": changelog_stock_threshold, "price": changelog_price_threshold},
+        "summary": {
+            "added": len(parts_changes["added"]),
+            "removed": len(parts_changes["removed"]),
+            "archived": len(archived),
+            "restored": len(restored),
+            "stock changes": len(parts_changes["stock"]),
+            "price changes": len(parts_changes["price"]),
+        },
+        **parts_changes,
+        "archived": archived,
+        "restored": restored,
+    }
+    data = json.dumps(changelog, ensure_ascii=False, indent=1).encode("utf-8")
+    write_transaction_file(transaction, changelog_json_filename, data)
+    write_transaction_file(transaction, changelog_markdown_filename, get_changelog_markdown(changelog).encode("utf-8"))
+    print("Changelog: " + ", ".join(f"{count} {name}" for name, count in changelog["summary"].items()))
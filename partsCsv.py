@@ -0,0 +1,305 @@
+# partsCsv.py
+# Downloading and reading the JLCPCB parts list (jlcpcb-components-basic-preferred.csv) with fixed column types,
+# either one after the other or overlapped (stream_parts_csv reads the rows as they are downloaded).
+# A gzip or zstd copy of the parts list (<filename>.gz/.zst) is downloaded instead when there is one and
+# decompressed as it arrives, the plain csv is the fallback. Downloads are retried and resumed, see httpDownload.py.
+# pandas is imported when the parts list is first read, so importing this module stays cheap.
+import os
+import zlib
+from httpDownload import *  # httpDownload.py
+
+parts_csv_url = "https://cdfer.github.io/jlcpcb-parts-database"
+parts_csv_filename = "jlcpcb-components-basic-preferred.csv"
+
+# Compressed copies of the parts list to download instead if the server has them, tried in this order
+# (zstd only if the optional zstandard package is installed)
+parts_csv_compressions = {".zst": "zstd", ".gz": "gzip"}
+compressed_magic_numbers = {"gzip": b"\x1f\x8b", "zstd": b"\x28\xb5\x2f\xfd"}
+# Exception each decompressor raises on a corrupt copy, zstd's is added by get_decompressor once zstandard is imported
+decompressor_errors = {"gzip": zlib.error}
+
+# Types of the columns the scripts use, every other column (category_id, last_on_stock, ...) is never read.
+# Repeated strings are categorical so each distinct value is only stored once.
+parts_csv_dtypes = {
+    "lcsc": "int32",
+    "category": "category",
+    "subcategory": "category",
+    "mfr": "str",
+    "package": "category",
+    "joints": "int32",
+    "manufacturer": "category",
+    "basic": "int8",
+    "preferred": "int8",
+    "description": "str",
+    "datasheet": "str",
+    "stock": "int32",
+    "price": "str",
+    "extra": "str",
+    "Assembly Process": "category",
+    "Min Order Qty": "int32",
+    "Attrition Qty": "int32",
+}
+
+
+def get_decompressor(compression):
+    """
+    Returns a streaming decompressor (decompress(chunk) and flush()) for "gzip" or "zstd",
+    or None for zstd if the optional zstandard package isn't installed.
+    """
+    if compression == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    decompressor_errors["zstd"] = zstandard.ZstdError
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def find_parts_csv_download(url=parts_csv_url, filename=parts_csv_filename, compressions=parts_csv_compressions):
+    """
+    Picks what to download: the first compressed copy the server has (or an interrupted run was downloading),
+    else the plain csv. A server that compresses the csv on the fly (Content-Encoding: gzip) is decompressed by
+    requests itself.
+
+    :param compressions: {extension: compression} of the compressed copies to try, in order.
+    :return: (url to download, its compression or None if it is the plain csv).
+    """
+    for extension, compression in compressions.items():
+        if get_decompressor(compression) == None:
+            continue
+        if os.path.exists(f"{filename}{extension}.part") or url_exists(f"{url}/{filename}{extension}"):
+            return f"{url}/{filename}{extension}", compression
+
+    response = get_download_session().head(
+        f"{url}/{filename}", timeout=download_settings["timeout"], allow_redirects=True
+    )
+    response.raise_for_status()  # Not there, or the server kept failing
+    return f"{url}/{filename}", None
+
+
+def remove_compressed_download(compressed_filename, filename):
+    """
+    Removes a broken compressed copy, what was kept to resume it and what was decompressed from it (filename.part),
+    so the next run downloads it afresh instead of resuming it.
+    """
+    for name in [
+        compressed_filename,
+        f"{compressed_filename}.part",
+        f"{compressed_filename}.part.json",
+        f"{filename}.part",
+    ]:
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def iter_parts_csv_download(download_url, compression, filename=parts_csv_filename, stats=None):
+    """
+    Yields the parts list's bytes (decompressed) as they are downloaded, saving them to filename as well.
+    The download is retried and resumed as needed (see httpDownload.py) and only replaces filename once it is
+    complete, so an interrupted download never leaves half a parts list behind.
+    A compressed copy that turns out to be corrupt, truncated or not compressed at all is removed along with what was
+    kept to resume it, and stats["broken"] is set so the caller can download the plain csv instead.
+
+    :param stats: dict that gets the download's stats, see iter_resumable_download.
+    """
+    import requests
+
+    if stats == None:
+        stats = {}
+    if compression == None:
+        yield from iter_resumable_download(download_url, filename, stats)
+        return
+
+    compressed_filename = f"{filename}{os.path.splitext(download_url)[1]}"
+    decompressor = get_decompressor(compression)
+    first_chunk = True
+    broken = None
+    download = iter_resumable_download(download_url, compressed_filename, stats)
+    try:
+        with open(f"{filename}.part", "wb") as file:
+            for chunk in download:
+                if first_chunk and len(chunk) > 0:
+                    first_chunk = False
+                    if not chunk.startswith(compressed_magic_numbers[compression]):
+                        if stats["encoding"] == "identity":
+                            broken = f"isn't a {compression} file"  # e.g. an error page served with a 200
+                            break
+                        decompressor = None  # Served with a Content-Encoding, requests has already decompressed it
+                if decompressor != None:
+                    chunk = decompressor.decompress(chunk)
+                file.write(chunk)
+                yield chunk
+            if broken == None and decompressor != None:
+                chunk = decompressor.flush()
+                file.write(chunk)
+                yield chunk
+    except decompressor_errors[compression] as e:
+        broken = f"is corrupt ({e})"
+    if broken == None and decompressor != None and decompressor.eof == False:
+        broken = "is truncated"
+    if broken != None:
+        download.close()
+        remove_compressed_download(compressed_filename, filename)
+        stats["broken"] = True
+        raise requests.RequestException(f"{download_url} {broken}")
+    os.replace(f"{filename}.part", filename)
+    os.remove(compressed_filename)
+
+
+def print_parts_csv_download(download_url, filename, stats, note=""):
+    size = os.path.getsize(filename)
+    resumed = ""
+    if stats["resumed_from"] > 0:
+        resumed += f", resumed from byte {stats['resumed_from']:,}"
+    if stats["retries"] > 0:
+        resumed += f", {stats['retries']} retries"
+    print(
+        f"Downloaded {download_url} to {filename}{note} "
+        f"({stats['transferred']:,} bytes transferred, {size:,} bytes on disk{resumed})"
+    )
+
+
+def download_parts_csv(url=parts_csv_url, filename=parts_csv_filename, compressions=parts_csv_compressions):
+    """
+    Downloads the latest basic/preferred parts list, compressed if the server has a compressed copy.
+    If the compressed copy is broken (see iter_parts_csv_download) the plain csv is downloaded instead.
+
+    :return: True if it was downloaded, False if the download failed (filename is left as it was).
+    """
+    import requests
+
+    stats = {}
+    try:
+        download_url, compression = find_parts_csv_download(url, filename, compressions)
+        try:
+            for _ in iter_parts_csv_download(download_url, compression, filename, stats):
+                pass
+        except requests.RequestException as e:
+            if stats.get("broken") != True:
+                raise
+            print(f"Download failed for {download_url}: {e}, downloading the plain csv instead")
+            download_url = f"{url}/{filename}"
+            stats = {}
+            for _ in iter_parts_csv_download(download_url, None, filename, stats):
+                pass
+        print_parts_csv_download(download_url, filename, stats)
+        return True
+    except requests.RequestException as e:
+        print(f"Download failed for {url}/{filename}: {e}")
+        return False
+
+
+class DownloadStream:
+    """
+    A read-only file object over the chunks of a download still in progress (put in a queue by the download thread),
+    so pd.read_csv can parse the rows that have arrived while the rest are being downloaded.
+    The download thread puts None at the end of the file, or the exception if the download failed.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+        self.finished = False
+
+    def read(self, size=-1):
+        # Only waits when nothing has arrived yet, the parser copes with short reads like it does from a socket
+        while self.finished == False and (self.buffer == b"" or size < 0):
+            chunk = self.chunks.get()
+            if chunk == None:
+                self.finished = True
+            elif isinstance(chunk, Exception):
+                self.finished = True  # The download thread has stopped, there is nothing more to wait for
+                raise chunk
+            else:
+                self.buffer += chunk
+
+        if size < 0 or size >= len(self.buffer):
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def stream_parts_csv(
+    url=parts_csv_url, filename=parts_csv_filename, columns=None, chunksize=2000, compressions=parts_csv_compressions
+):
+    """
+    Downloads the parts list and reads it at the same time, so the rows can be processed while the rest of the file
+    is still downloading instead of after it. A compressed copy is decompressed as it arrives.
+    The file is saved to filename as well (see iter_parts_csv_download).
+    If the download can't be started the parts list already downloaded is read instead.
+
+    :param columns: The columns to read, see read_parts_csv.
+    :param chunksize: Rows per DataFrame, processing starts as soon as the first this many rows have arrived.
+    :return: An iterable of DataFrames like read_parts_csv.
+    """
+    import queue
+    import threading
+    import requests
+
+    try:
+        download_url, compression = find_parts_csv_download(url, filename, compressions)
+    except requests.RequestException as e:
+        print(f"Download failed for {url}/{filename}: {e}")
+        if not os.path.exists(filename):
+            print(f"Error: No {filename} to fall back on")
+            exit(1)
+        print(f"Reading the existing {filename} instead")
+        yield from read_parts_csv(filename, columns, chunksize)
+        return
+
+    stats = {}
+    # Bounded so a slow reader holds back the download instead of buffering the whole file in memory
+    chunks = queue.Queue(maxsize=256)
+
+    def download():
+        try:
+            for chunk in iter_parts_csv_download(download_url, compression, filename, stats):
+                chunks.put(chunk)
+            chunks.put(None)
+        except Exception as e:
+            chunks.put(e)
+
+    download_thread = threading.Thread(target=download, daemon=True)
+    download_thread.start()
+    stream = DownloadStream(chunks)
+    try:
+        yield from read_parts_csv(stream, columns, chunksize)
+    except Exception:
+        # A corrupt compressed copy is only found out at its end, after the parser has failed on what was decompressed
+        # from it: read on to raise the download's error instead if it failed
+        while stream.finished == False:
+            stream.read(64 * 1024)
+        raise
+    download_thread.join()
+    print_parts_csv_download(download_url, filename, stats, " while reading it")
+
+
+def read_parts_csv(filename=parts_csv_filename, columns=None, chunksize=None):
+    """
+    Reads the parts list with declared column types, only loading the given columns.
+
+    :param filename: The parts list csv (or a file object, e.g. a DownloadStream).
+    :param columns: The columns to read, defaults to every column in parts_csv_dtypes.
+    :param chunksize: If given, the file is streamed as DataFrames of at most this many rows, so memory use stays flat
+                      however large the parts list is (e.g. the full JLCPCB catalogue).
+    :return: An iterable of DataFrames (just the one DataFrame unless chunksize is given).
+             The row index runs on across chunks like it would for the whole file.
+    """
+    import pandas as pd
+
+    if columns == None:
+        columns = list(parts_csv_dtypes.keys())
+    dtypes = {column: parts_csv_dtypes[column] for column in columns if column in parts_csv_dtypes}
+    if chunksize == None:
+        return [pd.read_csv(filename, usecols=columns, dtype=dtypes)]
+    return pd.read_csv(filename, usecols=columns, dtype=dtypes, chunksize=chunksize)
+
+
+def read_parts_lcsc_ids(filename=parts_csv_filename, chunksize=None):
+    """Returns the set of LCSC ids in the parts list, reading just that one column."""
+    lcsc_ids = set()
+    for df in read_parts_csv(filename, ["lcsc"], chunksize):
+        lcsc_ids.update(df["lcsc"].tolist())
+    return lcsc_ids
@@ -0,0 +1,120 @@
+# partsDelta.py
+# The parts list a library was last built from (parts-snapshot.csv) and what each of its parts became
+# (parts-snapshot.json), so "build --delta" only has to process the parts that were added, removed or changed since:
+#   parts-snapshot.json  {"classifier_version": "...", "classified-parts": [{Part fields}, ...], "leftover": [lcsc, ...]}
+# Parts where only volatile_columns changed (stock changes on most parts every day) aren't classified again, their
+# Stock, Price and Class are refreshed in place (see volatileRefresh.py).
+# Both are written in the run's transaction (see fileTransaction.py), so they always match the committed library.
+import json
+import os
+from fileTransaction import *  # fileTransaction.py
+from partsCsv import *  # partsCsv.py
+
+parts_snapshot_filename = "parts-snapshot.csv"
+parts_snapshot_state_filename = "parts-snapshot.json"
+
+# Columns that only change a part's Stock, Price and Class, not how it is classified
+volatile_columns = ["stock", "price", "basic", "preferred"]
+
+
+def load_parts_snapshot(
+    classifier_version, filename=parts_snapshot_filename, state_filename=parts_snapshot_state_filename
+):
+    """
+    Returns the snapshot of the last run, or None if there is none or it was classified by a different version
+    of the classifier (every part has to be classified again then).
+
+    :return: {"parts": DataFrame of the parts list, "classified-parts": [...], "leftover": [...]}.
+    """
+    if not os.path.exists(filename) or not os.path.exists(state_filename):
+        print("No parts snapshot from an earlier run yet, processing every part")
+        return None
+    try:
+        with open(state_filename, "r", encoding="utf-8") as file:
+            state = json.load(file)
+    except json.JSONDecodeError:
+        print(f"Error: {state_filename} is not a valid parts snapshot, processing every part")
+        return None
+    if state.get("classifier_version") != classifier_version:
+        print("The classification rules changed since the parts snapshot, processing every part")
+        return None
+    state["parts"] = read_parts_csv(filename)[0]
+    return state
+
+
+def save_parts_snapshot(
+    classifier_version,
+    classified_parts,
+    leftover,
+    parts_csv_filename=parts_csv_filename,
+    transaction=None,
+    filename=parts_snapshot_filename,
+    state_filename=parts_snapshot_state_filename,
+):
+    """
+    Saves the parts list this run was built from and what its parts became, for the next --delta run.
+
+    :param classified_parts: The classified-parts of the run (Part dicts, in parts list order).
+    :param leftover: LCSC ids of the parts that went in neither an auto-generated nor a handmade library.
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    """
+    with open(parts_csv_filename, "rb") as file:
+        write_transaction_file(transaction, filename, file.read())
+    state = {
+        "classifier_version": classifier_version,
+        "classified-parts": classified_parts,
+        "leftover": sorted(leftover),
+    }
+    data = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    write_transaction_file(transaction, state_filename, data)
+
+
+def compute_parts_delta(previous, current):
+    """
+    Compares two parts lists by LCSC id.
+
+    :param previous: DataFrame of the parts list of the last run (see read_parts_csv).
+    :param current: DataFrame of the parts list now.
+    :return: {"added": [lcsc], "removed": [lcsc], "changed": {lcsc: [the columns that changed]}, "refreshed":
+             {lcsc: [the columns that changed]} of the parts where only volatile_columns changed (not in "changed")}.
+    """
+    previous = previous.set_index("lcsc")
+    current = current.set_index("lcsc")
+    columns = [column for column in current.columns if column in previous.columns]
+
+    common = current.index.intersection(previous.index)
+    # Compared as plain objects, categoricals with different categories can't be compared directly
+    old = previous.loc[common, columns].astype(object)
+    new = current.loc[common, columns].astype(object)
+    differs = (old != new) & ~(old.isna() & new.isna())
+    changed_rows = differs[differs.any(axis=1)]
+
+    delta = {
+        "added": [int(lcsc) for lcsc in current.index.difference(previous.index)],
+        "removed": [int(lcsc) for lcsc in previous.index.difference(current.index)],
+        "changed": {},
+        "refreshed": {},
+    }
+    for lcsc, row in sorted(zip(changed_rows.index, changed_rows.itertuples(index=False, name=None))):
+        changed_columns = [column for column, changed in zip(columns, row) if changed]
+        if all(column in volatile_columns for column in changed_columns):
+            delta["refreshed"][int(lcsc)] = changed_columns
+        else:
+            delta["changed"][int(lcsc)] = changed_columns
+    return delta
+
+
+def print_parts_delta(delta):
+    column_counts = {}
+    for columns in list(delta["changed"].values()) + list(delta["refreshed"].values()):
+        for column in columns:
+            column_counts[column] = column_counts.get(column, 0) + 1
+    print(
+        f"Parts delta: {len(delta['added'])} added, {len(delta['removed'])} removed, {len(delta['changed'])} changed, "
+        f"{len(delta['refreshed'])} with only stock/price/class changes"
+        + (
+            " (" + ", ".join(f"{column} {count}" for column, count in sorted(column_counts.items())) + ")"
+            if column_counts
+            else ""
+        )
+    )
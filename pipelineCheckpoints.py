@@ -0,0 +1,113 @@
+# pipelineCheckpoints.py
+# Runs the library update (libraryBuilder.py) as a list of named stages, saving what each stage produces to .update-checkpoints so
+# an interrupted run carries on from the last stage that finished, and a single stage can be run again on its own:
+#   .update-checkpoints/state.json       {"options": {...}, "completed": ["download", ...], "transaction": {...}}
+#   .update-checkpoints/<artifact>.json  What the stages produced, e.g. classified-parts.json
+# The library files themselves are staged in the run's transaction (see fileTransaction.py), which is checkpointed
+# along with the stages and only committed once every stage has finished.
+import json
+import os
+from fileTransaction import *  # fileTransaction.py
+
+pipeline_checkpoint_folder = ".update-checkpoints"
+
+
+def get_checkpoint_filename(name, folder=pipeline_checkpoint_folder):
+    return os.path.join(folder, f"{name}.json")
+
+
+def save_checkpoint(name, value, folder=pipeline_checkpoint_folder):
+    os.makedirs(folder, exist_ok=True)
+    data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    write_transaction_file(None, get_checkpoint_filename(name, folder), data)
+
+
+def load_checkpoint(name, folder=pipeline_checkpoint_folder):
+    """Returns a saved artifact, or None if no run has produced it yet."""
+    filename = get_checkpoint_filename(name, folder)
+    if not os.path.exists(filename):
+        return None
+    with open(filename, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def load_pipeline_state(options, folder=pipeline_checkpoint_folder):
+    """
+    Returns the state of the last run if it didn't finish and was started with the same options, else a new state.
+
+    :param options: The options the artifacts depend on (e.g. --shard-by), a run is only resumed if they match.
+    """
+    state = load_checkpoint("state", folder)
+    if state != None and state.get("options") == options and state.get("committed") == False:
+        return state
+    if state != None and state.get("committed") == False:
+        print("Not resuming the interrupted run, it was started with different options")
+    return {"options": options, "completed": [], "transaction": None, "committed": False}
+
+
+def has_interrupted_run(folder=pipeline_checkpoint_folder):
+    """Returns True if the last run stopped before committing and left a transaction it can carry on with."""
+    state = load_checkpoint("state", folder)
+    if state == None or state.get("committed") != False or state.get("transaction") == None:
+        return False
+    return os.path.isdir(transaction_staging_folder) and not os.path.exists(transaction_journal_filename)
+
+
+def get_artifact(run, name):
+    """Returns an artifact produced earlier in this run, or saved by an earlier run."""
+    if name not in run["artifacts"]:
+        run["artifacts"][name] = load_checkpoint(name)
+        if run["artifacts"][name] == None:
+            print(f"Error: No {name} checkpoint, run the whole pipeline first")
+            exit(1)
+    return run["artifacts"][name]
+
+
+def run_pipeline(stages, run, only_stage=None, folder=pipeline_checkpoint_folder):
+    """
+    Runs the stages in order, skipping the ones an interrupted run already finished, then commits the transaction.
+
+    :param stages: list of (name, function) pairs, function(run) returns a dict of the artifacts it produced (or None).
+    :param run: dict of what the stages share: "options", "transaction" and "artifacts" (name -> value),
+                plus anything else the caller puts in it.
+    :param only_stage: Run just this stage (on the artifacts of the last run) instead of the whole pipeline.
+    """
+    if only_stage != None:
+        if has_interrupted_run(folder):
+            # Running a stage on its own would throw away (or be mixed into) what the interrupted run staged
+            print("Error: The last run was interrupted, run the build without --stage to carry on where it stopped")
+            print("(or with --restart to throw it away first)")
+            exit(1)
+        state = {"options": run["options"], "completed": [], "transaction": None, "committed": False}
+        recover_transaction()
+    else:
+        state = load_pipeline_state(run["options"], folder)
+        if state["transaction"] != None:
+            run["transaction"] = resume_transaction(state["transaction"])
+        if run.get("transaction") == None:
+            # The last run finished or there is nothing to carry on from, start from scratch
+            recover_transaction()
+            state = {"options": run["options"], "completed": [], "transaction": None, "committed": False}
+        elif len(state["completed"]) > 0:
+            print(f"Resuming the interrupted run after the {state['completed'][-1]} stage")
+    if run.get("transaction") == None:
+        run["transaction"] = begin_transaction()
+
+    for name, stage in stages:
+        if (only_stage != None and name != only_stage) or name in state["completed"]:
+            continue
+        artifacts = stage(run)
+        for artifact_name, value in (artifacts or {}).items():
+            save_checkpoint(artifact_name, value, folder)
+            run["artifacts"][artifact_name] = value
+
+        state["completed"].append(name)
+        state["transaction"] = checkpoint_transaction(run["transaction"])
+        if only_stage == None:
+            save_checkpoint("state", state, folder)
+
+    commit_transaction(run["transaction"])
+    if only_stage == None:
+        state["transaction"] = None
+        state["committed"] = True
+        save_checkpoint("state", state, folder)
@@ -0,0 +1,134 @@
+# stockHealthScanner.py
+# Checks the JLCPCB parts used in KiCad schematics are still stocked, e.g.
+#   python stockHealthScanner.py ~/My_KiCad_Project
+import argparse
+import os
+import numpy as np
+from kicadSexpr import *  # kicadSexpr.py
+from bomCosting import *  # bomCosting.py
+from symbolArchive import *  # symbolArchive.py
+
+
+def iter_schematic_parts(filename):
+    """
+    Streams the placed symbols of a .kicad_sch file that have an LCSC property.
+    Only the top level (symbol ...) blocks are parsed, wires, labels and the embedded lib_symbols are skipped.
+
+    :return: Yields (reference, lcsc id, price property) for every placed part in the BOM.
+    """
+    with open(filename, "r", encoding="utf-8") as file:
+        text = file.read()
+
+    for start, end in iter_sexpr_spans(text):
+        if not text.startswith("(symbol", start) or text.find('"LCSC"', start, end) == -1:
+            continue
+        symbol = parse_sexpr(text, start, end)[0]
+        in_bom = find_sexpr_child(symbol, "in_bom")
+        if in_bom != None and in_bom[1] == "no":
+            continue
+        lcsc = parse_lcsc_id(get_symbol_property(symbol, "LCSC", ""))
+        if lcsc == None:
+            continue
+        yield get_symbol_property(symbol, "Reference", "?"), lcsc, get_symbol_property(symbol, "Price", "")
+
+
+def scan_schematics(path):
+    """
+    Collects the LCSC parts of every schematic in a project folder (or a single .kicad_sch file) in one pass.
+
+    :return: dict of lcsc id -> list of (schematic filename, reference, price property).
+    """
+    if os.path.isfile(path):
+        schematic_filenames = [path]
+    else:
+        schematic_filenames = []
+        for folder, _, filenames in os.walk(path):
+            for filename in sorted(filenames):
+                if filename.endswith(".kicad_sch"):
+                    schematic_filenames.append(os.path.join(folder, filename))
+
+    parts = {}
+    for schematic_filename in sorted(schematic_filenames):
+        for reference, lcsc, price in iter_schematic_parts(schematic_filename):
+            parts.setdefault(lcsc, []).append((schematic_filename, reference, price))
+    return parts
+
+
+def get_archived_lcsc_ids(filename=archive_pack_filename):
+    """Returns the LCSC ids of the symbols update_library_stock_inplace has archived (see symbolArchive.py)."""
+    return {parse_lcsc_id(lcsc) for lcsc in load_symbol_archive(filename)["symbols"]}
+
+
+def check_stock_health(price_index, archived, lcsc_ids, min_stock=1):
+    """
+    Checks a batch of LCSC ids against the stock index.
+
+    :param price_index: The index from load_price_index.
+    :param archived: set of archived LCSC ids from get_archived_lcsc_ids.
+    :return: dict of lcsc id -> (status, stock, current price string). status is "ok", "out of stock",
+             "archived" or "unknown" (neither a basic/preferred part nor archived).
+    """
+    lcsc_ids = np.asarray(lcsc_ids, dtype=np.int64)
+    position = np.minimum(np.searchsorted(price_index["lcsc"], lcsc_ids), len(price_index["lcsc"]) - 1)
+    found = price_index["lcsc"][position] == lcsc_ids
+    stock = price_index["stock"][position]
+
+    # The same price string libraryBuilder.py writes into the symbols: first tier plus the joint cost
+    price = (
+        price_index["tier_price"][position, 0] + price_index["joints"][position] * price_index["joint_cost"][position]
+    )
+
+    results = {}
+    for item, lcsc in enumerate(lcsc_ids.tolist()):
+        if found[item]:
+            status = "ok" if stock[item] >= min_stock else "out of stock"
+            price_str = f"{round(price[item], 3):.3f}USD" if not np.isnan(price[item]) else ""
+            results[lcsc] = (status, int(stock[item]), price_str)
+        elif lcsc in archived:
+            results[lcsc] = ("archived", 0, "")
+        else:
+            results[lcsc] = ("unknown", 0, "")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the JLCPCB parts used in KiCad schematics are still stocked")
+    parser.add_argument("path", help="KiCad project folder (every .kicad_sch below it is scanned) or a .kicad_sch file")
+    parser.add_argument("--parts", default=parts_csv_filename, help="the JLCPCB parts list csv")
+    parser.add_argument("--min-stock", type=int, default=1, help="report parts with less stock than this")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.parts):
+        print(f"Error: {args.parts} not found, run libraryCreatorScript.py first to download it")
+        exit(1)
+
+    parts = scan_schematics(args.path)
+    results = check_stock_health(
+        load_price_index(args.parts), get_archived_lcsc_ids(), list(parts.keys()), args.min_stock
+    )
+
+    problems = 0
+    for lcsc, uses in sorted(parts.items()):
+        status, stock, price_str = results[lcsc]
+        references = ",".join(reference for _, reference, _ in uses)
+        schematics = ",".join(sorted({os.path.basename(filename) for filename, _, _ in uses}))
+        if status == "out of stock" and stock == 0:
+            print(f"Error: C{lcsc} ({references} in {schematics}) is out of stock")
+        elif status == "out of stock":
+            print(f"Error: C{lcsc} ({references} in {schematics}) is low on stock ({stock} left)")
+        elif status == "archived":
+            print(f"Error: C{lcsc} ({references} in {schematics}) is no longer a basic/preferred part (archived)")
+        elif status == "unknown":
+            print(f"Error: C{lcsc} ({references} in {schematics}) is not a basic/preferred part")
+        else:
+            changed = sorted({price for _, _, price in uses if price != "" and price != price_str})
+            if len(changed) > 0:
+                print(
+                    f"Warning: C{lcsc} ({references} in {schematics}) price changed from {','.join(changed)} to {price_str}"
+                )
+            continue
+        problems += 1
+
+    print(f"{sum(len(uses) for uses in parts.values())} parts ({len(parts)} unique) checked, {problems} problems")
+    if problems > 0:
+        exit(1)
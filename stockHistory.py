@@ -0,0 +1,385 @@
+# stockHistory.py
+# Append-only history of the stock, price tiers and class of every part in the parts list, one snapshot a day
+# (taken by every build and refresh-stock), e.g.
+#   python stockHistory.py part C25804             A part's stock, price and class on every day they changed
+#   python stockHistory.py movers --days 30        The parts whose stock changed the most in the last 30 days
+# The store is partitioned by month:
+#   stock-history/price-tiers.jsonl          Every distinct price tier list seen, one per line, new ones are appended
+#                                            and a line never changes (a snapshot stores the line number instead of
+#                                            the tiers)
+#   stock-history/2026-10/2026-10-19.npy.gz  One day's snapshot, a gzipped numpy array (int32, or int64 if a value
+#                                            doesn't fit) of these columns one after the other, for the parts in
+#                                            LCSC order:
+#     header  The number of parts, of LCSC ids added and of LCSC ids removed
+#     lcsc    The LCSC ids added and removed since the snapshot before, each stored as the gap from the one before
+#     stock   The stock, stored as the change since the snapshot before
+#     price   The price-tiers.jsonl line, stored as the change since the snapshot before
+#     class   0 Extended, 1 Basic, 2 Preferred, stored as the change since the snapshot before
+# "The snapshot before" is the earlier snapshot of the same month (a part that wasn't in it counts from 0),
+# so most of a snapshot is zeros and compresses to little, while the first snapshot of a month holds the values
+# themselves and a month can be read without the months before it.
+# Taking a snapshot again the same day replaces that day's, snapshots of earlier days are never changed.
+import argparse
+import datetime
+import gzip
+import io
+import json
+import os
+import time
+import numpy as np
+from fileTransaction import *  # fileTransaction.py
+from partsCsv import *  # partsCsv.py
+
+stock_history_folder = "stock-history"
+price_tiers_filename = "price-tiers.jsonl"
+
+# The parts list columns a snapshot is taken from
+stock_history_columns = ["lcsc", "stock", "price", "basic", "preferred"]
+
+# The columns of a snapshot after its lcsc column, in the order they are stored
+stock_history_values = ["stock", "price", "class"]
+stock_history_classes = ["Extended Component", "Basic Component", "Preferred Component"]
+
+
+def get_history_snapshot_filename(date, folder=stock_history_folder):
+    return os.path.join(folder, date[:7], f"{date}.npy.gz")
+
+
+def list_history_months(folder=stock_history_folder):
+    """Returns the months (e.g. "2026-10") the store has snapshots of, oldest first."""
+    if not os.path.isdir(folder):
+        return []
+    return sorted(month for month in os.listdir(folder) if os.path.isdir(os.path.join(folder, month)))
+
+
+def list_history_dates(month, folder=stock_history_folder, transaction=None):
+    """Returns the dates (e.g. "2026-10-19") of a month's snapshots, oldest first."""
+    filenames = list_transaction_dir(transaction, os.path.join(folder, month))
+    return sorted(filename[: -len(".npy.gz")] for filename in filenames if filename.endswith(".npy.gz"))
+
+
+def load_price_tiers(folder=stock_history_folder, transaction=None):
+    """Returns the price tier lists of price-tiers.jsonl as strings, a snapshot's price column indexes this list."""
+    filename = get_transaction_path(transaction, os.path.join(folder, price_tiers_filename))
+    if not os.path.exists(filename):
+        return []
+    with open(filename, "r", encoding="utf-8") as file:
+        return file.read().splitlines()
+
+
+def normalize_price_tiers(price):
+    """
+    Converts a parts list price (e.g. [{"qFrom": 1, "qTo": 99, "price": 0.095}, ...]) to the compact form
+    price-tiers.jsonl keeps, [[1,99,0.095],...] from the smallest quantity up, so equal tiers are one entry.
+    """
+    try:
+        tiers = [tier for tier in json.loads(price) if tier.get("price") != None]
+    except (TypeError, ValueError):
+        tiers = []
+    tiers = sorted(tiers, key=lambda tier: tier.get("qFrom") or 0)
+    return json.dumps([[tier.get("qFrom"), tier.get("qTo"), tier["price"]] for tier in tiers], separators=(",", ":"))
+
+
+def reindex_history_snapshot(snapshot, lcsc):
+    """Returns the snapshot's values of the given (sorted) LCSC ids, 0 for the ids it doesn't have."""
+    if snapshot == None or len(snapshot["lcsc"]) == 0:
+        return {name: np.zeros(len(lcsc), dtype=np.int64) for name in stock_history_values}
+    positions = np.minimum(np.searchsorted(snapshot["lcsc"], lcsc), len(snapshot["lcsc"]) - 1)
+    found = snapshot["lcsc"][positions] == lcsc
+    return {name: np.where(found, snapshot[name][positions], 0) for name in stock_history_values}
+
+
+def encode_history_snapshot(snapshot, previous=None):
+    """
+    Encodes a snapshot against the snapshot before it, see the top of this file.
+
+    :param snapshot: {"lcsc": sorted int array, "stock", "price" (price-tiers.jsonl line), "class" (0-2)}.
+    :param previous: The snapshot before it in the same month, None for the first of a month.
+    :return: The gzipped bytes of the snapshot's file.
+    """
+    lcsc = np.asarray(snapshot["lcsc"], dtype=np.int64)
+    previous_lcsc = previous["lcsc"] if previous != None else np.zeros(0, dtype=np.int64)
+    added = np.setdiff1d(lcsc, previous_lcsc, assume_unique=True)
+    removed = np.setdiff1d(previous_lcsc, lcsc, assume_unique=True)
+    base = reindex_history_snapshot(previous, lcsc)
+    columns = [np.array([len(lcsc), len(added), len(removed)]), np.diff(added, prepend=0), np.diff(removed, prepend=0)]
+    columns += [snapshot[name] - base[name] for name in stock_history_values]
+    data = np.concatenate(columns).astype(np.int64)
+    # int32 halves the file before compression, the rare snapshot with a value out of its range (e.g. a stock
+    # change of more than 2^31) keeps int64 rather than wrapping around, np.load reads either
+    limits = np.iinfo(np.int32)
+    if len(data) == 0 or (data.min() >= limits.min and data.max() <= limits.max):
+        data = data.astype(np.int32)
+    buffer = io.BytesIO()
+    np.save(buffer, data)
+    # No timestamp in the gzip header, so the same snapshot always gives the same bytes
+    return gzip.compress(buffer.getvalue(), compresslevel=9, mtime=0)
+
+
+def read_history_columns(data, previous_lcsc):
+    """
+    Reads a snapshot file's bytes without undoing the deltas of its value columns.
+
+    :param previous_lcsc: The LCSC ids of the snapshot before, none for the first of a month.
+    :return: (the snapshot's LCSC ids, array of its stock, price and class columns as stored).
+    """
+    data = np.load(io.BytesIO(gzip.decompress(data))).astype(np.int64)
+    count, added_count, removed_count = data[:3].tolist()
+    added = np.cumsum(data[3 : 3 + added_count])
+    removed = np.cumsum(data[3 + added_count : 3 + added_count + removed_count])
+    lcsc = previous_lcsc
+    if len(removed) > 0:
+        lcsc = lcsc[~np.isin(lcsc, removed, assume_unique=True)]
+    if len(added) > 0:
+        lcsc = np.sort(np.concatenate([lcsc, added]))
+    return lcsc, data[3 + added_count + removed_count :].reshape(len(stock_history_values), count)
+
+
+def decode_history_snapshot(data, previous=None):
+    """Decodes a snapshot file's bytes, see encode_history_snapshot."""
+    lcsc, columns = read_history_columns(data, previous["lcsc"] if previous != None else np.zeros(0, dtype=np.int64))
+    base = reindex_history_snapshot(previous, lcsc)
+    snapshot = {"lcsc": lcsc}
+    for row, name in enumerate(stock_history_values):
+        snapshot[name] = columns[row] + base[name]
+    return snapshot
+
+
+def iter_history_month(month, folder=stock_history_folder, end=None, transaction=None):
+    """Yields (date, snapshot) for every snapshot of a month up to the end date, oldest first."""
+    snapshot = None
+    for date in list_history_dates(month, folder, transaction):
+        if end != None and date > end:
+            return
+        with open(get_transaction_path(transaction, get_history_snapshot_filename(date, folder)), "rb") as file:
+            snapshot = decode_history_snapshot(file.read(), snapshot)
+        yield date, snapshot
+
+
+def read_history_snapshot(date, folder=stock_history_folder):
+    """Returns (date, snapshot) of the latest snapshot taken on or before date, or (None, None) if there is none."""
+    months = [month for month in list_history_months(folder) if month <= date[:7]]
+    for month in reversed(months):
+        latest = (None, None)
+        for latest in iter_history_month(month, folder, date):
+            pass
+        if latest[0] != None:
+            return latest
+    return None, None
+
+
+def append_stock_history(filename=parts_csv_filename, date=None, folder=stock_history_folder, transaction=None):
+    """
+    Takes today's snapshot of the parts list and adds it to the store.
+
+    :param date: The snapshot's date (e.g. "2026-10-19"), defaults to today (UTC).
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    :return: The size of the snapshot's file in bytes, or None if it wasn't taken.
+    """
+    if date == None:
+        date = time.strftime("%Y-%m-%d", time.gmtime())
+    months = list_history_months(folder)
+    latest_dates = list_history_dates(months[-1], folder) if len(months) > 0 else []
+    if len(latest_dates) > 0 and date < latest_dates[-1]:
+        print(f"Error: The stock history already has a snapshot of {latest_dates[-1]}, not adding one of {date}")
+        return None
+
+    df = read_parts_csv(filename, stock_history_columns)[0].sort_values("lcsc")
+    prices = df["price"].fillna("[]")
+    price_tiers = load_price_tiers(folder, transaction)
+    tier_codes = {tiers: code for code, tiers in enumerate(price_tiers)}
+    new_price_tiers = []
+    price_codes = {}
+    # Each distinct price string is only converted once
+    for price in prices.unique():
+        tiers = normalize_price_tiers(price)
+        if tiers not in tier_codes:
+            tier_codes[tiers] = len(price_tiers) + len(new_price_tiers)
+            new_price_tiers.append(tiers)
+        price_codes[price] = tier_codes[tiers]
+
+    snapshot = {
+        "lcsc": df["lcsc"].to_numpy(dtype=np.int64),
+        "stock": df["stock"].to_numpy(dtype=np.int64),
+        "price": prices.map(price_codes).to_numpy(dtype=np.int64),
+        # Basic before Preferred, like the symbols' Class property
+        "class": np.where(df["basic"] > 0, 1, np.where(df["preferred"] > 0, 2, 0)),
+    }
+
+    # Encoded against the month's latest snapshot before it (a snapshot taken again today replaces today's)
+    previous = None
+    for day, month_snapshot in iter_history_month(date[:7], folder, date, transaction):
+        if day < date:
+            previous = month_snapshot
+
+    snapshot_filename = get_history_snapshot_filename(date, folder)
+    if transaction == None:
+        os.makedirs(os.path.dirname(snapshot_filename), exist_ok=True)
+    if len(new_price_tiers) > 0:
+        # The tiers are only ever appended, so the line numbers older snapshots store stay valid
+        tiers_filename = os.path.join(folder, price_tiers_filename)
+        data = "".join(f"{tiers}\n" for tiers in new_price_tiers).encode("utf-8")
+        if len(price_tiers) == 0:
+            write_transaction_file(transaction, tiers_filename, data)
+        else:
+            size = os.path.getsize(get_transaction_path(transaction, tiers_filename))
+            append_transaction_file(transaction, tiers_filename, data, size)
+    data = encode_history_snapshot(snapshot, previous)
+    write_transaction_file(transaction, snapshot_filename, data)
+    print(f"Stock history: {len(df)} parts on {date}, {len(data):,} bytes, {len(new_price_tiers)} new price tiers")
+    return len(data)
+
+
+def get_tiers_unit_price(tiers):
+    """Returns the price of the smallest quantity of a price-tiers.jsonl entry, NaN if it has no prices."""
+    tiers = json.loads(tiers)
+    return float(tiers[0][2]) if len(tiers) > 0 else np.nan
+
+
+def get_part_history(lcsc, start=None, end=None, folder=stock_history_folder):
+    """
+    Returns a part's stock, price tiers and class on every day it was in the parts list.
+    Only the part's own values are decoded from each snapshot.
+
+    :param lcsc: The LCSC id, e.g. "C25804".
+    :param start: The first date (e.g. "2026-01-01"), defaults to the first snapshot.
+    :param end: The last date, defaults to the latest snapshot.
+    :return: list of {"date", "stock", "price": [[from, to, price], ...], "class"}, oldest first.
+    """
+    lcsc = int(f"{lcsc}".lstrip("C"))
+    price_tiers = load_price_tiers(folder)
+    history = []
+    for month in list_history_months(folder):
+        if (start != None and month < start[:7]) or (end != None and month > end[:7]):
+            continue
+        values = np.zeros(len(stock_history_values), dtype=np.int64)  # The part's values the snapshot before
+        lcsc_ids = np.zeros(0, dtype=np.int64)  # The LCSC ids of the snapshot before
+        for date in list_history_dates(month, folder):
+            if end != None and date > end:
+                break
+            with open(get_history_snapshot_filename(date, folder), "rb") as file:
+                lcsc_ids, columns = read_history_columns(file.read(), lcsc_ids)
+            position = np.searchsorted(lcsc_ids, lcsc)
+            if position == len(lcsc_ids) or lcsc_ids[position] != lcsc:
+                values = np.zeros(len(stock_history_values), dtype=np.int64)
+                continue
+            values = values + columns[:, position]
+            if start == None or date >= start:
+                stock, price, component_class = values.tolist()
+                history.append(
+                    {
+                        "date": date,
+                        "stock": stock,
+                        "price": json.loads(price_tiers[price]),
+                        "class": stock_history_classes[component_class],
+                    }
+                )
+    return history
+
+
+def get_top_movers(start=None, end=None, count=20, by="stock", direction="both", folder=stock_history_folder):
+    """
+    Finds the parts whose stock (or price) changed the most between two days, relative to what it was.
+    Just the two snapshots are decoded (with the snapshots before them in their months).
+
+    :param start: The date to compare from, the latest snapshot on or before it is used (or the first snapshot).
+                  Defaults to the first snapshot.
+    :param end: The date to compare to, the latest snapshot on or before it is used. Defaults to the latest snapshot.
+    :param by: "stock" or "price" (the price of the smallest quantity).
+    :param direction: "both", "down" (e.g. the parts running out) or "up".
+    :return: {"start": date, "end": date, "movers": [{"lcsc": "C1234", "old", "new", "change"}]}, the parts in
+             both snapshots with the largest changes first, change being relative (-0.5 for half as much).
+    """
+    months = list_history_months(folder)
+    if len(months) == 0:
+        return {"start": None, "end": None, "movers": []}
+    first_date = list_history_dates(months[0], folder)[0]
+    start_date, old = read_history_snapshot(start or first_date, folder)
+    if old == None:
+        start_date, old = read_history_snapshot(first_date, folder)
+    end_date, new = read_history_snapshot(end or "9999-12-31", folder)
+    if new == None:
+        return {"start": start_date, "end": None, "movers": []}
+
+    base = reindex_history_snapshot(old, new["lcsc"])
+    found = np.isin(new["lcsc"], old["lcsc"])
+    if by == "stock":
+        old_values, new_values = base["stock"], new["stock"]
+        change = (new_values - old_values) / np.maximum(old_values, 1)
+    else:
+        unit_prices = np.array([get_tiers_unit_price(tiers) for tiers in load_price_tiers(folder)])
+        # Parts not in the old snapshot have a 0 there, they are left out below anyway
+        old_values, new_values = unit_prices[base["price"]], unit_prices[new["price"]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = new_values / old_values - 1
+    moved = found & np.isfinite(change) & (change != 0)
+    if direction == "down":
+        moved &= change < 0
+    elif direction == "up":
+        moved &= change > 0
+
+    indices = np.flatnonzero(moved)
+    # Largest relative change first, then largest absolute change
+    order = np.lexsort((-np.abs(new_values[indices] - old_values[indices]), -np.abs(change[indices])))[:count]
+    movers = []
+    for index in indices[order]:
+        movers.append(
+            {
+                "lcsc": f"C{new['lcsc'][index]}",
+                "old": old_values[index].item(),
+                "new": new_values[index].item(),
+                "change": round(change[index].item(), 6),
+            }
+        )
+    return {"start": start_date, "end": end_date, "movers": movers}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queries the stock and price history of the JLCPCB parts")
+    parser.add_argument("--folder", default=stock_history_folder, help="the stock history store")
+    subparsers = parser.add_subparsers(dest="query", required=True)
+
+    part_parser = subparsers.add_parser("part", help="A part's stock, price and class on every day they changed")
+    part_parser.add_argument("lcsc", help="e.g. C25804")
+
+    movers_parser = subparsers.add_parser("movers", help="The parts whose stock or price changed the most")
+    movers_parser.add_argument("--days", type=int, help="compare with this many days before --end")
+    movers_parser.add_argument("--count", type=int, default=20)
+    movers_parser.add_argument("--by", choices=["stock", "price"], default="stock")
+    movers_parser.add_argument("--direction", choices=["both", "down", "up"], default="both")
+
+    for query_parser in [part_parser, movers_parser]:
+        query_parser.add_argument("--start", help="e.g. 2026-01-01")
+        query_parser.add_argument("--end", help="e.g. 2026-12-31")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.query == "part":
+        history = get_part_history(args.lcsc, args.start, args.end, args.folder)
+        elapsed = time.perf_counter() - start
+        shown = None
+        for index, day in enumerate(history):
+            values = [day["stock"], day["price"], day["class"]]
+            if values == shown and index < len(history) - 1:
+                continue
+            shown = values
+            price = ", ".join(f"{tier[0]}+ {tier[2]}USD" for tier in day["price"])
+            print(f"{day['date']}  Stock {day['stock']:>9}  {day['class']:<19}  {price}")
+        if len(history) == 0:
+            print(f"{args.lcsc} isn't in the stock history")
+        print(f"{len(history)} days in {elapsed * 1000:.1f}ms")
+    else:
+        since = args.start
+        if args.days != None:
+            until = args.end or read_history_snapshot("9999-12-31", args.folder)[0] or "9999-12-31"
+            since = (datetime.date.fromisoformat(until) - datetime.timedelta(days=args.days)).isoformat()
+        result = get_top_movers(since, args.end, args.count, args.by, args.direction, args.folder)
+        elapsed = time.perf_counter() - start
+        print(f"{args.by.capitalize()} from {result['start']} to {result['end']}:")
+        for mover in result["movers"]:
+            if args.by == "stock":
+                old, new = f"{mover['old']}", f"{mover['new']}"
+            else:
+                old, new = f"{mover['old']:.4f}USD", f"{mover['new']:.4f}USD"
+            print(f"  {mover['lcsc']:<10} {old:>12} -> {new:<12} {mover['change']:+.1%}")
+        print(f"{len(result['movers'])} parts in {elapsed * 1000:.1f}ms")
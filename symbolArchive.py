@@ -0,0 +1,230 @@
+# symbolArchive.py
+# The archive pack: every symbol update_library_stock_inplace removed from a handmade library (because the part is no
+# longer basic/preferred) in a single library file, Archived-Symbols-Footprints/JLCPCB-Kicad-Symbols/JLCPCB-Archived.kicad_sym.
+# Parts of different libraries can share a symbol name, so an archived symbol is renamed <name>_<LCSC id> (e.g.
+# "4Kbit, I2C_C1234") to keep the pack a valid library, and gets its name back when restored. Packs from before the
+# renaming (generator_version "0.0") are renamed when loaded. The pack has the usual .idx sidecar (see symbolIndex.py),
+# its symbols are looked up through the LCSC ids in it.
+# The pack is loaded once per run, archiving/restoring a part only touches the dict in memory and it is written once at
+# the end: newly archived symbols are appended to the pack, it is only written out again (in LCSC order) once a symbol
+# was restored or replaced.
+import os
+import re
+from kicadSexpr import *  # kicadSexpr.py
+from symbolIndex import *  # symbolIndex.py
+
+archived_symbols_folder = os.path.join("Archived-Symbols-Footprints", "JLCPCB-Kicad-Symbols")
+archive_pack_filename = os.path.join(archived_symbols_folder, "JLCPCB-Archived.kicad_sym")
+
+archive_header = b"""(kicad_symbol_lib
+\t(version 20231120)
+\t(generator "CDFER_Archive_Tool")
+\t(generator_version "1.0")
+"""
+
+archive_footer = b""")
+"""
+
+
+def get_archive_lcsc(value):
+    """Returns the LCSC id the archive keys a symbol by ("C1234") from its LCSC property, or None if it has none."""
+    numbers = re.findall("\\d+", value)
+    if len(numbers) == 0:
+        return None
+    return f"C{numbers[0]}"
+
+
+def get_symbol_block_name(block):
+    """Returns the name of a symbol from its bytes, only reading as far as the name."""
+    tokens = sexpr_token_pattern.finditer(block.decode("utf-8"))
+    next(tokens)  # (
+    next(tokens)  # symbol
+    return unquote_sexpr_string(next(tokens).group())
+
+
+def read_archived_symbols(data):
+    """Returns {"C1234": symbol bytes} for every symbol with an LCSC property in a library file's bytes."""
+    text = data.decode("utf-8")
+    symbols = {}
+    for symbol in iter_sexpr_lists(text):
+        lcsc = get_archive_lcsc(get_symbol_property(symbol, "LCSC", ""))
+        if symbol.head == "symbol" and lcsc != None:
+            symbols[lcsc] = text[symbol.start : symbol.end].encode("utf-8")
+    return symbols
+
+
+def rename_symbol(symbol_text, rename):
+    """
+    Renames a symbol and its units (<name>_<unit>_<style>), keeping the rest of its text as it is.
+
+    :param rename: Function from the symbol's current name to the new one.
+    """
+    symbol = parse_sexpr(symbol_text)[0]
+    name = unquote_sexpr_string(symbol[1])
+    new_name = rename(name)
+    edits = [(*get_sexpr_atom_offset(symbol_text, symbol, 1), quote_sexpr_string(new_name))]
+    for unit in find_sexpr_children(symbol, "symbol"):
+        unit_name = unquote_sexpr_string(unit[1])
+        if unit_name.startswith(f"{name}_"):
+            unit_start, unit_end = get_sexpr_atom_offset(symbol_text, unit, 1)
+            edits.append((unit_start, unit_end, quote_sexpr_string(new_name + unit_name[len(name) :])))
+    return apply_text_edits(symbol_text, edits)
+
+
+def get_archived_symbol_block(lcsc, symbol_text):
+    """Returns the bytes a symbol is archived as, renamed <name>_<LCSC id> (see the top of this file)."""
+    return rename_symbol(symbol_text, lambda name: f"{name}_{lcsc}").encode("utf-8")
+
+
+def load_symbol_archive(filename=archive_pack_filename, transaction=None):
+    """
+    Loads the archive pack, seeking to each symbol through its index (the pack is only parsed, and the index rebuilt,
+    if the index is missing or out of date).
+    Archived symbols still in the old one file per part layout (<lcsc>.kicad_sym) are moved into the pack,
+    their files are deleted when the pack is saved.
+
+    :param transaction: Read the archive as the transaction (see fileTransaction.py) has staged it.
+
+    :return: The archive: {"filename": ..., "symbols": {"C1234": symbol bytes}, "changed": bool (the pack needs
+             writing out again), "appended": [LCSC ids to append to the pack], "index": the pack's index (None if
+             it has to be written out again), "index-changed": bool (the index was rebuilt and needs writing),
+             "migrated": [filenames], "archived": [LCSC ids archived since it was loaded], "restored": [LCSC ids
+             restored since it was loaded]}.
+    """
+    archive = {
+        "filename": filename,
+        "symbols": {},
+        "changed": False,
+        "appended": [],
+        "index": None,
+        "index-changed": False,
+        "migrated": [],
+        "archived": [],
+        "restored": [],
+    }
+
+    if os.path.exists(get_transaction_path(transaction, filename)):
+        with open(get_transaction_path(transaction, filename), "rb") as file:
+            data = file.read()
+        if not data.startswith(archive_header):
+            # Written before archived symbols were renamed, so its symbol names aren't unique and can't be indexed
+            for lcsc, block in read_archived_symbols(data).items():
+                archive["symbols"][lcsc] = get_archived_symbol_block(lcsc, block.decode("utf-8"))
+            archive["changed"] = True
+        else:
+            index = read_symbol_index(filename, transaction)
+            for name in index["lcsc"].values() if index != None else []:
+                found = find_indexed_symbol(index, data, name=name)
+                if found == None or get_symbol_block_name(data[found[1] : found[1] + found[2]]) != name:
+                    index = None  # Out of date, or keyed by LCSC id like the packs before 1.0
+                    break
+            if index == None:
+                index = build_symbol_index(data)
+                archive["index-changed"] = True
+            for lcsc, name in index["lcsc"].items():
+                offset, length, _ = index["symbols"][name]
+                if get_archive_lcsc(lcsc) != None:
+                    archive["symbols"][get_archive_lcsc(lcsc)] = data[offset : offset + length]
+            if data.endswith(archive_footer):
+                archive["index"] = index
+
+    folder = os.path.dirname(filename)
+    if os.path.isdir(folder):
+        for part_filename in sorted(list_transaction_dir(transaction, folder)):
+            if re.fullmatch(r"C?\d+\.kicad_sym", part_filename) != None:
+                with open(os.path.join(folder, part_filename), "rb") as file:
+                    for lcsc, block in read_archived_symbols(file.read()).items():
+                        archive["symbols"][lcsc] = get_archived_symbol_block(lcsc, block.decode("utf-8"))
+                archive["migrated"].append(os.path.join(folder, part_filename))
+                archive["changed"] = True
+    return archive
+
+
+def save_symbol_archive(archive, transaction=None):
+    """
+    Writes the archive pack and its index if anything was archived or restored. Newly archived symbols are appended
+    to the pack, the whole pack is only written out again (in LCSC order) if that isn't enough.
+
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+    """
+    if archive["changed"] == False and archive["index"] != None:
+        # Append in front of the pack's closing bracket, the rest of the pack and its index stay as they are
+        index = archive["index"]
+        start = index["size"] - len(archive_footer)
+        data = b""
+        for lcsc in archive["appended"]:
+            block = archive["symbols"][lcsc]
+            data += b"\t"
+            name = get_symbol_block_name(block)
+            index["symbols"][name] = [start + len(data), len(block), hash_symbol_block(block)]
+            index["lcsc"][lcsc] = name
+            data += block + b"\n"
+        if data != b"":
+            index["size"] += len(data)
+            append_transaction_file(transaction, archive["filename"], data + archive_footer, start)
+        if data != b"" or archive["index-changed"]:
+            write_symbol_index(archive["filename"], index, transaction)
+        archive["appended"] = []
+        archive["index-changed"] = False
+        return
+    if archive["changed"] == False and archive["appended"] == []:
+        return
+
+    data = archive_header
+    index = {"version": symbol_index_version, "size": 0, "symbols": {}, "lcsc": {}}
+    for lcsc in sorted(archive["symbols"], key=lambda lcsc: int(lcsc[1:])):
+        block = archive["symbols"][lcsc]
+        data += b"\t"
+        name = get_symbol_block_name(block)
+        index["symbols"][name] = [len(data), len(block), hash_symbol_block(block)]
+        index["lcsc"][lcsc] = name
+        data += block + b"\n"
+    data += archive_footer
+    index["size"] = len(data)
+
+    os.makedirs(os.path.dirname(archive["filename"]), exist_ok=True)
+    write_transaction_file(transaction, archive["filename"], data)
+    write_symbol_index(archive["filename"], index, transaction)
+
+    for filename in archive["migrated"]:
+        remove_transaction_file(transaction, filename)
+    archive["migrated"] = []
+    archive["appended"] = []
+    archive["index"] = index
+    archive["index-changed"] = False
+    archive["changed"] = False
+
+
+def archive_symbol(archive, lcsc, symbol_text):
+    """Adds a symbol to the archive (replacing an older copy of the same part), renamed <name>_<LCSC id>."""
+    if lcsc in archive["symbols"] and lcsc not in archive["appended"]:
+        archive["changed"] = True  # The older copy is in the pack, so the pack is written out again
+    elif lcsc not in archive["appended"]:
+        archive["appended"].append(lcsc)
+    archive["symbols"][lcsc] = get_archived_symbol_block(lcsc, symbol_text)
+    archive["archived"].append(lcsc)
+
+
+def restore_archived_symbol(archive, lcsc):
+    """
+    Takes a symbol out of the archive, e.g. because the part is back in stock.
+
+    :return: The symbol's text with its name from before it was archived, or None if the part isn't archived.
+    """
+    block = archive["symbols"].pop(lcsc, None)
+    if block == None:
+        return None
+    if lcsc in archive["appended"]:
+        archive["appended"].remove(lcsc)  # Never made it into the pack
+    else:
+        archive["changed"] = True
+    archive["restored"].append(lcsc)
+    return rename_symbol(block.decode("utf-8"), lambda name: name.removesuffix(f"_{lcsc}"))
+
+
+if __name__ == "__main__":
+    # Move any archived symbols still in their own files into the pack and rebuild its index
+    archive = load_symbol_archive()
+    archive["changed"] = True
+    save_symbol_archive(archive)
+    print(f"{len(archive['symbols'])} archived symbols in {archive['filename']}")
@@ -0,0 +1,140 @@
+# symbolIndex.py
+# Sidecar index (JLCPCB-Resistors.kicad_sym.idx) mapping LCSC ids and symbol names to where the symbol is in the library,
+# so a single part can be read without scanning the whole file:
+#   {"version": 1, "size": <library size in bytes>,
+#    "symbols": {"<symbol name>": [<byte offset>, <byte length>, "<hash of the symbol's bytes>"]},
+#    "lcsc": {"C1234": "<symbol name>"}}
+# The indexes aren't committed (see .gitignore), whatever reads one builds it from the library if it is missing.
+import os
+import json
+import hashlib
+from kicadSexpr import *  # kicadSexpr.py
+from fileTransaction import *  # fileTransaction.py
+
+symbol_index_version = 1
+
+
+def get_symbol_index_filename(library_filename):
+    return f"{library_filename}.idx"
+
+
+def hash_symbol_block(block):
+    return hashlib.blake2b(block, digest_size=8).hexdigest()
+
+
+def build_symbol_index(data):
+    """
+    Builds the index of a library from its bytes exactly as they are on disk.
+
+    :param data: The library file contents as bytes.
+    :return: The index dict.
+    """
+    text = data.decode("utf-8")
+    index = {"version": symbol_index_version, "size": len(data), "symbols": {}, "lcsc": {}}
+
+    # Offsets from the parser are character offsets, walk them forward converting to byte offsets
+    position = 0
+    byte_position = 0
+    for symbol in iter_sexpr_lists(text):
+        if symbol.head != "symbol" or len(symbol) < 2:
+            continue
+        byte_start = byte_position + len(text[position : symbol.start].encode("utf-8"))
+        block = text[symbol.start : symbol.end].encode("utf-8")
+        position = symbol.end
+        byte_position = byte_start + len(block)
+
+        name = unquote_sexpr_string(symbol[1])
+        index["symbols"][name] = [byte_start, len(block), hash_symbol_block(block)]
+        lcsc = get_symbol_property(symbol, "LCSC", "")
+        if lcsc != "":
+            index["lcsc"][lcsc] = name
+    return index
+
+
+def write_symbol_index(library_filename, index=None, transaction=None):
+    """
+    Writes the sidecar index of a library, building it from the file on disk unless an index is given.
+
+    :param transaction: Stage the write in this transaction (see fileTransaction.py) instead of writing it straight away.
+    """
+    if index == None:
+        with open(get_transaction_path(transaction, library_filename), "rb") as file:
+            index = build_symbol_index(file.read())
+    data = json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    write_transaction_file(transaction, get_symbol_index_filename(library_filename), data)
+
+
+def read_symbol_index(library_filename, transaction=None):
+    """Returns the index of a library, or None if there is none or the library has changed size since it was written."""
+    index_filename = get_transaction_path(transaction, get_symbol_index_filename(library_filename))
+    library_filename = get_transaction_path(transaction, library_filename)
+    if not os.path.exists(index_filename) or not os.path.exists(library_filename):
+        return None
+    try:
+        with open(index_filename, "r") as file:
+            index = json.load(file)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if index.get("version") != symbol_index_version or index.get("size") != os.path.getsize(library_filename):
+        return None
+    return index
+
+
+def find_indexed_symbol(index, data, lcsc=None, name=None):
+    """
+    Looks a symbol up by LCSC id (e.g. "C1234") or name and checks its bytes against the stored hash.
+
+    :return: (name, byte offset, byte length), or None if it isn't in the index or the index is out of date.
+    """
+    if index == None:
+        return None
+    if lcsc != None:
+        name = index["lcsc"].get(lcsc)
+    if name == None or name not in index["symbols"]:
+        return None
+    offset, length, block_hash = index["symbols"][name]
+    if hash_symbol_block(data[offset : offset + length]) != block_hash:
+        return None
+    return name, offset, length
+
+
+def replace_indexed_symbol(index, name, offset, old_length, new_block):
+    """Updates an index in place after the symbol at offset was rewritten, shifting every symbol after it."""
+    delta = len(new_block) - old_length
+    if delta != 0:
+        for entry in index["symbols"].values():
+            if entry[0] > offset:
+                entry[0] += delta
+    index["symbols"][name] = [offset, len(new_block), hash_symbol_block(new_block)]
+    index["size"] += delta
+
+
+def read_indexed_symbol(library_filename, lcsc=None, name=None):
+    """
+    Reads a single symbol from a library by LCSC id (e.g. "C1234") or symbol name, seeking straight to it.
+    A missing or out of date index is rebuilt first.
+
+    :return: The symbol's text, or None if the library doesn't have it.
+    """
+    for attempt in range(2):
+        index = read_symbol_index(library_filename)
+        if index != None:
+            symbol_name = index["lcsc"].get(lcsc) if lcsc != None else name
+            if symbol_name not in index["symbols"]:
+                return None
+            offset, length, block_hash = index["symbols"][symbol_name]
+            with open(library_filename, "rb") as file:
+                file.seek(offset)
+                block = file.read(length)
+            if hash_symbol_block(block) == block_hash:
+                return block.decode("utf-8")
+        write_symbol_index(library_filename)  # Missing or out of date, rebuild it and try again
+    return None
+
+
+if __name__ == "__main__":
+    # Rebuild the index of every symbol library
+    for symbol_lib_filename in sorted(os.listdir("JLCPCB-Kicad-Symbols")):
+        if symbol_lib_filename.endswith(".kicad_sym"):
+            write_symbol_index(os.path.join("JLCPCB-Kicad-Symbols", symbol_lib_filename))
+            print(f"Indexed {symbol_lib_filename}")
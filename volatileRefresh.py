@@ -0,0 +1,182 @@
+# volatileRefresh.py
+# Fast daily update: rewrites just the Stock, Price and Class values of the symbols already in the libraries,
+# without classifying or rendering anything (python libraryCreatorScript.py refresh-stock). "build --delta" uses it
+# for the handmade symbols of the parts where only those values changed (see partsDelta.py).
+import os
+import re
+import shutil
+import time
+from partsCsv import *  # partsCsv.py
+from partRecord import *  # partRecord.py
+from symbolIndex import *  # symbolIndex.py
+
+volatile_properties = ["Stock", "Price", "Class"]
+
+volatile_property_patterns = {
+    key: re.compile(rf'\(property "{key}" ("(?:[^"\\]|\\.)*")'.encode("utf-8")) for key in volatile_properties
+}
+
+
+def read_volatile_values(filename=parts_csv_filename):
+    """
+    Reads the current stock, price and class of every part.
+
+    :return: dict of "C1234" -> {"Stock": "...", "Price": "...", "Class": "..."} (the values as written in the symbols).
+    """
+    columns = ["lcsc", "joints", "stock", "price", "Assembly Process", "basic", "preferred"]
+    values = {}
+    for df in read_parts_csv(filename, columns):
+        for lcsc, joints, stock, price, assembly_process, basic, preferred in df[columns].itertuples(
+            index=False, name=None
+        ):
+            if basic > 0:
+                component_class = "Basic Component"
+            elif preferred > 0:
+                component_class = "Preferred Component"
+            else:
+                component_class = "Extended Component"
+            _, price_str = parse_part_price(price, lcsc, joints, get_joint_cost(assembly_process))
+            values[f"C{lcsc}"] = {"Stock": f"{stock}", "Price": price_str, "Class": component_class}
+    return values
+
+
+def refresh_library_volatile_properties(library_filename, volatile_values, transaction=None):
+    """
+    Updates the volatile property values of one library in place, seeking to each symbol through its index.
+    Symbols whose values haven't changed are not touched.
+
+    :param transaction: Stage the writes in this transaction (see fileTransaction.py) instead of writing them straight away.
+
+    :return: (symbols changed, symbols whose LCSC id isn't in the parts list).
+    """
+    with open(get_transaction_path(transaction, library_filename), "rb") as file:
+        data = file.read()
+    index = read_symbol_index(library_filename, transaction)
+    # A library edited without changing its size keeps an index that points at the wrong bytes, so every symbol is
+    # checked against its stored hash and the index is rebuilt from the library if any doesn't match
+    if index == None or any(find_indexed_symbol(index, data, name=name) == None for name in index["lcsc"].values()):
+        index = build_symbol_index(data)
+
+    changes = []
+    missing = 0
+    for lcsc, name in index["lcsc"].items():
+        if lcsc not in volatile_values:
+            missing += 1
+            continue
+        offset, length, _ = index["symbols"][name]
+        block = data[offset : offset + length]
+        edits = []
+        for key, pattern in volatile_property_patterns.items():
+            match = pattern.search(block)
+            new_value = quote_sexpr_string(volatile_values[lcsc][key]).encode("utf-8")
+            if match != None and match.group(1) != new_value:
+                edits.append((match.start(1), match.end(1), new_value))
+        if len(edits) > 0:
+            changes.append((offset, name, length, edits))
+
+    if len(changes) > 0:
+        # In file order, index["lcsc"] isn't (e.g. a library with two symbols of the same part)
+        changes.sort()
+        pieces = []
+        position = 0
+        for offset, name, length, edits in changes:
+            block = data[offset : offset + length]
+            new_block = b""
+            block_position = 0
+            for start, end, replacement in sorted(edits):
+                new_block += block[block_position:start] + replacement
+                block_position = end
+            new_block += block[block_position:]
+            pieces.append(data[position:offset])
+            pieces.append(new_block)
+            position = offset + length
+        pieces.append(data[position:])
+
+        # Update the index from the last symbol back so the offsets of the symbols before it stay valid
+        for (offset, name, length, _), new_block in sorted(zip(changes, pieces[1::2]), reverse=True):
+            replace_indexed_symbol(index, name, offset, length, new_block)
+        write_transaction_file(transaction, library_filename, b"".join(pieces))
+        write_symbol_index(library_filename, index, transaction)
+
+    return len(changes), missing
+
+
+def refresh_libraries_volatile_properties(library_filenames, volatile_values, transaction=None):
+    """
+    Updates the volatile property values of several libraries in place, see refresh_library_volatile_properties.
+
+    :return: (symbols changed, symbols whose LCSC id isn't in volatile_values).
+    """
+    changed_symbols = 0
+    missing = 0
+    for library_filename in library_filenames:
+        changed, library_missing = refresh_library_volatile_properties(library_filename, volatile_values, transaction)
+        changed_symbols += changed
+        missing += library_missing
+    return changed_symbols, missing
+
+
+def refresh_database_volatile_values(database_filename, volatile_values, transaction=None):
+    """
+    Updates the Stock, Price and Class columns of the database library's parts (--output database or both, see
+    databaseLibrary.py) with a row update per changed part. Like update_parts_database the changes are made to a
+    copy of the database that is renamed over it when the transaction is committed.
+
+    :return: The number of rows changed.
+    """
+    if not os.path.exists(get_transaction_path(transaction, database_filename)):
+        return 0
+    import sqlite3
+
+    if os.path.exists(f"{database_filename}.tmp"):
+        os.remove(f"{database_filename}.tmp")  # Left over from an interrupted run
+    shutil.copyfile(get_transaction_path(transaction, database_filename), f"{database_filename}.tmp")
+    rows = [(int(values["Stock"]), values["Price"], values["Class"], lcsc) for lcsc, values in volatile_values.items()]
+    changed = 0
+    connection = sqlite3.connect(f"{database_filename}.tmp")
+    with connection:
+        tables = [row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        for table in tables:
+            changed += connection.executemany(
+                f'UPDATE "{table}" SET "Stock" = ?1, "Price" = ?2, "Class" = ?3 WHERE "LCSC" = ?4 '
+                f'AND ("Stock" IS NOT ?1 OR "Price" IS NOT ?2 OR "Class" IS NOT ?3)',
+                rows,
+            ).rowcount
+    connection.close()
+
+    if changed == 0:
+        os.remove(f"{database_filename}.tmp")
+    else:
+        move_transaction_file(transaction, f"{database_filename}.tmp", database_filename)
+    return changed
+
+
+def refresh_volatile_properties(
+    symbols_folder="JLCPCB-Kicad-Symbols",
+    filename=parts_csv_filename,
+    database_filename=os.path.join("JLCPCB-Kicad-Database", "JLCPCB-Parts.sqlite"),
+):
+    """
+    Refreshes the Stock, Price and Class of every symbol in every JLCPCB-*.kicad_sym library, and of every part in the
+    database library if there is one.
+    """
+    start = time.perf_counter()
+    volatile_values = read_volatile_values(filename)
+    transaction = begin_transaction()
+
+    library_filenames = [
+        os.path.join(symbols_folder, symbol_lib_filename)
+        for symbol_lib_filename in sorted(list_transaction_dir(transaction, symbols_folder))
+        if symbol_lib_filename.startswith("JLCPCB-") and symbol_lib_filename.endswith(".kicad_sym")
+    ]
+    changed_symbols, missing = refresh_libraries_volatile_properties(library_filenames, volatile_values, transaction)
+    changed_rows = refresh_database_volatile_values(database_filename, volatile_values, transaction)
+    commit_transaction(transaction)
+
+    print(
+        f"Refreshed {changed_symbols} symbols in {len(library_filenames)} libraries "
+        f"and {changed_rows} database rows in {time.perf_counter() - start:.2f}s"
+    )
+    if missing > 0:
+        # Handmade extended parts are never in the basic/preferred list, the rest is archived by the next full update
+        print(f"{missing} symbols aren't in the parts list and were left as they are")